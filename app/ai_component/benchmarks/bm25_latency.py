@@ -0,0 +1,100 @@
+"""
+Query latency of the inverted-index BM25 engine against langchain's BM25Retriever.
+
+Run with:
+    python -m app.ai_component.benchmarks.bm25_latency --sizes 10000 100000 1000000
+
+The corpus is synthetic (Zipf-distributed terms) so large sizes can be generated
+without a crawl. rank_bm25 keeps a dict per document and scores the whole corpus
+per query, so the baseline is skipped above ``--baseline-max-docs``.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+import numpy as np
+from langchain.schema import Document
+from app.ai_component.modules.bm25_index import BM25IndexRetriever, default_tokenizer
+
+
+def make_corpus(num_docs: int, vocab_size: int, doc_length: int, seed: int) -> List[Document]:
+    """Generate documents whose term frequencies follow a Zipf distribution"""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(vocab_size)])
+    documents = []
+    batch = 10_000
+    for start in range(0, num_docs, batch):
+        size = min(batch, num_docs - start)
+        term_ids = (rng.zipf(1.2, size=(size, doc_length)) - 1) % vocab_size
+        documents.extend(Document(page_content=" ".join(vocab[row]), metadata={"id": start + i}) for i, row in enumerate(term_ids))
+    return documents
+
+
+def make_queries(num_queries: int, vocab_size: int, seed: int) -> List[str]:
+    """Generate 2-5 term queries biased towards mid-frequency terms"""
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for _ in range(num_queries):
+        terms = (rng.zipf(1.1, size=rng.integers(2, 6)) + 10) % vocab_size
+        queries.append(" ".join(f"term{t}" for t in terms))
+    return queries
+
+
+def measure(retriever, queries: List[str]) -> Dict[str, float]:
+    """Return p50/p99 latency in milliseconds over the query set"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def run(sizes: List[int], num_queries: int, k: int, vocab_size: int, doc_length: int, baseline_max_docs: int, seed: int) -> List[Dict]:
+    results = []
+    queries = make_queries(num_queries, vocab_size, seed)
+    for size in sizes:
+        documents = make_corpus(size, vocab_size, doc_length, seed)
+        row = {"num_docs": size, "k": k}
+
+        start = time.perf_counter()
+        index_retriever = BM25IndexRetriever.from_documents(documents, k=k)
+        row["inverted_index_build_s"] = round(time.perf_counter() - start, 2)
+        row["inverted_index"] = measure(index_retriever, queries)
+        del index_retriever
+
+        if size <= baseline_max_docs:
+            from langchain_community.retrievers import BM25Retriever
+
+            start = time.perf_counter()
+            baseline = BM25Retriever.from_documents(documents, k=k, preprocess_func=default_tokenizer)
+            row["rank_bm25_build_s"] = round(time.perf_counter() - start, 2)
+            row["rank_bm25"] = measure(baseline, queries)
+            del baseline
+        else:
+            row["rank_bm25"] = "skipped"
+
+        print(json.dumps(row))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 query latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--vocab-size", type=int, default=50_000)
+    parser.add_argument("--doc-length", type=int, default=120)
+    parser.add_argument("--baseline-max-docs", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.queries, args.k, args.vocab_size, args.doc_length, args.baseline_max_docs, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,151 @@
+"""
+Recall@k, latency and RAM of Qdrant storage configurations.
+
+Run against a Qdrant server (quantization, on-disk storage and HNSW are server
+features; the in-process ``:memory:`` mode ignores them):
+    python -m app.ai_component.benchmarks.qdrant_storage --qdrant-url http://localhost:6333 \\
+        --source-collection health_articles_collection
+
+With ``--source-collection`` the vectors already stored for our corpus are scrolled
+out and re-indexed under each configuration, so no embedding calls are made;
+otherwise random unit vectors are used. Queries are held-out corpus vectors with a
+little noise, and ground truth is exact cosine top-k computed with NumPy.
+RAM is the estimate from ``CollectionOptions.estimated_ram_bytes``, plus the server's
+resident memory from ``/metrics`` after loading each configuration when available.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import requests
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionStatus, OptimizersConfigDiff, PointStruct
+from app.ai_component.modules.collection_options import CollectionOptions
+from app.ai_component.benchmarks.vector_search_latency import make_vectors, recall, summarize
+
+CONFIGURATIONS: Dict[str, CollectionOptions] = {
+    "baseline": CollectionOptions(),
+    "hnsw_m32_ef128": CollectionOptions(hnsw_m=32, hnsw_ef_construct=200, search_ef=128),
+    "scalar_int8": CollectionOptions(quantization="scalar"),
+    "scalar_int8_on_disk": CollectionOptions(quantization="scalar", on_disk_vectors=True, on_disk_payload=True),
+    "binary_rescore": CollectionOptions(quantization="binary", oversampling=3.0),
+    "binary_no_rescore": CollectionOptions(quantization="binary", rescore=False),
+}
+
+
+def load_source_vectors(client: QdrantClient, collection: str, limit: Optional[int]) -> np.ndarray:
+    """Scroll stored vectors out of an existing collection"""
+    vectors, offset = [], None
+    while True:
+        points, offset = client.scroll(collection, limit=512, offset=offset, with_vectors=True, with_payload=False)
+        vectors.extend(point.vector for point in points)
+        if offset is None or (limit and len(vectors) >= limit):
+            break
+    return np.asarray(vectors[:limit] if limit else vectors, dtype=np.float32)
+
+
+def server_resident_bytes(url: str) -> Optional[int]:
+    """Resident memory reported by the Qdrant server's Prometheus endpoint"""
+    try:
+        response = requests.get(f"{url.rstrip('/')}/metrics", timeout=5)
+        for line in response.text.splitlines():
+            if line.startswith("memory_resident_bytes"):
+                return int(float(line.split()[-1]))
+    except requests.RequestException:
+        pass
+    return None
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[List[int]]:
+    normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    scores = queries @ normalized.T
+    return [list(np.argsort(-row)[:k]) for row in scores]
+
+
+def wait_until_indexed(client: QdrantClient, collection: str, timeout: float = 600.0):
+    start = time.perf_counter()
+    while client.get_collection(collection).status != CollectionStatus.GREEN:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"Collection {collection} was not indexed within {timeout}s")
+        time.sleep(0.5)
+
+
+def bench_configuration(
+    client: QdrantClient, url: str, name: str, options: CollectionOptions, corpus: np.ndarray, queries: np.ndarray, truth: List[List[int]], k: int
+) -> Dict:
+    collection = f"storage_benchmark_{name}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(
+        collection,
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=1),
+        **options.create_collection_kwargs(corpus.shape[1]),
+    )
+    start = time.perf_counter()
+    for offset in range(0, len(corpus), 512):
+        chunk = corpus[offset:offset + 512]
+        client.upsert(collection, points=[PointStruct(id=offset + i, vector=v.tolist()) for i, v in enumerate(chunk)], wait=True)
+    wait_until_indexed(client, collection)
+    build_s = time.perf_counter() - start
+
+    search_params = options.search_params()
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.query_points(collection, query=query.tolist(), limit=k, search_params=search_params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.id for point in response.points])
+
+    row = {
+        "configuration": name,
+        "build_s": round(build_s, 2),
+        f"recall@{k}": recall(truth, results),
+        **summarize(latencies),
+        "estimated_ram_mb": round(options.estimated_ram_bytes(len(corpus), corpus.shape[1]) / 2**20, 2),
+        "server_resident_mb": None,
+    }
+    resident = server_resident_bytes(url)
+    if resident is not None:
+        row["server_resident_mb"] = round(resident / 2**20, 1)
+    client.delete_collection(collection)
+    return row
+
+
+def run(url: str, source_collection: Optional[str], num_vectors: int, num_queries: int, k: int, dim: int, configurations: List[str], seed: int) -> List[Dict]:
+    client = QdrantClient(url=url)
+    rng = np.random.default_rng(seed)
+    if source_collection:
+        corpus = load_source_vectors(client, source_collection, num_vectors or None)
+    else:
+        corpus = make_vectors(num_vectors, dim, seed)
+    picks = rng.choice(len(corpus), size=min(num_queries, len(corpus)), replace=False)
+    queries = corpus[picks] + rng.normal(scale=0.01, size=(len(picks), corpus.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_top_k(corpus, queries, k)
+
+    results = []
+    for name in configurations:
+        row = {"num_vectors": len(corpus), "dim": corpus.shape[1], **bench_configuration(client, url, name, CONFIGURATIONS[name], corpus, queries, truth, k)}
+        print(json.dumps(row))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qdrant quantization / on-disk / HNSW benchmark")
+    parser.add_argument("--qdrant-url", type=str, default="http://localhost:6333")
+    parser.add_argument("--source-collection", type=str, default=None, help="Reuse vectors stored in this collection")
+    parser.add_argument("--num-vectors", type=int, default=20_000, help="Synthetic corpus size, or cap on scrolled vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--configurations", type=str, nargs="+", default=list(CONFIGURATIONS), choices=list(CONFIGURATIONS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args.qdrant_url, args.source_collection, args.num_vectors, args.queries, args.k, args.dim, args.configurations, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
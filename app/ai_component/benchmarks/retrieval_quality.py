@@ -0,0 +1,177 @@
+"""
+Offline retrieval quality and latency of vector, BM25 and hybrid search.
+
+Run with:
+    python -m app.ai_component.benchmarks.retrieval_quality --output retrieval.json
+    python -m app.ai_component.benchmarks.retrieval_quality --baseline retrieval.json
+
+A corpus in the ``load_json_file`` article/sections format is ingested through
+``DataStore.StoreInMemory`` into an in-process Qdrant (``:memory:``) or the local
+vector backend, using the deterministic ``hashed_ngram`` embedding backend so no
+API key or network is needed. Each labelled query then goes through
+``DataStore.search_with_method`` with the result cache cleared, and recall@k, MRR
+and p50/p95/p99 latency are reported per method and k. A label is a url, optionally narrowed to one section
+heading. Set CHUNKING_MODE to compare chunking modes. With ``--baseline`` the run is compared to an earlier
+JSON report and the exit status is non-zero if recall or MRR dropped by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.ai_component.config import chunking_mode
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CORPUS = os.path.join(DATA_DIR, "retrieval_corpus.json")
+DEFAULT_QUERIES = os.path.join(DATA_DIR, "retrieval_queries.json")
+COLLECTION = "retrieval_benchmark"
+METHODS = ["vector", "bm25", "hybrid", "hybrid_concurrent"]
+
+
+def load_queries(path: str) -> List[Dict]:
+    """``[{"query": ..., "relevant": [{"url": ..., "heading": ...}]}]``; heading may be omitted"""
+    with open(path, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    for item in queries:
+        item["relevant"] = [(label["url"], label.get("heading")) for label in item["relevant"]]
+    return queries
+
+
+def result_keys(results: List) -> List[Tuple[str, Tuple]]:
+    """
+    (url, headings) per hit, collapsing split chunks of the same section. A chunk
+    merged from several sections (CHUNKING_MODE=tokens) covers all their headings.
+    """
+    keys = []
+    for result in results:
+        doc = result[0] if isinstance(result, tuple) else result
+        key = (doc.metadata.get("url"), tuple(doc.metadata.get("headings") or [doc.metadata.get("heading")]))
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def matches(key: Tuple[str, Tuple], label: Tuple[str, Optional[str]]) -> bool:
+    return key[0] == label[0] and (label[1] is None or label[1] in key[1])
+
+
+def score_query(keys: List[Tuple[str, Tuple]], relevant: List[Tuple[str, Optional[str]]], k: int) -> Tuple[float, float]:
+    """Recall@k and reciprocal rank of the first relevant hit within k"""
+    top = keys[:k]
+    found = sum(1 for label in relevant if any(matches(key, label) for key in top))
+    rank = next((i for i, key in enumerate(top, 1) if any(matches(key, label) for label in relevant)), None)
+    return found / len(relevant), (1.0 / rank if rank else 0.0)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+    }
+
+
+def bench_method(store: DataStore, queries: List[Dict], method: str, k: int, repeats: int) -> Dict:
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for item in queries:
+        for _ in range(repeats):
+            # Every repetition measures a real search, not a result cache hit
+            store.retrieval_cache.clear()
+            start = time.perf_counter()
+            results = store.search_with_method(item["query"], COLLECTION, method=method, k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        recall, reciprocal_rank = score_query(result_keys(results), item["relevant"], k)
+        recalls.append(recall)
+        reciprocal_ranks.append(reciprocal_rank)
+    return {
+        "method": method,
+        "k": k,
+        "recall@k": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        **summarize(latencies),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(corpus: str, queries_path: str, methods: List[str], ks: List[int], vector_backend: str, repeats: int) -> Dict:
+    corpus = os.path.abspath(corpus)
+    queries = load_queries(queries_path)
+    commit = git_commit()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # BM25 and local vector index files are written relative to the working directory
+        os.chdir(tmp)
+        try:
+            store = DataStore(qdrant_url=":memory:", vector_backend=vector_backend, embedding_backend="hashed_ngram")
+            start = time.perf_counter()
+            store.StoreInMemory(COLLECTION, corpus)
+            ingest_s = time.perf_counter() - start
+            rows = []
+            for method in methods:
+                for k in ks:
+                    row = bench_method(store, queries, method, k, repeats)
+                    print(json.dumps(row))
+                    rows.append(row)
+        finally:
+            os.chdir(cwd)
+    return {
+        "commit": commit,
+        "corpus": corpus,
+        "num_queries": len(queries),
+        "vector_backend": vector_backend,
+        "repeats": repeats,
+        "chunking_mode": chunking_mode,
+        "ingest_s": round(ingest_s, 3),
+        "results": rows,
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions in recall/MRR against a baseline report"""
+    previous = {(row["method"], row["k"]): row for row in baseline["results"]}
+    regressions = []
+    for row in report["results"]:
+        old = previous.get((row["method"], row["k"]))
+        if old is None:
+            continue
+        for metric in ("recall@k", "mrr"):
+            if row[metric] < old[metric] - tolerance:
+                regressions.append(f"{row['method']} k={row['k']} {metric}: {old[metric]} -> {row[metric]}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline recall/MRR/latency benchmark for DataStore search methods")
+    parser.add_argument("--corpus", type=str, default=DEFAULT_CORPUS, help="JSON corpus in load_json_file format")
+    parser.add_argument("--queries", type=str, default=DEFAULT_QUERIES, help="JSON query set with relevance labels")
+    parser.add_argument("--methods", type=str, nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--vector-backend", type=str, default="qdrant", choices=["qdrant", "local"])
+    parser.add_argument("--repeats", type=int, default=5, help="Timed searches per query")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the report")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Allowed drop in recall/MRR against the baseline")
+    args = parser.parse_args()
+
+    report = run(args.corpus, args.queries, args.methods, args.k, args.vector_backend, args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
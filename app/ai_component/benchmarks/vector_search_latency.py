@@ -0,0 +1,124 @@
+"""
+Query latency of the embedded local vector index against Qdrant.
+
+Run with:
+    python -m app.ai_component.benchmarks.vector_search_latency --sizes 5000 50000
+    python -m app.ai_component.benchmarks.vector_search_latency --qdrant-url http://localhost:6333
+
+Vectors are random unit vectors, so no embedding API is needed. Without
+``--qdrant-url`` Qdrant runs in-process (``:memory:``), which measures the client
+path without a network hop; pass a server URL to include the HTTP round trip the
+app pays today. Recall is measured against the exact local results.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from langchain.schema import Document
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from app.ai_component.modules.local_vector_index import LocalVectorIndex
+
+
+def make_vectors(num: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((num, dim)).astype(np.float32)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def bench_local(vectors: np.ndarray, queries: np.ndarray, k: int) -> Dict:
+    documents = [Document(page_content=f"doc {i}", metadata={"id": i}) for i in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench")
+        start = time.perf_counter()
+        LocalVectorIndex.from_embeddings(documents, vectors, ids=[str(i) for i in range(len(vectors))]).save(path)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index = LocalVectorIndex.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([doc.metadata["id"] for doc, _ in hits])
+    return {"build_s": round(build_s, 2), "load_ms": round(load_ms, 3), **summarize(latencies), "ids": results}
+
+
+def bench_qdrant(vectors: np.ndarray, queries: np.ndarray, k: int, url: Optional[str]) -> Dict:
+    client = QdrantClient(url=url) if url else QdrantClient(location=":memory:")
+    collection = "vector_search_benchmark"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(collection, vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    start = time.perf_counter()
+    batch = 512
+    for offset in range(0, len(vectors), batch):
+        chunk = vectors[offset:offset + batch]
+        client.upsert(collection, points=[
+            PointStruct(id=offset + i, vector=vector.tolist(), payload={"id": offset + i}) for i, vector in enumerate(chunk)
+        ])
+    build_s = time.perf_counter() - start
+
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.query_points(collection, query=query.tolist(), limit=k, with_payload=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.payload["id"] for point in response.points])
+    client.delete_collection(collection)
+    return {"build_s": round(build_s, 2), **summarize(latencies), "ids": results}
+
+
+def recall(reference: List[List[int]], candidate: List[List[int]]) -> float:
+    hits = sum(len(set(ref) & set(cand)) for ref, cand in zip(reference, candidate))
+    total = sum(len(ref) for ref in reference)
+    return round(hits / total, 4) if total else 0.0
+
+
+def run(sizes: List[int], num_queries: int, k: int, dim: int, qdrant_url: Optional[str], seed: int) -> List[Dict]:
+    results = []
+    queries = make_vectors(num_queries, dim, seed + 1)
+    for size in sizes:
+        vectors = make_vectors(size, dim, seed)
+        local = bench_local(vectors, queries, k)
+        qdrant = bench_qdrant(vectors, queries, k, qdrant_url)
+        row = {
+            "num_vectors": size,
+            "dim": dim,
+            "k": k,
+            "qdrant_mode": qdrant_url or ":memory:",
+            "qdrant_recall_vs_exact": recall(local.pop("ids"), qdrant.pop("ids")),
+            "local": local,
+            "qdrant": qdrant,
+        }
+        print(json.dumps(row))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local vector index vs Qdrant latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--qdrant-url", type=str, default=None, help="Qdrant server URL; in-process :memory: if omitted")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.queries, args.k, args.dim, args.qdrant_url, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
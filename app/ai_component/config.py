@@ -1,3 +1,5 @@
+import os
+
 gemini_model_name = "gemini-1.5-flash"
 gemini_model_kwargs = {
     "temperature": 0.2,
@@ -13,4 +15,110 @@ groq_model_kwargs = {
     "max_tokens": 512
 }
 
-top_collection_search = 5
\ No newline at end of file
+top_collection_search = 5
+
+# Embeddings: "google" (Gemini embedding API) or "hashed_ngram" (deterministic and offline,
+# for tests, benchmarks and air-gapped runs); both produce embedding_dim-sized vectors
+embedding_backend = os.getenv("EMBEDDING_BACKEND", "google")
+embedding_model = "models/embedding-001"
+embedding_dim = 768
+
+# Per-leg deadlines (seconds) and per-leg thread pool size for concurrent hybrid search
+vector_leg_timeout = 2.0
+bm25_leg_timeout = 0.5
+hybrid_search_workers = 8
+
+# Query embedding cache: in-memory LRU size, TTL in seconds, optional SQLite disk tier
+embedding_cache_size = 2048
+embedding_cache_ttl = 24 * 60 * 60
+embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+
+# Persistent document embedding store keyed by (model, text hash), consulted by ingestion
+# before calling the embeddings API; set DOCUMENT_EMBEDDING_STORE_PATH="" to disable.
+# Report its size or prune it with: python -m app.ai_component.modules.embedding_cache
+document_embedding_store_path = os.getenv("DOCUMENT_EMBEDDING_STORE_PATH", "embedding_store/documents.sqlite") or None
+
+# Ranked result cache for search_with_method, invalidated by collection version
+retrieval_cache_size = 1024
+retrieval_cache_ttl = 60 * 60
+
+# Seconds to trust cached collection existence/schema before asking Qdrant again
+collection_metadata_ttl = 30
+
+# Chunking stage: process pool size for splitting oversize sections (serial when 1), sections
+# per order-preserving batch, and the fewest oversize sections in a batch worth sending to the pool
+chunking_workers = int(os.getenv("CHUNKING_WORKERS", str(os.cpu_count() or 1)))
+chunking_batch_size = 256
+chunking_min_parallel = 16
+
+# Chunking mode: "characters" splits only sections over chunk_size characters; "tokens" splits
+# long sections at sentence boundaries and merges small sections of the same article, aiming
+# for chunk_target_tokens and never exceeding chunk_max_tokens (estimated tokens)
+chunking_mode = os.getenv("CHUNKING_MODE", "characters")
+chunk_target_tokens = 350
+chunk_max_tokens = 512
+
+# Near-duplicate dedupe before embedding: MinHash estimated Jaccard similarity at or above
+# which a chunk is dropped in favour of the first one seen, signature size and words per
+# shingle. Off by default (0); enable with e.g. DEDUPE_THRESHOLD=0.85, and preview the
+# savings first with: python -m app.ai_component.modules.dedupe <corpus.json> --threshold 0.8 0.85 0.9
+dedupe_threshold = float(os.getenv("DEDUPE_THRESHOLD", "0"))
+dedupe_num_perm = 128
+dedupe_shingle_size = 5
+
+# Ingestion: chunks per embedding request / upsert, batches in flight at once, per-batch
+# retries (exponential backoff with jitter from the base delay) and where checkpoints of
+# completed batches are kept so an interrupted run resumes
+ingest_batch_size = 64
+ingest_max_concurrency = 4
+ingest_max_retries = 5
+ingest_retry_base_delay = 1.0
+ingest_checkpoint_dir = os.getenv("INGEST_CHECKPOINT_DIR", "ingest_checkpoints")
+
+# Vector backend for DataStore: "qdrant" (server at QDRANT_URL) or "local" (memory-mapped exact index)
+vector_backend = os.getenv("VECTOR_BACKEND", "qdrant")
+local_vector_index_dir = os.getenv("LOCAL_VECTOR_INDEX_DIR", "vector_indexes")
+
+# Hybrid rank fusion: "rrf" or "convex" (min-max normalised scores), per-leg weights,
+# the RRF rank constant and how many candidates each leg contributes before fusion
+fusion_method = "rrf"
+fusion_weights = {"vector": 0.6, "bm25": 0.4}
+fusion_rrf_k = 60
+hybrid_candidates_per_leg = 20
+
+# Chunk metadata fields that can be filtered on; Qdrant gets a keyword payload index for each
+payload_index_fields = ["source", "url", "title", "heading"]
+
+# GutHealthNode context packing: token budget for retrieved evidence, containment
+# threshold for dropping near-duplicate chunks, smallest useful truncated chunk
+context_token_budget = 1500
+context_dedupe_threshold = 0.8
+context_min_chunk_tokens = 64
+
+# Qdrant collection storage: quantization None/"scalar" (int8)/"binary" with rescoring of
+# oversampled candidates, on-disk vectors/payload, HNSW build params and search-time ef
+qdrant_quantization = os.getenv("QDRANT_QUANTIZATION") or None
+qdrant_quantization_quantile = 0.99
+qdrant_quantization_always_ram = True
+qdrant_rescore = True
+qdrant_oversampling = 2.0
+qdrant_on_disk_vectors = False
+qdrant_on_disk_payload = False
+qdrant_hnsw_m = None
+qdrant_hnsw_ef_construct = None
+qdrant_search_ef = None
+
+# Shared Qdrant clients: gRPC transport (port 6334) instead of REST/JSON, request timeout,
+# and the pooled keep-alive connections used by the REST transport
+qdrant_prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+qdrant_grpc_port = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+qdrant_timeout = 10
+qdrant_api_key = os.getenv("QDRANT_API_KEY")
+qdrant_max_connections = 32
+qdrant_max_keepalive_connections = 16
+qdrant_keepalive_expiry = 30.0
+
+# Retrieval warmup: collection whose retrievers are loaded in the background at startup,
+# and the query embedded to open the embeddings connection
+default_collection_name = os.getenv("DEFAULT_COLLECTION", "health_articles_collection")
+warmup_query = "What is gut health?"
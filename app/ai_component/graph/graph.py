@@ -8,6 +8,7 @@ from langgraph.checkpoint.memory import MemorySaver
 from app.ai_component.graph.state import AICompanionState
 from app.ai_component.graph.nodes import RouteNode, GutHealthNode, GeneralHealthNode, OffTopicNode
 from app.ai_component.graph.edges import select_workflow
+from app.ai_component.modules.hybrid_retriever import start_warmup
 from langchain_core.messages import HumanMessage, AIMessage
 from typing import Optional
 from opik.integrations.langchain import OpikTracer
@@ -61,6 +62,7 @@ class GutHealthCoach:
         """Process a single message with conversation memory"""
         if not session_id:
             session_id = str(uuid.uuid4())
+        start_warmup()
             
         human_message = HumanMessage(content=message)
         
@@ -92,6 +94,8 @@ class GutHealthCoach:
     
     async def start_conversation(self, session_id: str = None) -> str:
         """Start a new conversation"""
+        # Load retrievers and open connections while the user reads the welcome message
+        start_warmup()
         welcome_message = """Hi there! I'm August, your gut health coach. 
 
 I'm here to help you understand your digestive health in a warm, supportive way. Whether you're dealing with bloating, food sensitivities, or just want to optimize your gut health, I'm here to listen and guide you.
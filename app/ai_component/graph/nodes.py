@@ -1,7 +1,9 @@
 from app.ai_component.graph.state import AICompanionState
 from app.ai_component.llm import LLMChainFactory
 from app.ai_component.graph.utils.chains import router_chain
-from app.ai_component.modules.hybrid_retriever import memory
+from app.ai_component.modules.hybrid_retriever import aget_memory
+from app.ai_component.modules.context_packer import ContextPacker
+from app.ai_component.config import context_token_budget, context_dedupe_threshold, context_min_chunk_tokens, default_collection_name
 from app.ai_component.core.prompts import guthealthNode_template, generalHealthNode_template, offtopic_template
 from app.ai_component.logger import logging
 from app.ai_component.exception import CustomException
@@ -12,6 +14,12 @@ from langchain.chains import RetrievalQA
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import PromptTemplate
 
+context_packer = ContextPacker(
+    token_budget=context_token_budget,
+    dedupe_threshold=context_dedupe_threshold,
+    min_chunk_tokens=context_min_chunk_tokens,
+)
+
 def format_conversation_history(messages: list, max_turns: int = 3) -> str:
     """Format recent conversation history for context"""
     if not messages or len(messages) <= 1:
@@ -72,12 +80,16 @@ async def GutHealthNode(state: AICompanionState) -> dict:
             
         logging.info(f"Processing gut health query: {query_content}")
         
-        collection_name = "health_articles_collection"
-        docs = memory.hybrid_search(query=query_content, collection_name=collection_name, k=5)
+        memory = await aget_memory()
+        docs = await memory.asearch_with_method(query=query_content, collection_name=default_collection_name, method="hybrid", k=5)
         
         context_text = ""
+        context_stats = {}
         if docs:
-            context_text = "\n\n".join([doc.page_content for doc in docs])
+            packed = context_packer.pack(docs)
+            context_text = packed.text
+            context_stats = packed.stats()
+            logging.info(f"Context packed: {context_stats}")
         else:
             logging.warning("No documents retrieved for query")
             context_text = "I'll use my knowledge to help you with this gut health question."
@@ -110,7 +122,8 @@ async def GutHealthNode(state: AICompanionState) -> dict:
         
         return {
             "messages": updated_messages,
-            "conversation_history": format_conversation_history(updated_messages)
+            "conversation_history": format_conversation_history(updated_messages),
+            "context_stats": context_stats
         }
 
     except Exception as e:
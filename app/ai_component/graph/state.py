@@ -6,4 +6,5 @@ class AICompanionState(TypedDict):
     route: str
     conversation_history: str
     user_context: Dict[str, Any]
-    session_id: str
\ No newline at end of file
+    session_id: str
+    context_stats: Dict[str, Any]
\ No newline at end of file
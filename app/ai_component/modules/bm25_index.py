@@ -0,0 +1,536 @@
+import hashlib
+import json
+import re
+import sys
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from pydantic import ConfigDict
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from app.ai_component.modules.document_ids import document_id
+from app.ai_component.modules.filters import DEFAULT_FILTER_FIELDS, FieldIndex, MetadataFilter, normalize_filter
+from app.ai_component.logger import logging
+from app.ai_component.exception import CustomException
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+DEFAULT_TOKENIZER_ID = "regex-word-lower-v1"
+_HASH_MODULUS = 1 << 256
+
+
+def default_tokenizer(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# Persisted indexes record the tokenizer id, so only registered tokenizers can be reopened
+TOKENIZERS: Dict[str, Callable[[str], List[str]]] = {
+    DEFAULT_TOKENIZER_ID: default_tokenizer,
+}
+
+
+def document_digest(doc: Document) -> int:
+    """SHA-256 of a document's text and metadata as an integer"""
+    payload = doc.page_content + "\x00" + json.dumps(doc.metadata, sort_keys=True, default=str)
+    return int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest(), "big")
+
+
+def compute_corpus_hash(documents: Iterable[Document]) -> str:
+    """
+    Order-independent corpus hash: the sum of per-document digests modulo 2**256.
+    Adding or removing one document adjusts it in O(1), so incremental updates
+    keep it current without rehashing the corpus.
+    """
+    return f"{sum(document_digest(doc) for doc in documents) % _HASH_MODULUS:064x}"
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index held in flat NumPy arrays.
+
+    Postings are stored CSR style: the documents containing term ``t`` are
+    ``postings[indptr[t]:indptr[t + 1]]`` with matching ``term_freqs``. IDF per
+    term and the length normalisation per document are precomputed, so a query
+    only touches the postings of its own terms instead of scoring the corpus.
+
+    The CSR arrays form an immutable base segment (possibly memory-mapped).
+    ``add_documents``/``update_documents``/``delete_documents`` append to a small
+    in-memory delta segment and mark tombstones, adjusting document frequencies
+    and the average length as they go; ``compact`` folds both back into CSR.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[Document],
+        vocabulary: Mapping[str, int],
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        tokenizer_id: str = DEFAULT_TOKENIZER_ID,
+        idf: Optional[np.ndarray] = None,
+        doc_norms: Optional[np.ndarray] = None,
+        avg_doc_length: Optional[float] = None,
+        corpus_hash: Optional[str] = None,
+        doc_keys: Optional[Sequence[str]] = None,
+        field_index: Optional[FieldIndex] = None,
+    ):
+        if tokenizer_id not in TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer id: {tokenizer_id}")
+        self.documents = documents
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.tokenizer_id = tokenizer_id
+        self.tokenizer = TOKENIZERS[tokenizer_id]
+        self.corpus_hash = corpus_hash
+        self.doc_keys = doc_keys if doc_keys is not None else [document_id(doc) for doc in documents]
+        self.generation = 0
+
+        # Delta segment and tombstones, created on the first mutation
+        self._num_base_docs = len(doc_lengths)
+        self._num_base_terms = len(indptr) - 1
+        self._num_live = self._num_base_docs
+        self._added_terms: Dict[str, int] = {}
+        self._delta_postings: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._delta_documents: List[Document] = []
+        self._delta_keys: List[str] = []
+        self._deleted: Optional[np.ndarray] = None
+        self._slot_by_key: Optional[Dict[str, int]] = None
+        self._doc_freqs: Optional[np.ndarray] = None
+        self._total_length = float(np.sum(doc_lengths, dtype=np.float64))
+        self._hash_value: Optional[int] = None
+        self._field_index = field_index
+
+        if idf is not None and doc_norms is not None and avg_doc_length is not None:
+            # Precomputed arrays, e.g. memory-mapped from a saved index
+            self.idf = idf
+            self.doc_norms = doc_norms
+            self.avg_doc_length = avg_doc_length
+        else:
+            self._finalize()
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        k1: float = 1.5,
+        b: float = 0.75,
+        tokenizer_id: str = DEFAULT_TOKENIZER_ID,
+        ids: Optional[List[str]] = None,
+    ) -> "BM25Index":
+        """Build the inverted index from a list of documents"""
+        tokenizer = TOKENIZERS[tokenizer_id]
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        freqs: List[int] = []
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+
+        for doc_id, doc in enumerate(documents):
+            tokens = tokenizer(doc.page_content)
+            doc_lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                term_ids.append(term_id)
+                doc_ids.append(doc_id)
+                freqs.append(tf)
+
+        term_array = np.asarray(term_ids, dtype=np.int32)
+        # Stable sort keeps doc ids ascending inside each posting list
+        order = np.argsort(term_array, kind="stable")
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_array, minlength=len(vocabulary)), out=indptr[1:])
+
+        return cls(
+            documents=documents,
+            vocabulary=vocabulary,
+            indptr=indptr,
+            postings=np.asarray(doc_ids, dtype=np.int32)[order],
+            term_freqs=np.asarray(freqs, dtype=np.float32)[order],
+            doc_lengths=doc_lengths,
+            k1=k1,
+            b=b,
+            tokenizer_id=tokenizer_id,
+            corpus_hash=compute_corpus_hash(documents),
+            doc_keys=ids,
+        )
+
+    def _finalize(self):
+        """Precompute IDF per term and the BM25 length norm per document"""
+        doc_freqs = self._doc_freqs if self._doc_freqs is not None else np.diff(self.indptr)
+        doc_freqs = doc_freqs.astype(np.float32)
+        self.avg_doc_length = self._total_length / self._num_live if self._num_live else 0.0
+        self.idf = np.log1p((self._num_live - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        if self.avg_doc_length > 0:
+            self.doc_norms = (self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_doc_length)).astype(np.float32)
+        else:
+            self.doc_norms = np.full(len(self.doc_lengths), self.k1, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._num_live
+
+    @property
+    def num_slots(self) -> int:
+        """Document slots in both segments, including tombstoned ones"""
+        return self._num_base_docs + len(self._delta_documents)
+
+    @property
+    def has_pending_changes(self) -> bool:
+        """True when the delta segment or tombstones are non-empty"""
+        return bool(self._delta_documents) or (self._deleted is not None and bool(self._deleted.any()))
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the indexed corpus changes"""
+        return f"{self.corpus_hash or ''}:{self.generation}"
+
+    def document(self, slot: int) -> Document:
+        if slot < self._num_base_docs:
+            return self.documents[slot]
+        return self._delta_documents[slot - self._num_base_docs]
+
+    def document_key(self, slot: int) -> str:
+        if slot < self._num_base_docs:
+            return self.doc_keys[slot]
+        return self._delta_keys[slot - self._num_base_docs]
+
+    def live_slots(self) -> np.ndarray:
+        """Slots of documents that are not tombstoned"""
+        if self._deleted is None:
+            return np.arange(self.num_slots)
+        return np.flatnonzero(~self._deleted)
+
+    def term_id(self, term: str) -> Optional[int]:
+        term_id = self._added_terms.get(term)
+        if term_id is None:
+            term_id = self.vocabulary.get(term)
+        return term_id
+
+    def _query_terms(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Map query tokens to known term ids and their query-side counts"""
+        counts = Counter()
+        for token in self.tokenizer(query):
+            term_id = self.term_id(token)
+            if term_id is not None:
+                counts[term_id] += 1
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return term_ids, weights
+
+    def _term_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Postings of a term across the base and delta segments"""
+        if term_id < self._num_base_terms:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs, tf = self.postings[start:end], self.term_freqs[start:end]
+        else:
+            docs, tf = self.postings[:0], self.term_freqs[:0]
+        delta = self._delta_postings.get(term_id)
+        if delta:
+            docs = np.concatenate([docs, np.asarray(delta[0], dtype=np.int32)])
+            tf = np.concatenate([tf, np.asarray(delta[1], dtype=np.float32)])
+        return docs, tf
+
+    def field_index(self, fields: Sequence[str] = DEFAULT_FILTER_FIELDS) -> FieldIndex:
+        """
+        Per-field posting lists over the live documents. Saved indexes load them for
+        the default fields; other fields are built once per index version.
+        """
+        if self._field_index is None or not self._field_index.has_fields(fields):
+            known = set(DEFAULT_FILTER_FIELDS) | set(fields)
+            live = ((int(slot), self.document(int(slot)).metadata) for slot in self.live_slots())
+            self._field_index = FieldIndex.build(self.num_slots, live, sorted(known))
+        return self._field_index
+
+    def filter_mask(self, filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """Slot mask for a metadata filter"""
+        normalized = normalize_filter(filter)
+        if normalized is None:
+            return None
+        return self.field_index([field for field, _ in normalized]).mask(filter)
+
+    @staticmethod
+    def _apply_mask(doc_ids: np.ndarray, scores: np.ndarray, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if mask is None:
+            return doc_ids, scores
+        keep = mask[doc_ids]
+        return doc_ids[keep], scores[keep]
+
+    def score(self, query: str, filter: Optional[MetadataFilter] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, scores) for every document sharing a term with the query"""
+        mask = self.filter_mask(filter)
+        term_ids, weights = self._query_terms(query)
+        if len(term_ids) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        doc_parts = []
+        score_parts = []
+        for term_id, weight in zip(term_ids, weights):
+            docs, tf = self._term_postings(term_id)
+            if self._deleted is not None:
+                live = ~self._deleted[docs]
+                docs, tf = docs[live], tf[live]
+            doc_parts.append(docs)
+            score_parts.append(weight * self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norms[docs]))
+
+        if len(doc_parts) == 1:
+            return self._apply_mask(doc_parts[0], score_parts[0], mask)
+
+        doc_ids, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        return self._apply_mask(doc_ids.astype(np.int32), scores, mask)
+
+    def _term_contributions(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Live postings of a term and their BM25 contribution for a query count of one"""
+        docs, tf = self._term_postings(term_id)
+        if self._deleted is not None:
+            live = ~self._deleted[docs]
+            docs, tf = docs[live], tf[live]
+        return docs, self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norms[docs])
+
+    def score_many(self, queries: Sequence[str], filter: Optional[MetadataFilter] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Score a batch of queries in one pass: postings of each distinct term are read
+        once, and all (query, document) sums are accumulated with a single bincount.
+        """
+        mask = self.filter_mask(filter)
+        query_terms = [self._query_terms(query) for query in queries]
+        contributions = {}
+        query_parts, doc_parts, score_parts = [], [], []
+        for query_idx, (term_ids, weights) in enumerate(query_terms):
+            for term_id, weight in zip(term_ids.tolist(), weights):
+                if term_id not in contributions:
+                    contributions[term_id] = self._apply_mask(*self._term_contributions(term_id), mask)
+                docs, contrib = contributions[term_id]
+                query_parts.append(np.full(len(docs), query_idx, dtype=np.int64))
+                doc_parts.append(docs)
+                score_parts.append(weight * contrib)
+
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        if not doc_parts:
+            return [empty for _ in queries]
+
+        num_slots = self.num_slots
+        keys = np.concatenate(query_parts) * num_slots + np.concatenate(doc_parts)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        doc_ids = (unique_keys % num_slots).astype(np.int32)
+        # unique_keys is sorted, so each query's rows are a contiguous run
+        bounds = np.searchsorted(unique_keys // num_slots, np.arange(len(queries) + 1))
+        return [(doc_ids[bounds[i]:bounds[i + 1]], scores[bounds[i]:bounds[i + 1]]) for i in range(len(queries))]
+
+    @staticmethod
+    def top_k(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Select the k best candidates with argpartition and sort only those"""
+        if k <= 0 or len(scores) == 0:
+            return doc_ids[:0], scores[:0]
+        if len(scores) > k:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return doc_ids[order], scores[order]
+
+    def search(self, query: str, k: int = 4, filter: Optional[MetadataFilter] = None) -> List[Tuple[Document, float]]:
+        """Return the top-k documents with their BM25 scores"""
+        doc_ids, scores = self.top_k(*self.score(query, filter), k)
+        return [(self.document(doc_id), float(score)) for doc_id, score in zip(doc_ids, scores)]
+
+    def search_many(self, queries: Sequence[str], k: int = 4, filter: Optional[MetadataFilter] = None) -> List[List[Tuple[Document, float]]]:
+        """Top-k documents with scores for each query, in input order"""
+        results = []
+        for doc_ids, scores in self.score_many(queries, filter):
+            doc_ids, scores = self.top_k(doc_ids, scores, k)
+            results.append([(self.document(doc_id), float(score)) for doc_id, score in zip(doc_ids, scores)])
+        return results
+
+    def _ensure_mutable(self):
+        """Materialise the bookkeeping needed for incremental updates"""
+        if self._slot_by_key is not None:
+            return
+        self._slot_by_key = {self.doc_keys[slot]: slot for slot in range(self._num_base_docs)}
+        if not isinstance(self.vocabulary, dict):
+            # Binary search over a mapped vocabulary is fine per query, too slow per token
+            self.vocabulary = dict(self.vocabulary.items())
+        self._doc_freqs = np.diff(self.indptr).astype(np.int64)
+        self._deleted = np.zeros(self._num_base_docs, dtype=bool)
+        self.doc_lengths = np.array(self.doc_lengths, dtype=np.float32)
+        if self.corpus_hash:
+            self._hash_value = int(self.corpus_hash, 16)
+        else:
+            self._hash_value = int(compute_corpus_hash(self.documents[slot] for slot in range(self._num_base_docs)), 16)
+
+    def _remove_slot(self, slot: int):
+        doc = self.document(slot)
+        for term in set(self.tokenizer(doc.page_content)):
+            self._doc_freqs[self.term_id(term)] -= 1
+        self._deleted[slot] = True
+        self._num_live -= 1
+        self._total_length -= float(self.doc_lengths[slot])
+        self._hash_value = (self._hash_value - document_digest(doc)) % _HASH_MODULUS
+
+    def _append(self, doc: Document, key: str):
+        slot = self.num_slots
+        tokens = self.tokenizer(doc.page_content)
+        for term, tf in Counter(tokens).items():
+            term_id = self.term_id(term)
+            if term_id is None:
+                term_id = self._num_base_terms + len(self._added_terms)
+                self._added_terms[term] = term_id
+            postings = self._delta_postings.setdefault(term_id, ([], []))
+            postings[0].append(slot)
+            postings[1].append(float(tf))
+        new_terms = self._num_base_terms + len(self._added_terms) - len(self._doc_freqs)
+        if new_terms > 0:
+            self._doc_freqs = np.concatenate([self._doc_freqs, np.zeros(new_terms, dtype=np.int64)])
+        for term in set(tokens):
+            self._doc_freqs[self.term_id(term)] += 1
+
+        self._delta_documents.append(doc)
+        self._delta_keys.append(key)
+        self._slot_by_key[key] = slot
+        self._deleted = np.append(self._deleted, False)
+        self.doc_lengths = np.append(self.doc_lengths, np.float32(len(tokens)))
+        self._num_live += 1
+        self._total_length += len(tokens)
+        self._hash_value = (self._hash_value + document_digest(doc)) % _HASH_MODULUS
+
+    def _commit(self):
+        self.corpus_hash = f"{self._hash_value:064x}"
+        self.generation += 1
+        self._field_index = None
+        self._finalize()
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> List[str]:
+        """Add documents; an id that is already indexed is replaced. Returns the ids used."""
+        self._ensure_mutable()
+        keys = ids or [document_id(doc) for doc in documents]
+        for doc, key in zip(documents, keys):
+            slot = self._slot_by_key.pop(key, None)
+            if slot is not None:
+                self._remove_slot(slot)
+            self._append(doc, key)
+        self._commit()
+        return keys
+
+    def update_documents(self, documents: List[Document], ids: List[str]) -> List[str]:
+        """Replace the documents stored under ``ids``"""
+        return self.add_documents(documents, ids)
+
+    def delete_documents(self, ids: List[str]) -> int:
+        """Tombstone documents by id and return how many were removed"""
+        self._ensure_mutable()
+        removed = 0
+        for key in ids:
+            slot = self._slot_by_key.pop(key, None)
+            if slot is not None:
+                self._remove_slot(slot)
+                removed += 1
+        if removed:
+            self._commit()
+        return removed
+
+    def compact(self) -> "BM25Index":
+        """Fold the delta segment and tombstones into a fresh CSR index"""
+        live = self.live_slots()
+        new_slot = np.full(self.num_slots, -1, dtype=np.int64)
+        new_slot[live] = np.arange(len(live))
+
+        num_terms = self._num_base_terms + len(self._added_terms)
+        term_parts = [np.repeat(np.arange(self._num_base_terms, dtype=np.int64), np.diff(self.indptr))]
+        doc_parts = [np.asarray(self.postings, dtype=np.int64)]
+        tf_parts = [np.asarray(self.term_freqs, dtype=np.float32)]
+        for term_id, (docs, tfs) in self._delta_postings.items():
+            term_parts.append(np.full(len(docs), term_id, dtype=np.int64))
+            doc_parts.append(np.asarray(docs, dtype=np.int64))
+            tf_parts.append(np.asarray(tfs, dtype=np.float32))
+        terms = np.concatenate(term_parts)
+        docs = new_slot[np.concatenate(doc_parts)]
+        tfs = np.concatenate(tf_parts)
+        keep = docs >= 0
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+
+        # Drop terms that no longer occur and renumber the rest densely
+        doc_freqs = np.bincount(terms, minlength=num_terms)
+        term_map = np.full(num_terms, -1, dtype=np.int64)
+        alive_terms = np.flatnonzero(doc_freqs)
+        term_map[alive_terms] = np.arange(len(alive_terms))
+        terms = term_map[terms]
+
+        vocabulary: Dict[str, int] = {}
+        for term, term_id in list(self.vocabulary.items()) + list(self._added_terms.items()):
+            if term_map[term_id] >= 0:
+                vocabulary[term] = int(term_map[term_id])
+
+        order = np.lexsort((docs, terms))
+        indptr = np.zeros(len(alive_terms) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs[alive_terms], out=indptr[1:])
+
+        compacted = BM25Index(
+            documents=[self.document(slot) for slot in live],
+            vocabulary=vocabulary,
+            indptr=indptr,
+            postings=docs[order].astype(np.int32),
+            term_freqs=tfs[order],
+            doc_lengths=np.asarray(self.doc_lengths, dtype=np.float32)[live],
+            k1=self.k1,
+            b=self.b,
+            tokenizer_id=self.tokenizer_id,
+            corpus_hash=self.corpus_hash,
+            doc_keys=[self.document_key(slot) for slot in live],
+        )
+        compacted.generation = self.generation
+        return compacted
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Drop-in replacement for ``BM25Retriever`` backed by :class:`BM25Index`"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: BM25Index
+    k: int = 4
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        k: int = 4,
+        k1: float = 1.5,
+        b: float = 0.75,
+        tokenizer_id: str = DEFAULT_TOKENIZER_ID,
+        **kwargs,
+    ) -> "BM25IndexRetriever":
+        """Build the index and wrap it in a retriever"""
+        try:
+            index = BM25Index.from_documents(documents, k1=k1, b=b, tokenizer_id=tokenizer_id)
+            logging.info(f"BM25 index built with {len(index)} documents and {len(index.vocabulary)} terms")
+            return cls(index=index, k=k, **kwargs)
+        except Exception as e:
+            logging.error(f"Error building BM25 index: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    @property
+    def docs(self) -> List[Document]:
+        """Live indexed documents, mirroring ``BM25Retriever.docs``"""
+        return [self.index.document(slot) for slot in self.index.live_slots()]
+
+    def search_with_score(self, query: str, k: Optional[int] = None, filter: Optional[MetadataFilter] = None) -> List[Tuple[Document, float]]:
+        """Return (document, score) pairs without touching the shared ``k``"""
+        return self.index.search(query, self.k if k is None else k, filter)
+
+    def search_many_with_score(
+        self, queries: Sequence[str], k: Optional[int] = None, filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Batched ``search_with_score`` scoring all queries in one vectorised pass"""
+        return self.index.search_many(queries, self.k if k is None else k, filter)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.index.search(query, self.k)]
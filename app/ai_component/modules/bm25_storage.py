@@ -0,0 +1,316 @@
+"""
+Versioned, memory-mappable on-disk format for :class:`BM25Index`.
+
+Layout (all integers little-endian)::
+
+    offset 0   magic            8 bytes   b"GHBM25\\x00\\x00"
+    offset 8   format_version   uint32
+    offset 12  header_length    uint32
+    offset 16  header_crc32     uint32    CRC32 of the JSON header bytes
+    offset 20  reserved         uint32
+    offset 24  header           header_length bytes of UTF-8 JSON
+    ...        sections         each aligned to SECTION_ALIGNMENT bytes
+
+The JSON header records ``tokenizer_id``, ``corpus_hash``, ``k1``, ``b``,
+``avg_doc_length``, ``num_docs``, ``num_terms``, ``filter_fields``,
+``payload_crc32``, ``file_size`` and a ``sections`` table of
+``name -> [offset, dtype, count]``. Sections:
+
+    vocab_offsets  uint64[num_terms + 1]  byte offsets into vocab_blob
+    vocab_blob     uint8[...]             UTF-8 terms, sorted, term id == rank
+    indptr         int64[num_terms + 1]   CSR row pointers into postings
+    postings       int32[nnz]             document ids, ascending per term
+    term_freqs     float32[nnz]           term frequency per posting
+    doc_lengths    float32[num_docs]      tokens per document
+    idf            float32[num_terms]     precomputed IDF
+    doc_norms      float32[num_docs]      precomputed k1 * (1 - b + b * dl / avgdl)
+    doc_offsets    uint64[num_docs + 1]   byte offsets into doc_blob
+    doc_blob       uint8[...]             one JSON record per document
+    key_offsets    uint64[num_docs + 1]   byte offsets into key_blob
+    key_blob       uint8[...]             UTF-8 document ids, used for updates/deletes
+    filter_*                              metadata field postings for ``filter_fields``
+                                          (see FieldIndex.to_arrays), so filtered
+                                          queries never decode documents
+
+Readers ``mmap`` the file read-only, so opening is O(header) and the page cache
+is shared by every worker process. Files are written to a temporary path and
+renamed into place, so processes still mapping the old file are unaffected.
+Indexes with pending incremental changes are compacted before being written.
+
+Version history: 1 - initial layout; 2 - document id sections, order-independent
+corpus hash; 3 - metadata field posting sections.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain.schema import Document
+from app.ai_component.modules.bm25_index import BM25Index, TOKENIZERS, compute_corpus_hash
+from app.ai_component.modules.filters import FieldIndex
+from app.ai_component.logger import logging
+
+MAGIC = b"GHBM25\x00\x00"
+FORMAT_VERSION = 3
+SECTION_ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sIII4x")
+
+
+class BM25IndexFormatError(Exception):
+    """Raised when an index file is corrupt, truncated or written by an incompatible version"""
+
+
+class StaleBM25IndexError(BM25IndexFormatError):
+    """Raised when an index file was built from a different corpus or tokenizer"""
+
+
+class MappedStrings(Sequence):
+    """UTF-8 strings addressed by an offsets array into a mapped blob"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def raw(self, position: int) -> bytes:
+        return bytes(self._blob[self._offsets[position]:self._offsets[position + 1]])
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return self.raw(position).decode("utf-8")
+
+
+class MappedVocabulary:
+    """Read-only term -> id mapping that binary-searches the sorted vocabulary blob"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._terms = MappedStrings(offsets, blob)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _find(self, term: str) -> int:
+        encoded = term.encode("utf-8")
+        position = bisect.bisect_left(range(len(self._terms)), encoded, key=self._terms.raw)
+        if position < len(self._terms) and self._terms.raw(position) == encoded:
+            return position
+        return -1
+
+    def __contains__(self, term: str) -> bool:
+        return self._find(term) >= 0
+
+    def __getitem__(self, term: str) -> int:
+        term_id = self._find(term)
+        if term_id < 0:
+            raise KeyError(term)
+        return term_id
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        term_id = self._find(term)
+        return default if term_id < 0 else term_id
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return ((term, term_id) for term_id, term in enumerate(self._terms))
+
+
+class MappedDocuments(Sequence):
+    """Documents decoded lazily from the mapped JSON blob on access"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._records = MappedStrings(offsets, blob)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def raw(self, doc_id: int) -> bytes:
+        return self._records.raw(doc_id)
+
+    def __getitem__(self, doc_id):
+        if isinstance(doc_id, slice):
+            return [self[i] for i in range(*doc_id.indices(len(self)))]
+        record = json.loads(self._records.raw(doc_id))
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+
+def _encode_blob(items: List[bytes]) -> Tuple[np.ndarray, bytes]:
+    offsets = np.zeros(len(items) + 1, dtype=np.uint64)
+    np.cumsum([len(item) for item in items], out=offsets[1:])
+    return offsets, b"".join(items)
+
+
+def _sorted_csr(index: BM25Index, terms: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reorder CSR rows so term ids follow the sorted byte order of the terms"""
+    order = np.array(sorted(range(len(terms)), key=lambda i: terms[i].encode("utf-8")), dtype=np.int64)
+    lengths = np.diff(index.indptr)[order]
+    indptr = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    gather = np.repeat(index.indptr[:-1][order] - indptr[:-1], lengths) + np.arange(indptr[-1], dtype=np.int64)
+    return order, indptr, gather
+
+
+def _document_records(index: BM25Index) -> List[bytes]:
+    """JSON records per document, reusing the mapped bytes when the index was opened from disk"""
+    if isinstance(index.documents, MappedDocuments):
+        return [index.documents.raw(i) for i in range(len(index))]
+    return [
+        json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, default=str).encode("utf-8")
+        for doc in index.documents
+    ]
+
+
+def write_index(index: BM25Index, path: str) -> str:
+    """Serialize the index to ``path`` atomically and return the corpus hash recorded"""
+    if index.has_pending_changes:
+        index = index.compact()
+    corpus_hash = index.corpus_hash or compute_corpus_hash(index.documents)
+
+    terms = [""] * len(index.vocabulary)
+    for term, term_id in index.vocabulary.items():
+        terms[term_id] = term
+    order, indptr, gather = _sorted_csr(index, terms)
+
+    vocab_offsets, vocab_blob = _encode_blob([terms[i].encode("utf-8") for i in order])
+    doc_offsets, doc_blob = _encode_blob(_document_records(index))
+    key_offsets, key_blob = _encode_blob([index.doc_keys[i].encode("utf-8") for i in range(len(index))])
+    filter_fields, field_arrays = index.field_index().to_arrays()
+
+    arrays: Dict[str, np.ndarray] = {
+        "vocab_offsets": vocab_offsets,
+        "vocab_blob": np.frombuffer(vocab_blob, dtype=np.uint8),
+        "indptr": indptr,
+        "postings": np.ascontiguousarray(index.postings[gather], dtype=np.int32),
+        "term_freqs": np.ascontiguousarray(index.term_freqs[gather], dtype=np.float32),
+        "doc_lengths": np.ascontiguousarray(index.doc_lengths, dtype=np.float32),
+        "idf": np.ascontiguousarray(index.idf[order], dtype=np.float32),
+        "doc_norms": np.ascontiguousarray(index.doc_norms, dtype=np.float32),
+        "doc_offsets": doc_offsets,
+        "doc_blob": np.frombuffer(doc_blob, dtype=np.uint8),
+        "key_offsets": key_offsets,
+        "key_blob": np.frombuffer(key_blob, dtype=np.uint8),
+        **{f"filter_{name}": array for name, array in field_arrays.items()},
+    }
+
+    header = {
+        "tokenizer_id": index.tokenizer_id,
+        "corpus_hash": corpus_hash,
+        "k1": index.k1,
+        "b": index.b,
+        "avg_doc_length": index.avg_doc_length,
+        "num_docs": len(index),
+        "num_terms": len(terms),
+        "filter_fields": filter_fields,
+    }
+
+    # Section offsets depend on the header length, which depends on the offsets;
+    # reserve space with a fixed-width placeholder pass and then fill it in.
+    def layout(header_length: int) -> Tuple[Dict[str, list], int]:
+        position = _PREAMBLE.size + header_length
+        sections = {}
+        for name, array in arrays.items():
+            position = -(-position // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+            sections[name] = [position, array.dtype.str, int(array.size)]
+            position += array.nbytes
+        return sections, position
+
+    payload_crc = 0
+    for name in sorted(arrays):
+        payload_crc = zlib.crc32(arrays[name].tobytes(), payload_crc)
+    header["payload_crc32"] = payload_crc
+
+    header_length = 0
+    while True:
+        header["sections"], header["file_size"] = layout(header_length)
+        encoded = json.dumps(header, sort_keys=True).encode("utf-8")
+        if len(encoded) <= header_length:
+            encoded = encoded.ljust(header_length, b" ")
+            break
+        header_length = len(encoded) + 64
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, header_length, zlib.crc32(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(header["sections"][name][0])
+            f.write(array.tobytes())
+        f.truncate(header["file_size"])
+    os.replace(tmp_path, path)
+    logging.info(f"BM25 index written to {path} ({header['file_size']} bytes, {len(index)} documents)")
+    return corpus_hash
+
+
+def read_header(buffer) -> dict:
+    """Validate the preamble and return the decoded JSON header"""
+    if len(buffer) < _PREAMBLE.size:
+        raise BM25IndexFormatError("File is too small to be a BM25 index")
+    magic, version, header_length, header_crc = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise BM25IndexFormatError("Bad magic bytes, not a BM25 index file")
+    if version != FORMAT_VERSION:
+        raise StaleBM25IndexError(f"Unsupported BM25 index format version {version}, expected {FORMAT_VERSION}")
+    encoded = bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length])
+    if len(encoded) != header_length or zlib.crc32(encoded) != header_crc:
+        raise BM25IndexFormatError("BM25 index header is truncated or corrupt")
+    header = json.loads(encoded)
+    if header["file_size"] != len(buffer):
+        raise BM25IndexFormatError(f"BM25 index is {len(buffer)} bytes, header expects {header['file_size']}")
+    return header
+
+
+def open_index(path: str, expected_corpus_hash: Optional[str] = None, verify: bool = False) -> BM25Index:
+    """
+    Memory-map an index file. Raises :class:`BM25IndexFormatError` for corrupt or
+    incompatible files and :class:`StaleBM25IndexError` when the tokenizer or corpus
+    hash does not match. ``verify`` additionally checks the payload CRC32.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(buffer)
+
+    if header["tokenizer_id"] not in TOKENIZERS:
+        raise StaleBM25IndexError(f"Index uses unknown tokenizer {header['tokenizer_id']}")
+    if expected_corpus_hash is not None and header["corpus_hash"] != expected_corpus_hash:
+        raise StaleBM25IndexError(f"Index corpus hash {header['corpus_hash'][:12]} does not match {expected_corpus_hash[:12]}")
+
+    arrays = {}
+    for name, (offset, dtype, count) in header["sections"].items():
+        arrays[name] = np.frombuffer(buffer, dtype=np.dtype(dtype), count=count, offset=offset)
+
+    if verify:
+        payload_crc = 0
+        for name in sorted(arrays):
+            payload_crc = zlib.crc32(arrays[name], payload_crc)
+        if payload_crc != header["payload_crc32"]:
+            raise BM25IndexFormatError("BM25 index payload checksum mismatch")
+
+    index = BM25Index(
+        documents=MappedDocuments(arrays["doc_offsets"], memoryview(arrays["doc_blob"])),
+        vocabulary=MappedVocabulary(arrays["vocab_offsets"], memoryview(arrays["vocab_blob"])),
+        indptr=arrays["indptr"],
+        postings=arrays["postings"],
+        term_freqs=arrays["term_freqs"],
+        doc_lengths=arrays["doc_lengths"],
+        k1=header["k1"],
+        b=header["b"],
+        tokenizer_id=header["tokenizer_id"],
+        idf=arrays["idf"],
+        doc_norms=arrays["doc_norms"],
+        avg_doc_length=header["avg_doc_length"],
+        corpus_hash=header["corpus_hash"],
+        doc_keys=MappedStrings(arrays["key_offsets"], memoryview(arrays["key_blob"])),
+        field_index=FieldIndex.from_arrays(
+            header["num_docs"],
+            header["filter_fields"],
+            {name[len("filter_"):]: array for name, array in arrays.items() if name.startswith("filter_")},
+        ),
+    )
+    return index
@@ -0,0 +1,219 @@
+import copy
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from app.ai_component.modules.document_loader import batched
+from app.ai_component.modules.token_utils import CHARS_PER_TOKEN, estimate_tokens
+
+CHUNKING_MODES = ("characters", "tokens")
+
+# Sentence ends and paragraph breaks
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+Section = Tuple[str, Dict]
+
+
+class CharacterSplitter:
+    """Character-based splitting of one section at a time (``chunk_size``/``chunk_overlap`` chars)"""
+
+    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 100):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._splitter = None
+
+    @property
+    def splitter(self) -> RecursiveCharacterTextSplitter:
+        if self._splitter is None:
+            self._splitter = RecursiveCharacterTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        return self._splitter
+
+    def __getstate__(self):
+        # Workers build their own splitter
+        return {**self.__dict__, "_splitter": None}
+
+    def process(self, texts: List[str]) -> List[List[str]]:
+        return [self.splitter.split_text(text) for text in texts]
+
+
+class TokenPacker:
+    """
+    Token-aware chunking of one article at a time. Sections longer than
+    ``max_tokens`` are split at sentence boundaries into pieces of about
+    ``target_tokens``; adjacent sections and pieces are then merged while the
+    result stays within ``target_tokens``, so tiny sections stop being separate,
+    low-information chunks. Token counts are ``estimate_tokens`` estimates
+    (about 4 characters per token), not tokenizer counts: Gemini embeddings have
+    no local tokenizer.
+    """
+
+    def __init__(self, target_tokens: int = 350, max_tokens: int = 512, separator: str = "\n\n"):
+        self.target_tokens = target_tokens
+        self.max_tokens = max(max_tokens, target_tokens)
+        self.separator = separator
+
+    def _sentences(self, text: str) -> Iterator[str]:
+        limit = self.max_tokens * CHARS_PER_TOKEN
+        for sentence in _SENTENCE_BOUNDARY.split(text):
+            sentence = sentence.strip()
+            # A "sentence" longer than max_tokens (lists, tables) is cut at whitespace
+            while len(sentence) > limit:
+                cut = sentence.rfind(" ", 0, limit)
+                cut = cut if cut > 0 else limit
+                yield sentence[:cut]
+                sentence = sentence[cut:].strip()
+            if sentence:
+                yield sentence
+
+    def split_text(self, text: str) -> List[str]:
+        if estimate_tokens(text) <= self.max_tokens:
+            return [text]
+        pieces, current = [], ""
+        for sentence in self._sentences(text):
+            candidate = f"{current} {sentence}" if current else sentence
+            if current and estimate_tokens(candidate) > self.target_tokens:
+                pieces.append(current)
+                candidate = sentence
+            current = candidate
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def pack(self, sections: List[Section]) -> List[Section]:
+        pieces = [(text, metadata) for section_text, metadata in sections for text in self.split_text(section_text)]
+        chunks, texts, metas = [], [], []
+
+        def flush():
+            text = self.separator.join(texts)
+            metadata = copy.deepcopy(metas[0])
+            if len(metas) > 1:
+                metadata["headings"] = list(dict.fromkeys(m.get("heading") for m in metas if m.get("heading")))
+            metadata["estimated_tokens"] = estimate_tokens(text)
+            chunks.append((text, metadata))
+
+        for text, metadata in pieces:
+            if texts and estimate_tokens(self.separator.join(texts + [text])) > self.target_tokens:
+                flush()
+                texts, metas = [], []
+            texts.append(text)
+            metas.append(metadata)
+        if texts:
+            flush()
+        return chunks
+
+    def process(self, articles: List[List[Section]]) -> List[List[Section]]:
+        return [self.pack(sections) for sections in articles]
+
+
+# Stage object of the current pool worker, installed once by _init_worker
+_worker_stage = None
+
+
+def _init_worker(stage):
+    global _worker_stage
+    _worker_stage = stage
+
+
+def _process(units: List) -> List:
+    return _worker_stage.process(units)
+
+
+class Chunker:
+    """
+    Chunking stage between the loader and embedding, in one of two modes:
+
+    characters  sections up to ``chunk_size`` characters pass through unchanged;
+                longer ones are split by one configured character splitter
+    tokens      each article's sections are split at sentence boundaries and
+                merged up to ``target_tokens`` (see TokenPacker); chunks carry
+                ``estimated_tokens`` in their metadata
+
+    Work goes to a process pool when a batch holds at least ``min_parallel``
+    units (oversize sections or articles). Batches stay in input order and at
+    most ``lookahead`` are in flight, so chunks stream onward while later
+    sections are still being split.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 2000,
+        chunk_overlap: int = 100,
+        workers: int = 1,
+        batch_size: int = 256,
+        min_parallel: int = 16,
+        mode: str = "characters",
+        target_tokens: int = 350,
+        max_tokens: int = 512,
+    ):
+        if mode not in CHUNKING_MODES:
+            raise ValueError(f"Invalid chunking mode: {mode}. Use one of {CHUNKING_MODES}")
+        self.chunk_size = chunk_size
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.min_parallel = min_parallel
+        self.lookahead = 2 * self.workers
+        if mode == "tokens":
+            self.stage = TokenPacker(target_tokens=target_tokens, max_tokens=max_tokens)
+        else:
+            self.stage = CharacterSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # spawn: worker processes must not inherit gRPC channels and threads from the parent
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.stage,),
+        )
+
+    def _units(self, batch: List) -> List:
+        """What one batch sends to the stage: oversize texts, or whole articles"""
+        if self.mode == "tokens":
+            return [[(doc.page_content, doc.metadata) for doc in article] for article in batch]
+        return [doc.page_content for doc in batch if len(doc.page_content) > self.chunk_size]
+
+    def _merge(self, batch: List, results) -> Iterator[Document]:
+        results = results.result() if isinstance(results, Future) else results
+        if self.mode == "tokens":
+            for chunks in results:
+                for text, metadata in chunks:
+                    yield Document(page_content=text, metadata=metadata)
+            return
+        splits = iter(results)
+        for doc in batch:
+            if len(doc.page_content) > self.chunk_size:
+                for text in next(splits):
+                    yield Document(page_content=text, metadata=copy.deepcopy(doc.metadata))
+            else:
+                yield doc
+
+    def _batches(self, documents: Iterable[Document]) -> Iterator[List]:
+        if self.mode == "tokens":
+            # Sections of one article arrive together; never merge across articles
+            articles = (list(group) for _, group in groupby(documents, key=lambda doc: doc.metadata.get("url")))
+            return batched(articles, max(1, self.batch_size // 8))
+        return batched(documents, self.batch_size)
+
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        executor: Optional[ProcessPoolExecutor] = None
+        pending = deque()
+        try:
+            for batch in self._batches(documents):
+                units = self._units(batch)
+                if executor is None and (self.workers == 1 or len(units) < self.min_parallel):
+                    pending.append((batch, self.stage.process(units)))
+                else:
+                    executor = executor or self._executor()
+                    pending.append((batch, executor.submit(_process, units)))
+                while pending and (len(pending) > self.lookahead or not isinstance(pending[0][1], Future)):
+                    yield from self._merge(*pending.popleft())
+            while pending:
+                yield from self._merge(*pending.popleft())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
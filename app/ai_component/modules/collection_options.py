@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+from qdrant_client import models
+from app.ai_component.config import (
+    qdrant_quantization, qdrant_quantization_quantile, qdrant_quantization_always_ram,
+    qdrant_rescore, qdrant_oversampling, qdrant_on_disk_vectors, qdrant_on_disk_payload,
+    qdrant_hnsw_m, qdrant_hnsw_ef_construct, qdrant_search_ef,
+)
+
+QUANTIZATION_MODES = (None, "scalar", "binary")
+
+
+@dataclass(frozen=True)
+class CollectionOptions:
+    """
+    Storage and index settings for a Qdrant collection.
+
+    quantization      None, "scalar" (int8) or "binary"; the original vectors are kept,
+                      so searches can rescore the quantized candidates against them
+    on_disk_vectors   keep original vectors on disk (memory-mapped) instead of RAM
+    on_disk_payload   keep payloads on disk
+    hnsw_m / hnsw_ef_construct   HNSW graph build parameters (Qdrant defaults if None)
+    search_ef         HNSW beam width at query time (Qdrant default if None)
+    """
+    quantization: Optional[str] = None
+    quantile: float = 0.99
+    always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    search_ef: Optional[int] = None
+
+    def __post_init__(self):
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Invalid quantization: {self.quantization}. Use one of {QUANTIZATION_MODES}")
+
+    @classmethod
+    def from_config(cls) -> "CollectionOptions":
+        return cls(
+            quantization=qdrant_quantization,
+            quantile=qdrant_quantization_quantile,
+            always_ram=qdrant_quantization_always_ram,
+            rescore=qdrant_rescore,
+            oversampling=qdrant_oversampling,
+            on_disk_vectors=qdrant_on_disk_vectors,
+            on_disk_payload=qdrant_on_disk_payload,
+            hnsw_m=qdrant_hnsw_m,
+            hnsw_ef_construct=qdrant_hnsw_ef_construct,
+            search_ef=qdrant_search_ef,
+        )
+
+    def quantization_config(self) -> Optional[Union[models.ScalarQuantization, models.BinaryQuantization]]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=self.quantile, always_ram=self.always_ram,
+            ))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=self.always_ram))
+        return None
+
+    def hnsw_config(self) -> Optional[models.HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def create_collection_kwargs(self, vector_size: int) -> Dict[str, Any]:
+        """Keyword arguments for ``QdrantClient.create_collection``"""
+        return {
+            "vectors_config": models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=self.on_disk_vectors or None),
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config(),
+            "on_disk_payload": self.on_disk_payload or None,
+        }
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        """Query-time parameters: HNSW ef and rescoring of quantized candidates"""
+        quantization = None
+        if self.quantization is not None:
+            quantization = models.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        if quantization is None and self.search_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+    def estimated_ram_bytes(self, num_vectors: int, vector_size: int) -> int:
+        """
+        Rough resident size of the vector data: original vectors unless on disk, the
+        quantized copy when kept in RAM, and HNSW links (about 2*m neighbours on layer 0).
+        """
+        total = 0 if self.on_disk_vectors else num_vectors * vector_size * 4
+        if self.quantization == "scalar" and self.always_ram:
+            total += num_vectors * vector_size
+        elif self.quantization == "binary" and self.always_ram:
+            total += num_vectors * ((vector_size + 7) // 8)
+        total += num_vectors * 2 * (self.hnsw_m or 16) * 4
+        return total
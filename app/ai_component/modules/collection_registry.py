@@ -0,0 +1,137 @@
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import Qdrant
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from app.ai_component.modules.cache import TTLCache
+from app.ai_component.logger import logging
+from app.ai_component.exception import CustomException
+
+
+@dataclass(frozen=True)
+class CollectionInfo:
+    """Cached existence and vector schema of a Qdrant collection"""
+    name: str
+    exists: bool
+    vector_size: Optional[int] = None
+    distance: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CollectionHandle:
+    """Long-lived per-collection objects; ``k`` is always passed per call, never stored here"""
+    info: CollectionInfo
+    vectorstore: Qdrant
+
+
+class CollectionRegistry:
+    """
+    Builds one langchain ``Qdrant`` wrapper per collection and caches collection
+    existence/schema with a short TTL, so a search does not list every collection
+    over HTTP before it runs. Writers call ``invalidate`` after creating a collection.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        embeddings: Embeddings,
+        async_client_factory: Optional[Callable[[], AsyncQdrantClient]] = None,
+        ttl: Optional[float] = 30.0,
+    ):
+        self.client = client
+        self.async_client_factory = async_client_factory
+        self.embeddings = embeddings
+        self._info = TTLCache(max_size=256, ttl=ttl)
+        self._vectorstores = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _info_from_response(collection_name: str, response) -> CollectionInfo:
+        vectors = response.config.params.vectors
+        if isinstance(vectors, dict):
+            # Named vectors: langchain_qdrant uses the unnamed one, fall back to the first
+            vectors = vectors.get("") or next(iter(vectors.values()), None)
+        if vectors is None:
+            return CollectionInfo(name=collection_name, exists=True)
+        distance = getattr(vectors.distance, "value", vectors.distance)
+        return CollectionInfo(name=collection_name, exists=True, vector_size=vectors.size, distance=str(distance))
+
+    def describe(self, collection_name: str) -> CollectionInfo:
+        """Existence and schema of a collection, served from cache within the TTL"""
+        info = self._info.get(collection_name)
+        if info is not None:
+            return info
+        try:
+            if self.client.collection_exists(collection_name):
+                info = self._info_from_response(collection_name, self.client.get_collection(collection_name))
+            else:
+                info = CollectionInfo(name=collection_name, exists=False)
+        except Exception as e:
+            logging.error(f"Error checking collection existence: {str(e)}")
+            # Do not cache a failed lookup
+            return CollectionInfo(name=collection_name, exists=False)
+        self._info.set(collection_name, info)
+        return info
+
+    async def adescribe(self, collection_name: str) -> CollectionInfo:
+        """Async variant of ``describe`` sharing the same cache"""
+        info = self._info.get(collection_name)
+        if info is not None:
+            return info
+        if self.async_client_factory is None:
+            return self.describe(collection_name)
+        try:
+            async_client = self.async_client_factory()
+            if await async_client.collection_exists(collection_name):
+                response = await async_client.get_collection(collection_name)
+                info = self._info_from_response(collection_name, response)
+            else:
+                info = CollectionInfo(name=collection_name, exists=False)
+        except Exception as e:
+            logging.error(f"Error checking collection existence: {str(e)}")
+            return CollectionInfo(name=collection_name, exists=False)
+        self._info.set(collection_name, info)
+        return info
+
+    def set_embeddings(self, embeddings: Embeddings):
+        """Swap the embeddings client; wrappers built with the old one are dropped"""
+        with self._lock:
+            self.embeddings = embeddings
+            self._vectorstores.clear()
+
+    def exists(self, collection_name: str) -> bool:
+        return self.describe(collection_name).exists
+
+    async def aexists(self, collection_name: str) -> bool:
+        return (await self.adescribe(collection_name)).exists
+
+    def _vectorstore(self, collection_name: str) -> Qdrant:
+        with self._lock:
+            vectorstore = self._vectorstores.get(collection_name)
+            if vectorstore is None:
+                vectorstore = Qdrant(client=self.client, collection_name=collection_name, embeddings=self.embeddings)
+                self._vectorstores[collection_name] = vectorstore
+            return vectorstore
+
+    def get(self, collection_name: str) -> Optional[CollectionHandle]:
+        """Handle for an existing collection, or None if it does not exist"""
+        try:
+            info = self.describe(collection_name)
+            if not info.exists:
+                return None
+            return CollectionHandle(info=info, vectorstore=self._vectorstore(collection_name))
+        except Exception as e:
+            logging.error(f"Error building collection handle: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Forget cached metadata (and the wrapper) for one collection, or for all of them"""
+        with self._lock:
+            if collection_name is None:
+                self._info.clear()
+                self._vectorstores.clear()
+            else:
+                self._info.pop(collection_name)
+                self._vectorstores.pop(collection_name, None)
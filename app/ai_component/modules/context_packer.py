@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional
+from langchain.schema import Document
+from app.ai_component.modules.token_utils import CHARS_PER_TOKEN, estimate_tokens
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class PackedContext:
+    """Prompt context that fits the token budget, plus what packing saved"""
+    text: str
+    documents: List[Document]
+    tokens_used: int
+    tokens_retrieved: int
+    duplicates_dropped: int = 0
+    over_budget_dropped: int = 0
+    truncated: int = 0
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_retrieved - self.tokens_used)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokens_used": self.tokens_used,
+            "tokens_retrieved": self.tokens_retrieved,
+            "tokens_saved": self.tokens_saved,
+            "chunks_used": len(self.documents),
+            "duplicates_dropped": self.duplicates_dropped,
+            "over_budget_dropped": self.over_budget_dropped,
+            "truncated": self.truncated,
+        }
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into prompt context under a token budget: chunks are ordered
+    by fused score, near-identical or heavily overlapping chunks are dropped (word
+    5-gram containment), and the budget is filled greedily, trimming the last chunk
+    that fits only partly at a sentence boundary.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        dedupe_threshold: float = 0.8,
+        min_chunk_tokens: int = 64,
+        shingle_size: int = 5,
+        separator: str = "\n\n",
+    ):
+        self.token_budget = token_budget
+        self.dedupe_threshold = dedupe_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+        self.shingle_size = shingle_size
+        self.separator = separator
+
+    def _shingles(self, text: str) -> FrozenSet:
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return frozenset([tuple(words)]) if words else frozenset()
+        return frozenset(tuple(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1))
+
+    def _is_duplicate(self, shingles: FrozenSet, kept: List[FrozenSet]) -> bool:
+        """Containment rather than Jaccard, so a chunk mostly inside a longer one also counts"""
+        if not shingles:
+            return True
+        for other in kept:
+            overlap = len(shingles & other)
+            if overlap and overlap / min(len(shingles), len(other)) >= self.dedupe_threshold:
+                return True
+        return False
+
+    @staticmethod
+    def _ranked(documents: List[Document]) -> List[Document]:
+        """Highest fused score first; retrieval order breaks ties and covers unscored results"""
+        return sorted(documents, key=lambda doc: -float(doc.metadata.get("fused_score", 0.0)))
+
+    def _truncate(self, text: str, max_tokens: int) -> Optional[str]:
+        """Longest prefix of whole sentences within max_tokens, or None if not even one fits"""
+        limit = max_tokens * CHARS_PER_TOKEN
+        kept = ""
+        for sentence in _SENTENCE_END.split(text):
+            candidate = f"{kept} {sentence}" if kept else sentence
+            if len(candidate) > limit:
+                break
+            kept = candidate
+        return kept or None
+
+    def pack(self, documents: List[Document], token_budget: Optional[int] = None) -> PackedContext:
+        budget = self.token_budget if token_budget is None else token_budget
+        separator_tokens = estimate_tokens(self.separator)
+        tokens_retrieved = estimate_tokens(self.separator.join(doc.page_content for doc in documents))
+
+        kept_shingles: List[FrozenSet] = []
+        packed: List[Document] = []
+        parts: List[str] = []
+        used = duplicates = over_budget = truncated = 0
+        for doc in self._ranked(documents):
+            shingles = self._shingles(doc.page_content)
+            if self._is_duplicate(shingles, kept_shingles):
+                duplicates += 1
+                continue
+
+            cost = estimate_tokens(doc.page_content) + (separator_tokens if parts else 0)
+            text = doc.page_content
+            if used + cost > budget:
+                remaining = budget - used - (separator_tokens if parts else 0)
+                text = self._truncate(doc.page_content, remaining) if remaining >= self.min_chunk_tokens else None
+                if text is None:
+                    # A shorter, lower-ranked chunk may still fit
+                    over_budget += 1
+                    continue
+                truncated += 1
+                cost = estimate_tokens(text) + (separator_tokens if parts else 0)
+
+            kept_shingles.append(shingles)
+            packed.append(doc if text is doc.page_content else Document(page_content=text, metadata=doc.metadata))
+            parts.append(text)
+            used += cost
+
+        context = self.separator.join(parts)
+        sources = list(dict.fromkeys(doc.metadata.get("url") for doc in packed if doc.metadata.get("url")))
+        return PackedContext(
+            text=context,
+            documents=packed,
+            tokens_used=estimate_tokens(context),
+            tokens_retrieved=tokens_retrieved,
+            duplicates_dropped=duplicates,
+            over_budget_dropped=over_budget,
+            truncated=truncated,
+            sources=sources,
+        )
@@ -0,0 +1,188 @@
+import argparse
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+from langchain.schema import Document
+from app.ai_component.config import dedupe_threshold, dedupe_num_perm, dedupe_shingle_size, embedding_dim
+from app.ai_component.modules.document_ids import document_id
+from app.ai_component.modules.token_utils import estimate_tokens
+
+_WORD = re.compile(r"\w+")
+# Mersenne prime 2^31 - 1: a * x + b stays below 2^64 for 32-bit shingle hashes
+_PRIME = np.uint64((1 << 31) - 1)
+_MAX_HASH = np.uint32((1 << 32) - 1)
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm whose S-curve threshold
+    (1 / bands) ** (1 / rows) is closest to ``threshold``
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """MinHash signatures over lowercased word ``shingle_size``-grams, ``num_perm`` universal hash permutations"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        n = self.shingle_size
+        if len(words) <= n:
+            return [" ".join(words)] if words else []
+        return [" ".join(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+    def signature(self, text: str) -> np.ndarray:
+        """(num_perm,) uint32 signature; all ``_MAX_HASH`` for a text without words"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.unique(np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64))
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+@dataclass
+class DedupeStats:
+    """
+    What one dedupe pass dropped. Skipped tokens are embedding spend saved;
+    index bytes count the dropped vectors (float32) plus their page text.
+    """
+    chunks: int = 0
+    duplicates: int = 0
+    tokens: int = 0
+    duplicate_tokens: int = 0
+    duplicate_text_bytes: int = 0
+    embedding_dim: int = embedding_dim
+
+    @property
+    def index_bytes_saved(self) -> int:
+        return self.duplicates * self.embedding_dim * 4 + self.duplicate_text_bytes
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "chunks": self.chunks,
+            "duplicates": self.duplicates,
+            "kept": self.chunks - self.duplicates,
+            "duplicate_ratio": round(self.duplicates / self.chunks, 4) if self.chunks else 0.0,
+            "tokens": self.tokens,
+            "embedding_tokens_saved": self.duplicate_tokens,
+            "embedding_spend_saved_ratio": round(self.duplicate_tokens / self.tokens, 4) if self.tokens else 0.0,
+            "index_bytes_saved": self.index_bytes_saved,
+        }
+
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate removal with MinHash + LSH. The first chunk seen of
+    a group is canonical and passes through; a later chunk whose estimated
+    Jaccard similarity to a canonical candidate (from any shared LSH band) is at
+    least ``threshold`` is dropped and its source recorded for that canonical.
+
+    Canonical chunks are yielded as they arrive and are not modified while the
+    stream is running, since embedding and upserts may still be reading them.
+    Call ``annotate`` afterwards to add ``duplicate_sources`` to their metadata.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 5):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Invalid dedupe threshold: {threshold}. Use a value in (0, 1]")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._ids: List[str] = []
+        self.duplicate_sources: Dict[str, List[Dict]] = {}
+        self.stats = DedupeStats()
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _match(self, signature: np.ndarray, keys: List[bytes]) -> int:
+        """Index of the most similar canonical at or above the threshold, else -1"""
+        candidates = set()
+        for band, key in zip(self._buckets, keys):
+            candidates.update(band.get(key, ()))
+        best, best_similarity = -1, self.threshold
+        for index in candidates:
+            similarity = float(np.mean(self._signatures[index] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = index, similarity
+        return best
+
+    def filter(self, documents: Iterable[Document]) -> Iterator[Document]:
+        for doc in documents:
+            tokens = estimate_tokens(doc.page_content)
+            self.stats.chunks += 1
+            self.stats.tokens += tokens
+            signature = self.hasher.signature(doc.page_content)
+            keys = self._band_keys(signature)
+            match = self._match(signature, keys)
+            if match >= 0:
+                self.stats.duplicates += 1
+                self.stats.duplicate_tokens += tokens
+                self.stats.duplicate_text_bytes += len(doc.page_content.encode("utf-8"))
+                self.duplicate_sources.setdefault(self._ids[match], []).append({
+                    "source": doc.metadata.get("source"),
+                    "url": doc.metadata.get("url"),
+                    "heading": doc.metadata.get("heading"),
+                })
+                continue
+            index = len(self._signatures)
+            self._signatures.append(signature)
+            self._ids.append(document_id(doc))
+            for band, key in zip(self._buckets, keys):
+                band.setdefault(key, []).append(index)
+            yield doc
+
+    def annotate(self, documents: Iterable[Document]) -> List[Document]:
+        """Set ``duplicate_sources`` on the canonical chunks among ``documents``; returns the ones changed"""
+        changed = []
+        for doc in documents:
+            sources = self.duplicate_sources.get(document_id(doc))
+            if sources:
+                doc.metadata["duplicate_sources"] = sources
+                changed.append(doc)
+        return changed
+
+
+def build_dedupe_filter(threshold: float = dedupe_threshold):
+    """The configured filter, or None when dedupe is disabled (threshold 0, the default)"""
+    if not threshold:
+        return None
+    return NearDuplicateFilter(threshold=threshold, num_perm=dedupe_num_perm, shingle_size=dedupe_shingle_size)
+
+
+if __name__ == "__main__":
+    from app.ai_component.modules.chunking import Chunker
+    from app.ai_component.modules.document_loader import iter_documents
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate chunks in a scraped corpus without embedding it")
+    parser.add_argument("file_path", type=str, help="JSON corpus in load_json_file format")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[dedupe_threshold or 0.85])
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    args = parser.parse_args()
+
+    chunks = list(Chunker(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap).iter_chunks(iter_documents(args.file_path)))
+    for threshold in args.threshold:
+        dedupe = NearDuplicateFilter(threshold=threshold, num_perm=dedupe_num_perm, shingle_size=dedupe_shingle_size)
+        for _ in dedupe.filter(chunks):
+            pass
+        print(json.dumps({"threshold": threshold, **dedupe.stats.as_dict()}))
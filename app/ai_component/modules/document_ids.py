@@ -0,0 +1,23 @@
+import hashlib
+import uuid
+from typing import Optional
+from langchain.schema import Document
+
+
+def make_chunk_id(url: str, heading: Optional[str], content: str) -> str:
+    """Deterministic id for a chunk from its source URL, section heading and text"""
+    key = f"{url or ''}\x1f{heading or ''}\x1f{content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def document_id(doc: Document) -> str:
+    """Stable id of a document: ``metadata['chunk_id']`` if set, else derived from its content"""
+    chunk_id = doc.metadata.get("chunk_id")
+    if chunk_id:
+        return str(chunk_id)
+    return make_chunk_id(doc.metadata.get("url", ""), doc.metadata.get("heading"), doc.page_content)
+
+
+def point_id(doc: Document) -> str:
+    """Qdrant point id (a UUID) for a document, so re-ingesting it overwrites rather than duplicates"""
+    return str(uuid.UUID(hex=document_id(doc)))
@@ -0,0 +1,129 @@
+import json
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+from langchain.schema import Document
+from app.ai_component.logger import logging
+
+READ_SIZE = 1 << 16
+
+
+def iter_json_records(file_path: str, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Top-level records of a JSON file, parsed incrementally: the elements of a
+    top-level array, or a sequence of values (a single object or JSON Lines).
+    Only the record being parsed is held in memory, never the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as file:
+        buffer = file.read(read_size)
+        eof = not buffer
+        pos = 0
+        in_array = None
+        while True:
+            # Skip whitespace, and the commas between array elements
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ",")):
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    if in_array:
+                        raise ValueError(f"Unterminated JSON array in {file_path}")
+                    return
+                buffer = file.read(read_size)
+                eof = not buffer
+                pos = 0
+                continue
+
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                    continue
+            if in_array and buffer[pos] == "]":
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # The record runs past the buffer; read at least as much again so long records stay linear
+                chunk = file.read(max(read_size, len(buffer) - pos))
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            yield record
+            pos = end
+            if pos >= read_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def section_documents(item: Dict) -> Iterator[Document]:
+    """One Document per non-empty section of a scraped article"""
+    if not isinstance(item, dict) or not isinstance(item.get('sections'), list):
+        return
+
+    article_source = item.get('source', 'unknown')
+    article_url = item.get('url', '')
+    article_title = item.get('title', '')
+
+    for section in item['sections']:
+        if not isinstance(section, dict) or 'content' not in section:
+            continue
+        section_heading = section.get('heading', None)
+        section_content = section.get('content', [])
+        if isinstance(section_content, list):
+            content_text = '\n'.join(str(c) for c in section_content if c)
+        else:
+            content_text = str(section_content) if section_content else ''
+
+        if not content_text.strip():
+            continue
+
+        if section_heading:
+            formatted_content = f"Heading: {section_heading}\n\nContent: {content_text}"
+        else:
+            formatted_content = f"Content: {content_text}"
+
+        metadata = {
+            'source': article_source,
+            'url': article_url,
+            'title': article_title,
+            'heading': section_heading,
+            'extraction_status': item.get('extraction_status', 'unknown')
+        }
+        yield Document(page_content=formatted_content, metadata=metadata)
+
+
+def iter_documents(file_path: str) -> Iterator[Document]:
+    """
+    Stream section Documents from a scraped JSON (array or single article) or
+    JSON Lines file, one article at a time.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File {file_path} not found")
+
+    def generate() -> Iterator[Document]:
+        logging.info(f"Processing file: {file_path}")
+        count = 0
+        for item in iter_json_records(file_path):
+            for doc in section_documents(item):
+                count += 1
+                yield doc
+        logging.info(f"Loaded {count} documents from {file_path}")
+
+    return generate()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Consecutive lists of up to ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
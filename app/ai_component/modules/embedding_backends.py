@@ -0,0 +1,108 @@
+import asyncio
+import re
+import zlib
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.ai_component.config import embedding_backend, embedding_model, embedding_dim
+
+EMBEDDING_BACKENDS = ("google", "hashed_ngram")
+
+_WORD = re.compile(r"\w+")
+
+
+class HashedNGramEmbeddings(Embeddings):
+    """
+    Deterministic, offline embeddings: word unigrams, word bigrams and character
+    trigrams are hashed (CRC32) into ``dim`` signed buckets with sublinear term
+    weights, then L2-normalised. Texts sharing words or word pieces get similar
+    vectors, which is enough to exercise ingestion and retrieval end to end
+    without an API key; it is not a substitute for a semantic model.
+    """
+
+    def __init__(self, dim: int = embedding_dim, char_ngram: int = 3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.model = f"hashed-ngram-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        features = [f"w:{word}" for word in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        n = self.char_ngram
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def _vector(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint32)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            buckets, counts = np.unique(hashes, return_counts=True)
+            signs = np.where(buckets & 0x80000000, 1.0, -1.0).astype(np.float32)
+            np.add.at(vector, (buckets % self.dim).astype(np.int64), signs * (1.0 + np.log(counts)).astype(np.float32))
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self._vector(text)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+class LoopSafeGoogleEmbeddings(GoogleGenerativeAIEmbeddings):
+    """
+    Gemini embeddings whose async methods run the sync client in a worker thread.
+    The stock async methods use a grpc.aio channel bound to the event loop the client
+    was built on (the DataStore is built off the loop by warmup), so awaiting them
+    from any other loop fails with "attached to a different loop".
+    """
+
+    async def aembed_query(self, text: str, **kwargs) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text, **kwargs)
+
+    async def aembed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts, **kwargs)
+
+
+def _build_google_embeddings(model: str, google_api_key: Optional[str]) -> GoogleGenerativeAIEmbeddings:
+    try:
+        return LoopSafeGoogleEmbeddings(model=model, google_api_key=google_api_key)
+    except RuntimeError as e:
+        if "event loop" not in str(e).lower():
+            raise
+        # Its async gRPC channel needs an event loop; worker threads (e.g. Streamlit's script runner) have none
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        return LoopSafeGoogleEmbeddings(model=model, google_api_key=google_api_key)
+
+
+def build_embeddings(
+    backend: str = embedding_backend,
+    google_api_key: Optional[str] = None,
+    model: str = embedding_model,
+    dim: int = embedding_dim,
+) -> Embeddings:
+    """Embeddings client for the configured backend: "google" (Gemini API) or "hashed_ngram" (local)"""
+    if backend == "google":
+        return _build_google_embeddings(model, google_api_key)
+    if backend == "hashed_ngram":
+        return HashedNGramEmbeddings(dim=dim)
+    raise ValueError(f"Invalid embedding backend: {backend}. Use one of {EMBEDDING_BACKENDS}")
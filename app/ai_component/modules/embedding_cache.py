@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import inspect
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.ai_component.modules.cache import TTLCache
+from app.ai_component.logger import logging
+from app.ai_component.exception import CustomException
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Unicode-normalise and collapse whitespace so trivially different queries share a key"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class DiskEmbeddingTier:
+    """SQLite-backed second tier for query embeddings, shared across restarts"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "model TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (model, query))"
+        )
+        self._conn.commit()
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE model = ? AND query = ?", (model, query)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and row[1] + self.ttl <= time.time():
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def set(self, model: str, query: str, vector: List[float]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, vector, created_at) VALUES (?, ?, ?, ?)",
+                (model, query, np.asarray(vector, dtype=np.float32).tobytes(), time.time()),
+            )
+            self._conn.commit()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentEmbeddingStore:
+    """
+    Persistent SQLite store of document embeddings keyed by (model, SHA-256 of the
+    text), so re-indexing identical chunks never calls the embeddings API twice.
+    ``last_used`` is refreshed on hits, and ``prune`` evicts least recently used
+    rows by size or age.
+    """
+
+    _MAX_PARAMS = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS document_embeddings_last_used ON document_embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        now = time.time()
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), self._MAX_PARAMS):
+                part = unique[start:start + self._MAX_PARAMS]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM document_embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *part),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE document_embeddings SET last_used = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                        (now, model, *part),
+                    )
+            self._conn.commit()
+        return found
+
+    def set_many(self, model: str, items: Dict[str, List[float]]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO document_embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def size(self) -> Dict[str, Any]:
+        """Entries and vector bytes per model, plus the database file size"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, COUNT(*), SUM(LENGTH(vector)) FROM document_embeddings GROUP BY model"
+            ).fetchall()
+        models = {model: {"entries": count, "vector_bytes": total or 0} for model, count, total in rows}
+        file_bytes = sum(
+            os.path.getsize(path) for path in (self.path, f"{self.path}-wal") if os.path.exists(path)
+        )
+        return {
+            "path": self.path,
+            "entries": sum(m["entries"] for m in models.values()),
+            "vector_bytes": sum(m["vector_bytes"] for m in models.values()),
+            "file_bytes": file_bytes,
+            "models": models,
+        }
+
+    def prune(self, max_bytes: Optional[int] = None, older_than: Optional[float] = None, model: Optional[str] = None) -> int:
+        """
+        Delete rows not used for ``older_than`` seconds, rows of ``model`` (e.g. a retired
+        one), then least recently used rows until vectors fit in ``max_bytes``. Returns
+        the number of rows removed.
+        """
+        removed = 0
+        with self._lock:
+            if older_than is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM document_embeddings WHERE last_used < ?", (time.time() - older_than,)
+                ).rowcount
+            if model is not None:
+                removed += self._conn.execute("DELETE FROM document_embeddings WHERE model = ?", (model,)).rowcount
+            if max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM document_embeddings").fetchone()[0]
+                if total > max_bytes:
+                    # Walk rows from least recently used until enough bytes are freed
+                    excess, victims = total - max_bytes, []
+                    for rowid, length in self._conn.execute(
+                        "SELECT rowid, LENGTH(vector) FROM document_embeddings ORDER BY last_used, rowid"
+                    ):
+                        victims.append(rowid)
+                        excess -= length
+                        if excess <= 0:
+                            break
+                    for start in range(0, len(victims), self._MAX_PARAMS):
+                        part = victims[start:start + self._MAX_PARAMS]
+                        removed += self._conn.execute(
+                            f"DELETE FROM document_embeddings WHERE rowid IN ({','.join('?' * len(part))})", part
+                        ).rowcount
+            self._conn.commit()
+            if removed:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.execute("VACUUM")
+        return removed
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings client with a bounded in-memory LRU/TTL cache for queries,
+    keyed by (model name, normalised query text), plus an optional SQLite disk tier.
+    Documents go through an optional persistent DocumentEmbeddingStore, so only
+    text not embedded before by the same model reaches the client.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: Optional[str] = None,
+        max_size: int = 2048,
+        ttl: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        disk_ttl: Optional[float] = None,
+        document_store_path: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = DiskEmbeddingTier(disk_path, ttl=disk_ttl) if disk_path else None
+        self.disk_hits = 0
+        self.document_store = DocumentEmbeddingStore(document_store_path) if document_store_path else None
+        self.document_hits = 0
+        self.document_misses = 0
+
+    def _lookup(self, query: str) -> Optional[List[float]]:
+        key = (self.model_name, query)
+        vector = self.cache.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(self.model_name, query)
+            if vector is not None:
+                self.disk_hits += 1
+                self.cache.set(key, vector)
+        return vector
+
+    def _store(self, query: str, vector: List[float]):
+        self.cache.set((self.model_name, query), vector)
+        if self.disk is not None:
+            try:
+                self.disk.set(self.model_name, query, vector)
+            except sqlite3.Error as e:
+                logging.warning(f"Could not write query embedding to disk cache: {str(e)}")
+
+    def embed_query(self, text: str) -> List[float]:
+        try:
+            query = normalize_query(text)
+            vector = self._lookup(query)
+            if vector is None:
+                vector = self.embeddings.embed_query(query)
+                self._store(query, vector)
+            return vector
+        except Exception as e:
+            logging.error(f"Error embedding query: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    async def aembed_query(self, text: str) -> List[float]:
+        try:
+            query = normalize_query(text)
+            vector = self._lookup(query)
+            if vector is None:
+                vector = await self.embeddings.aembed_query(query)
+                self._store(query, vector)
+            return vector
+        except Exception as e:
+            logging.error(f"Error embedding query: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def _embed_query_batch(self, queries: List[str]) -> List[List[float]]:
+        """One batched request for several queries when the client can embed with the query task type"""
+        if "task_type" in inspect.signature(self.embeddings.embed_documents).parameters:
+            return self.embeddings.embed_documents(queries, task_type="RETRIEVAL_QUERY")
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries, sending only the distinct cache misses in a single batch"""
+        try:
+            queries = [normalize_query(text) for text in texts]
+            vectors = {}
+            for query in queries:
+                if query not in vectors:
+                    vectors[query] = self._lookup(query)
+            misses = [query for query, vector in vectors.items() if vector is None]
+            if misses:
+                for query, vector in zip(misses, self._embed_query_batch(misses)):
+                    self._store(query, vector)
+                    vectors[query] = vector
+            return [vectors[query] for query in queries]
+        except Exception as e:
+            logging.error(f"Error embedding queries: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def _document_lookup(self, texts: List[str]) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """Text hashes, the vectors already in the document store, and the distinct texts still to embed"""
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.document_store.get_many(self.model_name, hashes)
+        misses = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in misses:
+                misses[key] = text
+        return hashes, vectors, misses
+
+    def _document_write_back(
+        self, hashes: List[str], vectors: Dict[str, List[float]], misses: Dict[str, str], embedded: List[List[float]]
+    ) -> List[List[float]]:
+        """Persist newly embedded vectors and return one vector per input text"""
+        if misses:
+            embedded = dict(zip(misses, embedded))
+            self.document_store.set_many(self.model_name, embedded)
+            vectors.update(embedded)
+        self.document_hits += len(hashes) - len(misses)
+        self.document_misses += len(misses)
+        return [vectors[key] for key in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.document_store is None:
+            return self.embeddings.embed_documents(texts)
+        try:
+            hashes, vectors, misses = self._document_lookup(texts)
+            embedded = self.embeddings.embed_documents(list(misses.values())) if misses else []
+            return self._document_write_back(hashes, vectors, misses, embedded)
+        except Exception as e:
+            logging.error(f"Error embedding documents: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.document_store is None:
+            return await self.embeddings.aembed_documents(texts)
+        try:
+            # SQLite reads and writes run in a worker thread, off the event loop
+            hashes, vectors, misses = await asyncio.to_thread(self._document_lookup, texts)
+            embedded = await self.embeddings.aembed_documents(list(misses.values())) if misses else []
+            return await asyncio.to_thread(self._document_write_back, hashes, vectors, misses, embedded)
+        except Exception as e:
+            logging.error(f"Error embedding documents: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["model"] = self.model_name
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_path"] = self.disk.path if self.disk is not None else None
+        stats["document_hits"] = self.document_hits
+        stats["document_misses"] = self.document_misses
+        stats["document_store"] = self.document_store.size() if self.document_store is not None else None
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app.ai_component.config import document_embedding_store_path
+
+    parser = argparse.ArgumentParser(description="Report the size of, or prune, the document embedding store")
+    parser.add_argument("--path", type=str, default=document_embedding_store_path)
+    parser.add_argument("--max-mb", type=float, default=None, help="Evict least recently used vectors beyond this size")
+    parser.add_argument("--older-than-days", type=float, default=None, help="Evict vectors unused for this long")
+    parser.add_argument("--model", type=str, default=None, help="Evict every vector of this model")
+    args = parser.parse_args()
+
+    store = DocumentEmbeddingStore(args.path)
+    if args.max_mb is not None or args.older_than_days is not None or args.model is not None:
+        removed = store.prune(
+            max_bytes=int(args.max_mb * 2**20) if args.max_mb is not None else None,
+            older_than=args.older_than_days * 86400 if args.older_than_days is not None else None,
+            model=args.model,
+        )
+        print(f"Pruned {removed} embeddings")
+    print(json.dumps(store.size(), indent=2))
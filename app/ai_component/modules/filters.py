@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
+from qdrant_client import models
+from app.ai_component.config import payload_index_fields
+
+# Metadata fields written by load_json_file; these get posting lists / payload indexes
+DEFAULT_FILTER_FIELDS = tuple(payload_index_fields)
+
+# {"source": "mayo_clinic"} or {"source": ["mayo_clinic", "nih_ncbi"], "title": "..."}:
+# values of one field are OR-ed, fields are AND-ed
+MetadataFilter = Mapping[str, Union[str, Sequence[str]]]
+NormalizedFilter = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+def normalize_filter(filter: Optional[MetadataFilter]) -> Optional[NormalizedFilter]:
+    """Canonical, hashable form of a metadata filter (also used in cache keys)"""
+    if not filter:
+        return None
+    normalized = []
+    for field, values in sorted(filter.items()):
+        if isinstance(values, (str, int, float, bool)):
+            values = [values]
+        values = tuple(sorted({str(value) for value in values}))
+        if not values:
+            raise ValueError(f"Filter on '{field}' has no values")
+        normalized.append((field, values))
+    return tuple(normalized)
+
+
+def to_qdrant_filter(filter: Optional[MetadataFilter], payload_prefix: str = "metadata") -> Optional[models.Filter]:
+    """Qdrant filter over the payload layout written by langchain_qdrant"""
+    normalized = normalize_filter(filter)
+    if normalized is None:
+        return None
+    return models.Filter(must=[
+        models.FieldCondition(key=f"{payload_prefix}.{field}", match=models.MatchAny(any=list(values)))
+        for field, values in normalized
+    ])
+
+
+class FieldIndex:
+    """
+    Per-field posting lists (value -> sorted slot array) over document metadata.
+    A filter becomes a boolean slot mask built from a handful of array unions.
+    """
+
+    def __init__(self, num_slots: int):
+        self.num_slots = num_slots
+        self._fields: Dict[str, Dict[str, np.ndarray]] = {}
+        self._masks: Dict[NormalizedFilter, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, num_slots: int, metadata: Iterable[Tuple[int, Mapping]], fields: Sequence[str]) -> "FieldIndex":
+        index = cls(num_slots)
+        postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in fields}
+        for slot, meta in metadata:
+            for field in fields:
+                value = meta.get(field)
+                if value is not None:
+                    postings[field].setdefault(str(value), []).append(slot)
+        for field, values in postings.items():
+            index._fields[field] = {value: np.asarray(slots, dtype=np.int64) for value, slots in values.items()}
+        return index
+
+    def to_arrays(self) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """
+        Field names and flat arrays for storage: ``field_indptr`` splits the values
+        by field, ``value_offsets``/``value_blob`` hold the UTF-8 values and
+        ``value_indptr`` splits ``slots`` by value
+        """
+        fields = sorted(self._fields)
+        values = [(value, self._fields[field][value]) for field in fields for value in sorted(self._fields[field])]
+        field_indptr = np.zeros(len(fields) + 1, dtype=np.int64)
+        np.cumsum([len(self._fields[field]) for field in fields], out=field_indptr[1:])
+        encoded = [value.encode("utf-8") for value, _ in values]
+        value_offsets = np.zeros(len(values) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in encoded], out=value_offsets[1:])
+        value_indptr = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(slots) for _, slots in values], out=value_indptr[1:])
+        slots = np.concatenate([slots for _, slots in values]) if values else np.zeros(0)
+        return fields, {
+            "field_indptr": field_indptr,
+            "value_offsets": value_offsets,
+            "value_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "value_indptr": value_indptr,
+            "slots": slots.astype(np.int32),
+        }
+
+    @classmethod
+    def from_arrays(cls, num_slots: int, fields: Sequence[str], arrays: Mapping[str, np.ndarray]) -> "FieldIndex":
+        """Inverse of ``to_arrays``; slot arrays stay views of ``arrays`` (e.g. memory-mapped)"""
+        index = cls(num_slots)
+        blob = memoryview(arrays["value_blob"])
+        value_offsets, value_indptr, slots = arrays["value_offsets"], arrays["value_indptr"], arrays["slots"]
+        for position, field in enumerate(fields):
+            start, end = int(arrays["field_indptr"][position]), int(arrays["field_indptr"][position + 1])
+            index._fields[field] = {
+                bytes(blob[value_offsets[i]:value_offsets[i + 1]]).decode("utf-8"): slots[value_indptr[i]:value_indptr[i + 1]]
+                for i in range(start, end)
+            }
+        return index
+
+    def has_fields(self, fields: Iterable[str]) -> bool:
+        return all(field in self._fields for field in fields)
+
+    def mask(self, filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """Boolean mask over slots matching the filter, or None when there is no filter"""
+        normalized = normalize_filter(filter)
+        if normalized is None:
+            return None
+        cached = self._masks.get(normalized)
+        if cached is not None:
+            return cached
+        mask = np.ones(self.num_slots, dtype=bool)
+        for field, values in normalized:
+            postings = self._fields.get(field, {})
+            field_mask = np.zeros(self.num_slots, dtype=bool)
+            for value in values:
+                slots = postings.get(value)
+                if slots is not None:
+                    field_mask[slots] = True
+            mask &= field_mask
+        if len(self._masks) < 64:
+            self._masks[normalized] = mask
+        return mask
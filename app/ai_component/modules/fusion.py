@@ -0,0 +1,92 @@
+import heapq
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from langchain.schema import Document
+from app.ai_component.modules.document_ids import document_id
+
+FUSION_METHODS = ("rrf", "convex")
+
+
+class RankFusion:
+    """
+    Fuses ranked legs (e.g. vector and BM25) on stable chunk ids rather than page text.
+
+    ``rrf``     sum over legs of weight / (rrf_k + rank)
+    ``convex``  sum over legs of weight * min-max normalised leg score (0 when absent)
+
+    Scores are accumulated with NumPy over the candidate arrays and only the top k are
+    pulled out with a heap, so cost grows with the number of candidates, not with k.
+    """
+
+    def __init__(self, method: str = "rrf", weights: Optional[Mapping[str, float]] = None, rrf_k: int = 60):
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Invalid fusion method: {method}. Use one of {FUSION_METHODS}")
+        self.method = method
+        self.weights = dict(weights or {})
+        self.rrf_k = rrf_k
+
+    @staticmethod
+    def _normalize(scores: np.ndarray) -> np.ndarray:
+        if len(scores) == 0:
+            return scores
+        low, high = scores.min(), scores.max()
+        if high - low <= 0:
+            return np.ones_like(scores)
+        return (scores - low) / (high - low)
+
+    def fuse(self, legs: Mapping[str, Sequence[Tuple[Document, float]]], k: Optional[int] = None) -> List[Document]:
+        """
+        Fuse ``{leg: [(document, score), ...]}`` ranked best-first. Returned documents
+        carry ``fused_score`` and ``leg_ranks`` (1-based rank in each leg that found them)
+        in their metadata; a chunk found by several legs appears once.
+        """
+        positions: Dict[str, int] = {}
+        documents: List[Document] = []
+        leg_names = list(legs)
+        leg_rows: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for leg in leg_names:
+            candidates, ranks, scores = [], [], []
+            seen = set()
+            for rank, (doc, score) in enumerate(legs[leg], start=1):
+                doc_id = document_id(doc)
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                position = positions.get(doc_id)
+                if position is None:
+                    position = positions[doc_id] = len(documents)
+                    documents.append(doc)
+                candidates.append(position)
+                ranks.append(rank)
+                scores.append(score)
+            leg_rows.append((
+                np.asarray(candidates, dtype=np.int64),
+                np.asarray(ranks, dtype=np.int64),
+                np.asarray(scores, dtype=np.float64),
+            ))
+
+        num_candidates = len(documents)
+        if num_candidates == 0:
+            return []
+
+        fused = np.zeros(num_candidates, dtype=np.float64)
+        rank_matrix = np.zeros((len(leg_names), num_candidates), dtype=np.int64)
+        for leg_idx, (leg, (candidates, ranks, scores)) in enumerate(zip(leg_names, leg_rows)):
+            weight = self.weights.get(leg, 1.0)
+            if self.method == "rrf":
+                contribution = weight / (self.rrf_k + ranks)
+            else:
+                contribution = weight * self._normalize(scores)
+            fused += np.bincount(candidates, weights=contribution, minlength=num_candidates)
+            rank_matrix[leg_idx, candidates] = ranks
+
+        limit = num_candidates if k is None else min(k, num_candidates)
+        # nlargest keeps first-seen order among ties, like a stable sort
+        top = heapq.nlargest(limit, range(num_candidates), key=fused.__getitem__)
+        results = []
+        for position in top:
+            doc = documents[position]
+            leg_ranks = {leg: int(rank_matrix[i, position]) for i, leg in enumerate(leg_names) if rank_matrix[i, position]}
+            metadata = {**doc.metadata, "fused_score": float(fused[position]), "leg_ranks": leg_ranks}
+            results.append(Document(page_content=doc.page_content, metadata=metadata))
+        return results
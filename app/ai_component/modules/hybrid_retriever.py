@@ -1,20 +1,43 @@
 import sys
 import os
-import json
 import pickle
 import asyncio
-import threading
 from datetime import datetime
-from typing import List, Dict, Optional, Union
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
-from langchain_qdrant import Qdrant
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Optional, Set, Union
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Filter, IsEmptyCondition, PayloadField, PayloadSchemaType, PointIdsList, PointStruct, QueryRequest, SetPayload, SetPayloadOperation,
+)
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
-from app.ai_component.config import top_collection_search
+from langchain_core.embeddings import Embeddings
+from app.ai_component.modules.bm25_index import BM25IndexRetriever, compute_corpus_hash, document_digest
+from app.ai_component.modules.document_ids import document_id, point_id
+from app.ai_component.modules.document_loader import iter_documents
+from app.ai_component.modules.chunking import Chunker
+from app.ai_component.modules.dedupe import build_dedupe_filter
+from app.ai_component.modules.ingestion import IngestionCheckpoint, IngestionPipeline
+from app.ai_component.modules.embedding_cache import CachedEmbeddings
+from app.ai_component.modules.embedding_backends import EMBEDDING_BACKENDS, build_embeddings
+from app.ai_component.modules.retrieval_cache import RetrievalCache
+from app.ai_component.modules.collection_registry import CollectionRegistry
+from app.ai_component.modules.local_vector_index import LocalVectorIndex, LocalVectorRetriever
+from app.ai_component.modules.fusion import RankFusion
+from app.ai_component.modules.filters import MetadataFilter, normalize_filter, to_qdrant_filter
+from app.ai_component.modules.collection_options import CollectionOptions
+from app.ai_component.modules.qdrant_clients import get_async_qdrant_client, get_qdrant_client
+from app.ai_component.modules.lazy import LazyInstance
+from app.ai_component.modules.bm25_storage import BM25IndexFormatError, StaleBM25IndexError, open_index, write_index
+from app.ai_component.config import (
+    top_collection_search, vector_leg_timeout, bm25_leg_timeout, hybrid_search_workers,
+    embedding_cache_size, embedding_cache_ttl, embedding_cache_path, document_embedding_store_path,
+    retrieval_cache_size, retrieval_cache_ttl, collection_metadata_ttl,
+    vector_backend, local_vector_index_dir, embedding_backend, embedding_dim,
+    fusion_method, fusion_weights, fusion_rrf_k, hybrid_candidates_per_leg,
+    payload_index_fields, default_collection_name, warmup_query,
+    chunking_workers, chunking_batch_size, chunking_min_parallel, chunking_mode, chunk_target_tokens, chunk_max_tokens,
+    ingest_batch_size, ingest_max_concurrency, ingest_max_retries, ingest_retry_base_delay, ingest_checkpoint_dir,
+)
 from app.ai_component.logger import logging
 from app.ai_component.exception import CustomException
 from dotenv import load_dotenv
@@ -22,255 +45,276 @@ import time
 
 load_dotenv()
 
-def get_or_create_event_loop():
-    """Get existing event loop or create a new one for the current thread"""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            raise RuntimeError("Event loop is closed")
-        return loop
-    except RuntimeError:
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop
-
-def run_in_event_loop(coro):
-    """Run coroutine in event loop, handling different thread contexts"""
-    try:
-        # Check if we're in the main thread with an existing loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # We're in an async context, but need to run sync operation
-            # Create a new thread to run the async operation
-            import concurrent.futures
-            
-            def run_in_new_loop():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(coro)
-                finally:
-                    new_loop.close()
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_in_new_loop)
-                return future.result()
-        else:
-            # We have a loop but it's not running
-            return loop.run_until_complete(coro)
-    except RuntimeError:
-        # No event loop exists, create one
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            # Don't close the loop as it might be needed by other operations
-            pass
-
 class DataStore: 
-    def __init__(self, qdrant_url: str = os.getenv("QDRANT_URL"), google_api_key: str = os.getenv("GOOGLE_API_KEY")):
+    def __init__(
+        self,
+        qdrant_url: str = os.getenv("QDRANT_URL"),
+        google_api_key: str = os.getenv("GOOGLE_API_KEY"),
+        vector_backend: str = vector_backend,
+        collection_options: Optional[CollectionOptions] = None,
+        embeddings: Optional[Embeddings] = None,
+        embedding_backend: str = embedding_backend,
+    ):
+        if vector_backend not in ("qdrant", "local"):
+            raise ValueError(f"Invalid vector backend: {vector_backend}. Use 'qdrant' or 'local'")
+        if embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Invalid embedding backend: {embedding_backend}. Use one of {EMBEDDING_BACKENDS}")
         self.qdrant_url = qdrant_url
+        self.vector_backend = vector_backend
+        self.embedding_backend = embedding_backend
+        self.collection_options = collection_options or CollectionOptions.from_config()
         self.google_api_key = google_api_key
         self.bm25_retriever = None
+        self._bm25_file_signatures = {}
         self.vector_retriever = None
-        self.ensemble_retriever = None
+        self.fusion = RankFusion(method=fusion_method, weights=fusion_weights, rrf_k=fusion_rrf_k)
+        self._base_embeddings = embeddings
         self.embeddings = None
         self.client = None
+        self.collections = None
+        self._local_indexes = {}
+        self._search_executors = {}
+        self._collection_generations = {}
+        self.retrieval_cache = RetrievalCache(max_size=retrieval_cache_size, ttl=retrieval_cache_ttl)
+        self.last_ingestion_stats = None
+        self.last_dedupe_stats = None
         self._initialize_components()
 
     def _initialize_components(self):
         """Initialize components with proper error handling"""
         try:
             self._initialize_embeddings()
+            if self.vector_backend == "local":
+                logging.info(f"DataStore using local vector indexes in {local_vector_index_dir}")
+                return
             
-            self.client = QdrantClient(url=self.qdrant_url, prefer_grpc=False)
+            self.client = get_qdrant_client(self.qdrant_url)
+            self.collections = CollectionRegistry(
+                self.client, self.embeddings, async_client_factory=lambda: self.async_client, ttl=collection_metadata_ttl
+            )
             logging.info("DataStore components initialized successfully")
             
         except Exception as e:
             logging.error(f"Error initializing DataStore: {str(e)}")
             raise CustomException(e, sys) from e
 
-    def _initialize_embeddings(self, max_retries=3):
-        """Initialize embeddings with retry logic and proper event loop handling"""
-        for attempt in range(max_retries):
-            try:
-                self.embeddings = GoogleGenerativeAIEmbeddings(
-                    model="models/embedding-001",
-                    google_api_key=self.google_api_key
-                )
-                
-                # Test embeddings in a thread-safe way
-                def test_embedding():
-                    try:
-                        return self.embeddings.embed_query("test")
-                    except Exception as e:
-                        # If async call fails, try to handle it properly
-                        if "event loop" in str(e).lower():
-                            # Create async wrapper for sync context
-                            async def async_test():
-                                return self.embeddings.embed_query("test")
-                            
-                            return run_in_event_loop(async_test())
-                        raise e
-                
-                test_result = test_embedding()
-                if test_result:
-                    logging.info("Embeddings initialized successfully")
-                    return
-                    
-            except Exception as e:
-                logging.warning(f"Embeddings initialization attempt {attempt + 1} failed: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt) 
-                else:
-                    # Last attempt - try a different approach
-                    try:
-                        # Try synchronous initialization
-                        self.embeddings = GoogleGenerativeAIEmbeddings(
-                            model="models/embedding-001",
-                            google_api_key=self.google_api_key
-                        )
-                        logging.info("Embeddings initialized successfully (sync mode)")
-                        return
-                    except Exception as final_e:
-                        raise Exception(f"Failed to initialize embeddings after {max_retries} attempts. Final error: {str(final_e)}")
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        """Shared async client for the running event loop"""
+        return get_async_qdrant_client(self.qdrant_url)
+
+    def _build_embeddings(self) -> Embeddings:
+        """Create the embeddings client for the configured backend"""
+        return build_embeddings(self.embedding_backend, google_api_key=self.google_api_key)
+
+    def _wrap_embeddings(self, embeddings) -> CachedEmbeddings:
+        """Put the query embedding cache and the document embedding store in front of the embeddings client"""
+        return CachedEmbeddings(
+            embeddings,
+            max_size=embedding_cache_size,
+            ttl=embedding_cache_ttl,
+            disk_path=embedding_cache_path,
+            document_store_path=document_embedding_store_path,
+        )
+
+    def _set_embeddings(self, embeddings):
+        self.embeddings = embeddings
+        if self.collections is not None:
+            self.collections.set_embeddings(embeddings)
+
+    def _initialize_embeddings(self):
+        """Create the embeddings client; no request is made until it is first used (see awarmup)"""
+        self._set_embeddings(self._wrap_embeddings(self._base_embeddings or self._build_embeddings()))
+        logging.info("Embeddings client initialized")
 
     def _collection_exists(self, collection_name: str) -> bool:
-        """Check if collection exists"""
-        try:
-            collections = self.client.get_collections()
-            return any(collection.name == collection_name for collection in collections.collections)
-        except Exception as e:
-            logging.error(f"Error checking collection existence: {str(e)}")
-            return False
+        """Check if collection exists (cached for a few seconds by the collection registry)"""
+        if self.vector_backend == "local":
+            return LocalVectorIndex.exists(self._get_local_index_path(collection_name))
+        return self.collections.exists(collection_name)
 
-    def create_collection(self, collection_name: str, vector_size: int = 768) -> bool:
-        """Create new collection"""
+    def create_collection(self, collection_name: str, vector_size: int = embedding_dim, options: Optional[CollectionOptions] = None) -> bool:
+        """Create new collection; ``options`` overrides the configured quantization/on-disk/HNSW settings"""
         try:
             if self._collection_exists(collection_name):
                 logging.info(f"Collection {collection_name} already exists")
+                if self.vector_backend == "qdrant":
+                    self.ensure_payload_indexes(collection_name)
                 return True
                 
             logging.info("Creating new collection")
+            if self.vector_backend == "local":
+                LocalVectorIndex.empty(vector_size, name=collection_name).save(self._get_local_index_path(collection_name))
+                self._bump_collection_version(collection_name)
+                logging.info("New local collection created")
+                return True
+            options = options or self.collection_options
             self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                **options.create_collection_kwargs(vector_size)
             )
+            self.ensure_payload_indexes(collection_name)
+            self.collections.invalidate(collection_name)
+            self._bump_collection_version(collection_name)
             logging.info("New collection created")
             return True
         except Exception as e:
             logging.error(f"Error in creating collection: {str(e)}")
             raise CustomException(e, sys) from e
 
+    def ensure_payload_indexes(self, collection_name: str):
+        """Keyword payload indexes on the filterable metadata fields, so filtered search stays index-backed"""
+        try:
+            existing = self.client.get_collection(collection_name).payload_schema or {}
+            for field in payload_index_fields:
+                field_name = f"metadata.{field}"
+                if field_name in existing:
+                    continue
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType.KEYWORD,
+                )
+                logging.info(f"Payload index created on {field_name} for {collection_name}")
+        except Exception as e:
+            logging.error(f"Error creating payload indexes: {str(e)}")
+            raise CustomException(e, sys) from e
+
     def load_json_file(self, file_path: str) -> List[Document]:
         """Load and parse JSON file with new structure (articles with sections)"""
         try:
-            documents = []
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File {file_path} not found")
-            
-            logging.info(f"Processing file: {file_path}")
-            
-            with open(file_path, 'r', encoding='utf-8') as file:
-                json_data = json.load(file)
-                if isinstance(json_data, list):
-                    data_items = json_data
-                else:
-                    data_items = [json_data]
-                
-                for item in data_items:
-                    if 'sections' not in item or not isinstance(item['sections'], list):
-                        continue
-                    
-                    article_source = item.get('source', 'unknown')
-                    article_url = item.get('url', '')
-                    article_title = item.get('title', '')
-                    
-                    for section in item['sections']:
-                        if not isinstance(section, dict) or 'content' not in section:
-                            continue
-                        section_heading = section.get('heading', None)
-                        section_content = section.get('content', [])
-                        if isinstance(section_content, list):
-                            content_text = '\n'.join(str(c) for c in section_content if c)
-                        else:
-                            content_text = str(section_content) if section_content else ''
-                        
-                        # Create formatted content
-                        if section_heading:
-                            formatted_content = f"Heading: {section_heading}\n\nContent: {content_text}"
-                        else:
-                            formatted_content = f"Content: {content_text}"
-                        
-                        # Skip if content is empty
-                        if not content_text.strip():
-                            continue
-                        
-                        # Create metadata
-                        metadata = {
-                            'source': article_source,
-                            'url': article_url,
-                            'title': article_title,
-                            'heading': section_heading,
-                            'extraction_status': item.get('extraction_status', 'unknown')
-                        }
-                        doc = Document(
-                            page_content=formatted_content,
-                            metadata=metadata
-                        )
-                        documents.append(doc)
-            
-            logging.info(f"Loaded {len(documents)} documents from {file_path}")
-            return documents
-            
+            return list(iter_documents(file_path))
         except Exception as e:
             logging.error(f"Error loading JSON file: {str(e)}")
             raise CustomException(e, sys) from e
 
+    def _get_local_index_path(self, collection_name: str) -> str:
+        """Base path of the local vector index files for a collection"""
+        return os.path.join(local_vector_index_dir, collection_name)
+
+    def _load_local_index(self, collection_name: str) -> Optional[LocalVectorIndex]:
+        """Memory-map the local vector index, reusing the mapping until the file is replaced"""
+        path = self._get_local_index_path(collection_name)
+        if not LocalVectorIndex.exists(path):
+            return None
+        signature = self._file_signature(f"{path}.vectors.npy")
+        cached = self._local_indexes.get(collection_name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        index = LocalVectorIndex.load(path)
+        self._local_indexes[collection_name] = (signature, index)
+        logging.info(f"Local vector index loaded for {collection_name} with {len(index)} vectors")
+        return index
+
+    def _store_local_vectors(self, collection_name: str, documents: List[Document], scope_urls: Optional[Set[str]] = None) -> LocalVectorIndex:
+        """
+        Embed only chunks the local index does not hold yet, drop the ones that vanished
+        and refresh the metadata (e.g. dedupe annotations) of the ones it already holds.
+        With ``scope_urls`` only chunks of those urls can vanish; without, ``documents``
+        is the whole collection.
+        """
+        try:
+            path = self._get_local_index_path(collection_name)
+            index = self._load_local_index(collection_name)
+            ids = [document_id(doc) for doc in documents]
+            if index is None:
+                index = LocalVectorIndex.empty(embedding_dim, name=collection_name)
+
+            wanted = set(ids)
+            removed = index.delete([
+                doc_id for doc_id, doc in zip(index.ids, index.documents)
+                if doc_id not in wanted and (scope_urls is None or doc.metadata.get("url") in scope_urls)
+            ])
+            by_id = dict(zip(ids, documents))
+            new_rows = [(doc_id, doc) for doc_id, doc in by_id.items() if doc_id not in index]
+            updated = index.update_documents(list(by_id.values()), ids=list(by_id))
+            if new_rows:
+                vectors = self.embeddings.embed_documents([doc.page_content for _, doc in new_rows])
+                if len(index) == 0 and len(vectors[0]) != index.dim:
+                    index = LocalVectorIndex.empty(len(vectors[0]), name=collection_name)
+                index.upsert([doc for _, doc in new_rows], vectors, ids=[doc_id for doc_id, _ in new_rows])
+            index.save(path)
+            self._local_indexes.pop(collection_name, None)
+            logging.info(f"Local vector index synced: {len(new_rows)} embedded, {updated} updated, {removed} removed, {len(index)} total")
+            return index
+        except Exception as e:
+            logging.error(f"Error storing local vectors: {str(e)}")
+            raise CustomException(e, sys) from e
+
     def _get_bm25_file_path(self, collection_name: str) -> str:
-        """Generate file path for BM25 retriever storage"""
+        """Generate file path for BM25 index storage"""
+        return f"bm25_retrievers/{collection_name}_bm25.idx"
+
+    def _get_legacy_bm25_file_path(self, collection_name: str) -> str:
+        """File path used by the old pickled BM25Retriever"""
         return f"bm25_retrievers/{collection_name}_bm25.pkl"
 
-    def _save_bm25_retriever(self, collection_name: str, bm25_retriever: BM25Retriever) -> bool:
-        """Save BM25 retriever to disk"""
+    @staticmethod
+    def _file_signature(file_path: str) -> tuple:
+        stat = os.stat(file_path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _bm25_file_changed(self, collection_name: str) -> bool:
+        """True when another process has replaced the index file since it was mapped"""
+        file_path = self._get_bm25_file_path(collection_name)
+        try:
+            return self._file_signature(file_path) != self._bm25_file_signatures.get(collection_name)
+        except FileNotFoundError:
+            return False
+
+    def _save_bm25_retriever(self, collection_name: str, bm25_retriever: BM25IndexRetriever) -> bool:
+        """Save BM25 index to disk in the memory-mappable format"""
         try:
             os.makedirs("bm25_retrievers", exist_ok=True)
             file_path = self._get_bm25_file_path(collection_name)
-            
-            with open(file_path, 'wb') as f:
-                pickle.dump(bm25_retriever, f)
-            
+            write_index(bm25_retriever.index, file_path)
             logging.info(f"BM25 retriever saved to {file_path}")
             return True
         except Exception as e:
             logging.error(f"Error saving BM25 retriever: {str(e)}")
             return False
 
-    def _load_bm25_retriever(self, collection_name: str) -> Optional[BM25Retriever]:
-        """Load BM25 retriever from disk"""
-        try:
-            file_path = self._get_bm25_file_path(collection_name)
-            
-            if not os.path.exists(file_path):
-                logging.warning(f"BM25 file {file_path} not found")
-                return None
-            
-            with open(file_path, 'rb') as f:
-                bm25_retriever = pickle.load(f)
-            
+    def _load_bm25_retriever(
+        self, collection_name: str, expected_corpus_hash: Optional[str] = None, verify: bool = False
+    ) -> Optional[BM25IndexRetriever]:
+        """
+        Memory-map the BM25 index from disk. Returns None only when no index exists;
+        a corrupt or stale file raises BM25IndexFormatError. ``verify`` also checks the
+        payload checksum, which reads the whole file, so the per-query reload skips it.
+        """
+        file_path = self._get_bm25_file_path(collection_name)
+        legacy_path = self._get_legacy_bm25_file_path(collection_name)
+
+        if os.path.exists(file_path):
+            try:
+                signature = self._file_signature(file_path)
+                index = open_index(file_path, expected_corpus_hash=expected_corpus_hash, verify=verify)
+            except BM25IndexFormatError as e:
+                logging.error(f"BM25 index {file_path} is unusable: {str(e)}")
+                raise
+            self._bm25_file_signatures[collection_name] = signature
             logging.info(f"BM25 retriever loaded from {file_path}")
+            return BM25IndexRetriever(index=index, k=top_collection_search)
+
+        if os.path.exists(legacy_path):
+            # One-off migration from the pickled rank_bm25 retriever
+            logging.info(f"Converting legacy BM25 pickle {legacy_path} to {file_path}")
+            with open(legacy_path, 'rb') as f:
+                legacy_retriever = pickle.load(f)
+            if expected_corpus_hash is not None and compute_corpus_hash(legacy_retriever.docs) != expected_corpus_hash:
+                raise StaleBM25IndexError(f"Legacy BM25 pickle {legacy_path} does not match the current corpus")
+            bm25_retriever = BM25IndexRetriever.from_documents(legacy_retriever.docs, k=legacy_retriever.k)
+            self._save_bm25_retriever(collection_name, bm25_retriever)
             return bm25_retriever
-        except Exception as e:
-            logging.error(f"Error loading BM25 retriever: {str(e)}")
-            return None
 
-    def create_bm25_retriever(self, documents: List[Document], collection_name: str) -> BM25Retriever:
+        logging.warning(f"BM25 file {file_path} not found")
+        return None
+
+    def create_bm25_retriever(self, documents: List[Document], collection_name: str) -> BM25IndexRetriever:
         """Create and save BM25 retriever from documents"""
         try:
             logging.info(f"Creating BM25 retriever for {len(documents)} documents")
-            bm25_retriever = BM25Retriever.from_documents(documents)
+            bm25_retriever = BM25IndexRetriever.from_documents(documents)
             self._save_bm25_retriever(collection_name, bm25_retriever)
             logging.info("BM25 retriever created and saved successfully")
             return bm25_retriever
@@ -278,21 +322,136 @@ class DataStore:
             logging.error(f"Error creating BM25 retriever: {str(e)}")
             raise CustomException(e, sys) from e
 
-    def setup_retrievers(self, collection_name: str, documents: List[Document] = None) -> bool:
-        """Setup both vector and BM25 retrievers"""
+    def _collection_documents(self, collection_name: str) -> List[Document]:
+        """Every chunk stored in the vector collection, as written at ingestion"""
+        if self.vector_backend == "local":
+            index = self._load_local_index(collection_name)
+            return list(index.documents) if index is not None else []
+        if not self._collection_exists(collection_name):
+            return []
+        documents, offset = [], None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name, limit=1024, offset=offset, with_payload=True, with_vectors=False
+            )
+            documents.extend(
+                Document(page_content=(point.payload or {}).get("page_content", ""), metadata=(point.payload or {}).get("metadata") or {})
+                for point in points
+            )
+            if offset is None:
+                return documents
+
+    def _rebuild_bm25_index(self, collection_name: str, documents: Optional[List[Document]], delete_ids: Optional[List[str]]) -> BM25IndexRetriever:
+        """Build the BM25 index from the whole collection with the given changes applied, never from the delta alone"""
+        by_id = {document_id(doc): doc for doc in self._collection_documents(collection_name)}
+        for doc_id in delete_ids or []:
+            by_id.pop(doc_id, None)
+        for doc in documents or []:
+            by_id[document_id(doc)] = doc
+        logging.warning(f"Rebuilding BM25 index for {collection_name} from {len(by_id)} collection documents")
+        bm25_retriever = self.create_bm25_retriever(list(by_id.values()), collection_name)
+        self._bump_collection_version(collection_name)
+        return bm25_retriever
+
+    def update_bm25_index(self, collection_name: str, documents: Optional[List[Document]] = None, delete_ids: Optional[List[str]] = None) -> BM25IndexRetriever:
+        """
+        Incrementally add/replace documents and delete documents by id in the stored
+        BM25 index, then write a compacted copy. Serving processes pick the new file
+        up on their next query; nothing is re-tokenized except the changed documents.
+        A missing or corrupt index is rebuilt from the full vector collection.
+        """
         try:
-            if self._collection_exists(collection_name):
-                self.vector_retriever = Qdrant(
-                    client=self.client,
-                    collection_name=collection_name,
-                    embeddings=self.embeddings
-                ).as_retriever(search_kwargs={'k': top_collection_search})
+            try:
+                bm25_retriever = self._load_bm25_retriever(collection_name, verify=True)
+            except BM25IndexFormatError as e:
+                logging.warning(f"Stored BM25 index for {collection_name} is unusable: {str(e)}")
+                bm25_retriever = None
+            if bm25_retriever is None:
+                self.bm25_retriever = self._rebuild_bm25_index(collection_name, documents, delete_ids)
+                return self.bm25_retriever
+
+            index = bm25_retriever.index
+            removed = index.delete_documents(delete_ids) if delete_ids else 0
+            added = index.add_documents(documents) if documents else []
+            self._save_bm25_retriever(collection_name, bm25_retriever)
+            self._bump_collection_version(collection_name)
+            logging.info(f"BM25 index updated incrementally: {len(added)} added/replaced, {removed} deleted, {len(index)} total")
+            self.bm25_retriever = self._load_bm25_retriever(collection_name)
+            return self.bm25_retriever
+        except Exception as e:
+            logging.error(f"Error updating BM25 index: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def sync_bm25_index(self, collection_name: str, documents: List[Document], scope_urls: Optional[Set[str]] = None) -> BM25IndexRetriever:
+        """
+        Bring the stored BM25 index in line with ``documents`` touching only the differences.
+        A document whose id is already indexed is replaced when its text or metadata changed.
+        With ``scope_urls`` only indexed documents of those urls are deleted when missing
+        from ``documents``; without, ``documents`` is the whole collection.
+        """
+        try:
+            try:
+                bm25_retriever = self._load_bm25_retriever(collection_name, verify=True)
+            except BM25IndexFormatError:
+                bm25_retriever = None
+            if bm25_retriever is None:
+                return self.create_bm25_retriever(documents, collection_name)
+
+            index = bm25_retriever.index
+            existing = {index.document_key(slot): slot for slot in index.live_slots()}
+            new_ids = {document_id(doc) for doc in documents}
+            to_add = [
+                doc for doc in documents
+                if document_id(doc) not in existing
+                or document_digest(index.document(existing[document_id(doc)])) != document_digest(doc)
+            ]
+            to_delete = [
+                doc_id for doc_id, slot in existing.items()
+                if doc_id not in new_ids and (scope_urls is None or index.document(slot).metadata.get("url") in scope_urls)
+            ]
+            if not to_add and not to_delete:
+                logging.info("BM25 index already up to date")
+                return bm25_retriever
+            return self.update_bm25_index(collection_name, to_add, to_delete)
+        except Exception as e:
+            logging.error(f"Error syncing BM25 index: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    def _build_vector_retriever(self, collection_name: str):
+        """Vector retriever for the configured backend, or None if the collection is missing"""
+        if self.vector_backend == "local":
+            index = self._load_local_index(collection_name)
+            if index is None:
+                return None
+            return LocalVectorRetriever(index=index, embeddings=self.embeddings, k=top_collection_search)
+        handle = self.collections.get(collection_name)
+        if handle is None:
+            return None
+        return handle.vectorstore.as_retriever(search_kwargs={'k': top_collection_search})
+
+    def setup_retrievers(self, collection_name: str, documents: List[Document] = None, verify: bool = False) -> bool:
+        """
+        Setup both vector and BM25 retrievers. With ``documents`` the stored BM25 index
+        must match their corpus hash and is rebuilt from them otherwise; ``verify``
+        checks the index payload checksum (done on ingest and warmup).
+        """
+        try:
+            vector_retriever = self._build_vector_retriever(collection_name)
+            if vector_retriever is not None:
+                self.vector_retriever = vector_retriever
                 logging.info("Vector retriever setup completed")
             else:
                 logging.warning(f"Collection {collection_name} does not exist for vector retriever")
                 return False
             
-            self.bm25_retriever = self._load_bm25_retriever(collection_name)
+            try:
+                expected_hash = compute_corpus_hash(documents) if documents else None
+                self.bm25_retriever = self._load_bm25_retriever(collection_name, expected_hash, verify=verify)
+            except BM25IndexFormatError as e:
+                if not documents:
+                    raise
+                logging.warning(f"Rebuilding BM25 index for {collection_name}: {str(e)}")
+                self.bm25_retriever = None
             
             if self.bm25_retriever is None and documents:
                 logging.info("Creating new BM25 retriever from documents")
@@ -301,24 +460,93 @@ class DataStore:
                 logging.warning("No BM25 retriever found and no documents provided to create one")
                 return False
             
-            # Setup ensemble retriever (combines both)
-            if self.vector_retriever and self.bm25_retriever:
-                self.ensemble_retriever = EnsembleRetriever(
-                    retrievers=[self.vector_retriever, self.bm25_retriever],
-                    weights=[0.6, 0.4]
-                )
-                logging.info("Ensemble retriever setup completed")
-            
+            logging.info("Hybrid retrievers setup completed")
             return True
             
         except Exception as e:
             logging.error(f"Error setting up retrievers: {str(e)}")
             raise CustomException(e, sys) from e
 
-    def StoreInMemory(self, collection_name: str, file_path: str, chunk_size: int = 2000, chunk_overlap: int = 100) -> bool:
+    def _upsert_qdrant_batch(self, collection_name: str, documents: List[Document], vectors: List[List[float]]):
+        """Write one embedded batch in the langchain_qdrant payload layout, with deterministic point ids"""
+        self.client.upsert(
+            collection_name=collection_name,
+            points=[
+                PointStruct(id=point_id(doc), vector=vector, payload={"page_content": doc.page_content, "metadata": doc.metadata})
+                for doc, vector in zip(documents, vectors)
+            ],
+            wait=True,
+        )
+
+    def _existing_point_urls(self, collection_name: str) -> Dict[str, Optional[str]]:
+        """Article url of every point in the collection by point id, scrolled without vectors"""
+        if not self._collection_exists(collection_name):
+            return {}
+        urls, offset = {}, None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name, limit=1024, offset=offset, with_payload=["metadata.url"], with_vectors=False
+            )
+            urls.update((str(point.id), ((point.payload or {}).get("metadata") or {}).get("url")) for point in points)
+            if offset is None:
+                return urls
+
+    def _set_qdrant_metadata(self, collection_name: str, documents: List[Document]):
+        """Overwrite the stored metadata of already written chunks, e.g. after dedupe annotated them"""
+        for start in range(0, len(documents), 256):
+            self.client.batch_update_points(
+                collection_name,
+                update_operations=[
+                    SetPayloadOperation(set_payload=SetPayload(payload={"metadata": doc.metadata}, points=[point_id(doc)]))
+                    for doc in documents[start:start + 256]
+                ],
+                wait=True,
+            )
+
+    def _stale_duplicate_annotations(self, collection_name: str, documents: List[Document], annotated: List[Document]) -> List[Document]:
+        """Chunks stored with duplicate_sources that this ingestion did not annotate"""
+        keep = {point_id(doc) for doc in annotated}
+        stored, offset = set(), None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name,
+                scroll_filter=Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key="metadata.duplicate_sources"))]),
+                limit=1024,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            stored.update(str(point.id) for point in points)
+            if offset is None:
+                break
+        return [doc for doc in documents if point_id(doc) in stored and point_id(doc) not in keep]
+
+    def _delete_qdrant_points(self, collection_name: str, ids: List[str]):
+        for start in range(0, len(ids), 1024):
+            self.client.delete(collection_name, points_selector=PointIdsList(points=ids[start:start + 1024]), wait=True)
+
+    def _ingestion_pipeline(self, collection_name: str) -> IngestionPipeline:
+        checkpoint = IngestionCheckpoint(os.path.join(ingest_checkpoint_dir, f"{collection_name}.checkpoint"))
+        if len(checkpoint):
+            logging.info(f"Resuming ingestion into {collection_name}: {len(checkpoint)} chunks already written")
+        return IngestionPipeline(
+            self.embeddings,
+            writer=lambda documents, vectors: self._upsert_qdrant_batch(collection_name, documents, vectors),
+            batch_size=ingest_batch_size,
+            max_concurrency=ingest_max_concurrency,
+            max_retries=ingest_max_retries,
+            retry_base_delay=ingest_retry_base_delay,
+            checkpoint=checkpoint,
+        )
+
+    def StoreInMemory(self, collection_name: str, file_path: str, chunk_size: int = 2000, chunk_overlap: int = 100, replace: bool = False) -> bool:
         """
         Store the JSON file data in the vector database and create BM25 retriever
         Synchronous version for Streamlit compatibility
+
+        Articles in the file replace their stored chunks; articles of other urls are
+        left alone, so several files can share a collection. With ``replace`` the file
+        is the whole collection and chunks of every url missing from it are deleted.
         """
         try:
             logging.info(f"Storing JSON data from {file_path}")
@@ -327,67 +555,100 @@ class DataStore:
             if self.embeddings is None:
                 self._initialize_embeddings()
             
-            # Load JSON document
-            documents = self.load_json_file(file_path)
-            
-            if not documents:
+            # Stream sections from the file; Qdrant gets each batch as soon as it is chunked.
+            # Only the chunks are kept, for the BM25 index, never the parsed file.
+            texts_to_store = []
+            counts = {"sections": 0}
+            ingested_urls = set()
+
+            def sections():
+                for doc in iter_documents(file_path):
+                    if counts["sections"] == 0:
+                        logging.info(f"Processing sections for collection {collection_name}")
+                        self.create_collection(collection_name)
+                    counts["sections"] += 1
+                    ingested_urls.add(doc.metadata.get("url"))
+                    yield doc
+
+            # Character mode only splits sections that exceed chunk_size; token mode also merges small ones
+            chunker = Chunker(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                workers=chunking_workers,
+                batch_size=chunking_batch_size,
+                min_parallel=chunking_min_parallel,
+                mode=chunking_mode,
+                target_tokens=chunk_target_tokens,
+                max_tokens=chunk_max_tokens,
+            )
+
+            # Near-duplicates (the same paragraph on several sites) are dropped before embedding
+            dedupe = build_dedupe_filter()
+            chunks = chunker.iter_chunks(sections())
+            if dedupe is not None:
+                chunks = dedupe.filter(chunks)
+
+            def chunk_stream():
+                for chunk in chunks:
+                    texts_to_store.append(chunk)
+                    yield chunk
+
+            if self.vector_backend == "qdrant":
+                # Point ids hash url, heading and content, so a chunk already stored under its id is unchanged
+                existing_urls = self._existing_point_urls(collection_name)
+                changed = (chunk for chunk in chunk_stream() if point_id(chunk) not in existing_urls)
+                stats = self._ingestion_pipeline(collection_name).run(changed)
+                self.last_ingestion_stats = stats
+            else:
+                # The local index is diffed against the full chunk set in one go
+                for _ in chunk_stream():
+                    pass
+                if dedupe is not None:
+                    dedupe.annotate(texts_to_store)
+                if texts_to_store:
+                    self._store_local_vectors(collection_name, texts_to_store, None if replace else ingested_urls)
+
+            if not texts_to_store:
                 logging.warning("No documents found to store")
                 return False
             
-            logging.info(f"Processing {len(documents)} sections for collection {collection_name}")
-            
-            self.create_collection(collection_name)
-            
-            # Store documents, only split if they exceed chunk_size
-            texts_to_store = []
-            split_count = 0
-            
-            for doc in documents:
-                if len(doc.page_content) > chunk_size:
-                    text_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=chunk_size,
-                        chunk_overlap=chunk_overlap
-                    )
-                    split_docs = text_splitter.split_documents([doc])
-                    texts_to_store.extend(split_docs)
-                    split_count += len(split_docs) - 1  
-                    logging.info(f"Split large section into {len(split_docs)} chunks")
-                else:
-                    texts_to_store.append(doc)
-            
-            # Store in Qdrant with retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    qdrant = Qdrant.from_documents(
-                        texts_to_store,
-                        self.embeddings,
-                        url=self.qdrant_url,
-                        collection_name=collection_name,
-                        prefer_grpc=False
-                    )
-                    break
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        logging.warning(f"Attempt {attempt + 1} to store documents failed: {str(e)}, retrying...")
-                        time.sleep(2 ** attempt)
-                        self._initialize_embeddings()  # Reinitialize embeddings
-                    else:
-                        raise e
-            
-            # Create BM25 retriever from the same documents
-            self.create_bm25_retriever(texts_to_store, collection_name)
-            self.setup_retrievers(collection_name, texts_to_store)
+            if dedupe is not None:
+                self.last_dedupe_stats = dedupe.stats
+                logging.info(f"Near-duplicate dedupe at threshold {dedupe.threshold}: {dedupe.stats.as_dict()}")
+
+            if self.vector_backend == "qdrant":
+                # Canonical chunks were written before their duplicates turned up, and unchanged
+                # chunks may still carry duplicate_sources from an earlier run
+                annotated = dedupe.annotate(texts_to_store) if dedupe is not None else []
+                self._set_qdrant_metadata(collection_name, annotated + self._stale_duplicate_annotations(collection_name, texts_to_store, annotated))
+                # Old versions of changed chunks in the file's articles (and, when replacing, every other article)
+                current_ids = {point_id(doc) for doc in texts_to_store}
+                stale_ids = sorted(
+                    doc_id for doc_id, url in existing_urls.items()
+                    if doc_id not in current_ids and (replace or url in ingested_urls)
+                )
+                self._delete_qdrant_points(collection_name, stale_ids)
+                stats.unchanged = len(existing_urls.keys() & current_ids)
+                stats.deleted = len(stale_ids)
+                logging.info(f"Incremental ingestion: {stats.unchanged} unchanged, {stats.chunks} embedded, {stats.deleted} deleted")
+
+            # Bring the BM25 index in line with the same documents, touching only what changed
+            if self.collections is not None:
+                self.collections.invalidate(collection_name)
+            self.sync_bm25_index(collection_name, texts_to_store, None if replace else ingested_urls)
+            self._bump_collection_version(collection_name)
+            # Only a full replace knows the whole corpus, and so its hash
+            self.setup_retrievers(collection_name, texts_to_store if replace else None, verify=True)
             
             logging.info(f"Successfully stored {len(texts_to_store)} documents in collection {collection_name}")
-            logging.info(f"Original sections: {len(documents)}, After splitting: {len(texts_to_store)}, Split operations: {split_count}")
+            logging.info(f"Original sections: {counts['sections']}, After splitting: {len(texts_to_store)}, Split operations: {len(texts_to_store) - counts['sections']}")
             return True
             
         except Exception as e:
             logging.error(f"Error in JSON storing: {str(e)}")
             raise CustomException(e, sys) from e
 
-    def search_in_collection(self, query: str, collection_name: str, k: int = top_collection_search) -> List:
+    def search_in_collection(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List:
         """Search in the collection using vector similarity"""
         try:
             # Handle query format - extract string content if it's a dict or object
@@ -398,22 +659,32 @@ class DataStore:
             else:
                 query_str = str(query)
                 
-            if not self._collection_exists(collection_name=collection_name):
-                logging.warning(f"Collection {collection_name} does not exist")
-                return []
-                
-            logging.info(f"Search in collection using vector similarity with query: {query_str}")
-            
             # Ensure embeddings are working
             if self.embeddings is None:
                 self._initialize_embeddings()
+
+            if self.vector_backend == "local":
+                index = self._load_local_index(collection_name)
+                if index is None:
+                    logging.warning(f"Collection {collection_name} does not exist")
+                    return []
+                logging.info(f"Search in local vector index with query: {query_str}")
+                docs = index.search(self.embeddings.embed_query(query_str), k, filter)
+                logging.info("Relevant docs found with vector similarity score")
+                return docs
+
+            handle = self.collections.get(collection_name)
+            if handle is None:
+                logging.warning(f"Collection {collection_name} does not exist")
+                return []
                 
-            db = Qdrant(
-                client=self.client,
-                collection_name=collection_name,
-                embeddings=self.embeddings
+            logging.info(f"Search in collection using vector similarity with query: {query_str}")
+            docs = handle.vectorstore.similarity_search_with_score(
+                query=query_str,
+                k=k,
+                filter=to_qdrant_filter(filter),
+                search_params=self.collection_options.search_params(),
             )
-            docs = db.similarity_search_with_score(query=query_str, k=k)
             logging.info("Relevant docs found with vector similarity score")
             return docs
             
@@ -421,8 +692,12 @@ class DataStore:
             logging.error(f"Error in similarity search {str(e)}") 
             raise CustomException(e, sys) from e
 
-    def bm25_search(self, query: str, collection_name: str, k: int = top_collection_search) -> List[Document]:
+    def bm25_search(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List[Document]:
         """Search using BM25 keyword retriever"""
+        return [doc for doc, _ in self.bm25_search_with_score(query, collection_name, k, filter)]
+
+    def bm25_search_with_score(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List:
+        """BM25 search returning (document, score) pairs"""
         try:
             # Handle query format - extract string content if it's a dict or object
             if isinstance(query, dict):
@@ -432,7 +707,7 @@ class DataStore:
             else:
                 query_str = str(query)
                 
-            if self.bm25_retriever is None:
+            if self.bm25_retriever is None or self._bm25_file_changed(collection_name):
                 self.bm25_retriever = self._load_bm25_retriever(collection_name)
                 
                 if self.bm25_retriever is None:
@@ -440,8 +715,7 @@ class DataStore:
                     return []
             
             logging.info(f"Search using BM25 keyword retriever with query: {query_str}")
-            self.bm25_retriever.k = k
-            docs = self.bm25_retriever.get_relevant_documents(query_str)
+            docs = self.bm25_retriever.search_with_score(query_str, k, filter)
             logging.info(f"Found {len(docs)} documents with BM25 search")
             return docs
             
@@ -449,8 +723,8 @@ class DataStore:
             logging.error(f"Error in BM25 search: {str(e)}")
             raise CustomException(e, sys) from e
 
-    def hybrid_search(self, query: str, collection_name: str, k: int = top_collection_search) -> List[Document]:
-        """Search using ensemble retriever (hybrid: vector + BM25)"""
+    def hybrid_search(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Hybrid search: vector and BM25 legs fused on chunk ids"""
         try:
             # Handle query format - extract string content if it's a dict or object
             if isinstance(query, dict):
@@ -462,18 +736,19 @@ class DataStore:
                 
             logging.info(f"Hybrid search with query: {query_str}")
             
-            if self.ensemble_retriever is None:
+            if not self._retrievers_ready():
                 success = self.setup_retrievers(collection_name)
                 if not success:
-                    logging.warning("Could not setup ensemble retriever, falling back to BM25 only")
-                    return self.bm25_search(query_str, collection_name, k)
+                    logging.warning("Could not setup hybrid retrievers, falling back to BM25 only")
+                    return self._bm25_fallback(query_str, collection_name, k, filter)
             
             logging.info("Search using hybrid retriever (vector + BM25)")
-            self.ensemble_retriever.retrievers[0].search_kwargs = {'k': k} 
-            if hasattr(self.ensemble_retriever.retrievers[1], 'k'):
-                self.ensemble_retriever.retrievers[1].k = k 
-            
-            docs = self.ensemble_retriever.get_relevant_documents(query_str)
+            # Depth goes to each leg per call; the shared retrievers are never mutated
+            depth = self._candidate_depth(k)
+            docs = self._fuse_legs({
+                "vector": self.search_in_collection(query_str, collection_name, depth, filter),
+                "bm25": self.bm25_search_with_score(query_str, collection_name, depth, filter),
+            }, k)
             logging.info(f"Found {len(docs)} documents with hybrid search")
             return docs
             
@@ -481,17 +756,411 @@ class DataStore:
             logging.error(f"Error in hybrid search: {str(e)}")
             # Fallback to BM25 search if hybrid fails
             logging.info("Falling back to BM25 search")
-            return self.bm25_search(query_str, collection_name, k)
+            return self._bm25_fallback(query_str, collection_name, k, filter)
+
+    def _get_search_executor(self, leg: str) -> ThreadPoolExecutor:
+        """
+        Thread pool for one leg of concurrent hybrid searches. Each leg has its own,
+        so vector calls stuck past their deadline cannot starve the BM25 leg.
+        """
+        if leg not in self._search_executors:
+            self._search_executors[leg] = ThreadPoolExecutor(max_workers=hybrid_search_workers, thread_name_prefix=f"hybrid-{leg}")
+        return self._search_executors[leg]
+
+    def hybrid_search_concurrent(
+        self,
+        query: str,
+        collection_name: str,
+        k: int = top_collection_search,
+        vector_timeout: float = vector_leg_timeout,
+        bm25_timeout: float = bm25_leg_timeout,
+        filter: Optional[MetadataFilter] = None,
+    ) -> List[Document]:
+        """
+        Hybrid search that runs the vector and BM25 legs concurrently, each with its own
+        deadline in seconds. A leg that fails or misses its deadline is left out of the
+        fusion, and when both are lost BM25 is scored inline; every returned document
+        records the contributing legs in ``metadata['retrieval_legs']``.
+        """
+        query_str = self._extract_query_text(query)
+        logging.info(f"Concurrent hybrid search with query: {query_str}")
+        if not self._retrievers_ready() and not self.setup_retrievers(collection_name):
+            logging.warning("Could not setup hybrid retrievers, falling back to BM25 only")
+            return self._bm25_fallback(query_str, collection_name, k, filter)
+
+        depth = self._candidate_depth(k)
+        start = time.perf_counter()
+        legs = {
+            "vector": (self._get_search_executor("vector").submit(self.search_in_collection, query_str, collection_name, depth, filter), vector_timeout),
+            "bm25": (self._get_search_executor("bm25").submit(self.bm25_search_with_score, query_str, collection_name, depth, filter), bm25_timeout),
+        }
+
+        results = {}
+        for leg, (future, timeout) in legs.items():
+            remaining = max(0.0, timeout - (time.perf_counter() - start))
+            try:
+                results[leg] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logging.warning(f"Hybrid search {leg} leg missed its {timeout}s deadline")
+            except Exception as e:
+                logging.warning(f"Hybrid search {leg} leg failed: {str(e)}")
+
+        logging.info(f"Concurrent hybrid search legs {list(results)} finished in {(time.perf_counter() - start) * 1000:.1f} ms")
+        if not results:
+            logging.warning("Both hybrid search legs were lost, falling back to BM25 on the calling thread")
+            try:
+                return self._bm25_fallback(query_str, collection_name, k, filter)
+            except Exception as e:
+                logging.error(f"BM25 fallback failed: {str(e)}")
+                return []
+        return self._fuse_legs(results, k)
+
+    def _retrievers_ready(self) -> bool:
+        return self.vector_retriever is not None and self.bm25_retriever is not None
+
+    @staticmethod
+    def _candidate_depth(k: int) -> int:
+        """Candidates fetched per leg before fusion; deeper legs improve fused recall"""
+        return max(k, hybrid_candidates_per_leg)
+
+    def _fuse_legs(self, results: Dict[str, List], k: int) -> List[Document]:
+        """
+        Fuse whichever legs returned (each a list of (document, score) pairs) into the
+        top k, and tag documents with the contributing legs.
+        """
+        contributed = [leg for leg in ("vector", "bm25") if leg in results]
+        if len(contributed) == 2:
+            docs = self.fusion.fuse({leg: results[leg] for leg in contributed}, k)
+        elif contributed:
+            docs = [doc for doc, _ in results[contributed[0]][:k]]
+        else:
+            docs = []
+        return [Document(page_content=doc.page_content, metadata={**doc.metadata, "retrieval_legs": contributed}) for doc in docs]
+
+    def _bm25_fallback(self, query_str: str, collection_name: str, k: int, filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """BM25-only results for a hybrid search, tagged so they are never cached as hybrid"""
+        return self._fuse_legs({"bm25": self.bm25_search_with_score(query_str, collection_name, k, filter)}, k)
+
+    @staticmethod
+    def _extract_query_text(query) -> str:
+        """Accept a plain string, a message object or a dict with a 'content' key"""
+        if isinstance(query, dict):
+            return query.get("content", str(query))
+        if hasattr(query, 'content'):
+            return query.content
+        return str(query)
+
+    @staticmethod
+    def _document_from_point(point, collection_name: str) -> Document:
+        """Rebuild a Document from a point stored by langchain_qdrant"""
+        payload = point.payload or {}
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = collection_name
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+    async def avector_search(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List:
+        """Async vector similarity search returning (document, score) pairs"""
+        try:
+            query_str = self._extract_query_text(query)
+            if self.vector_backend == "local":
+                index = await asyncio.to_thread(self._load_local_index, collection_name)
+                if index is None:
+                    logging.warning(f"Collection {collection_name} does not exist")
+                    return []
+                query_vector = await self.embeddings.aembed_query(query_str)
+                return await asyncio.to_thread(index.search, query_vector, k, filter)
+
+            if not await self.collections.aexists(collection_name):
+                logging.warning(f"Collection {collection_name} does not exist")
+                return []
+
+            logging.info(f"Async vector search with query: {query_str}")
+            query_vector = await self.embeddings.aembed_query(query_str)
+            response = await self.async_client.query_points(
+                collection_name=collection_name,
+                query=query_vector,
+                query_filter=to_qdrant_filter(filter),
+                search_params=self.collection_options.search_params(),
+                limit=k,
+                with_payload=True,
+            )
+            return [(self._document_from_point(point, collection_name), point.score) for point in response.points]
+        except Exception as e:
+            logging.error(f"Error in async vector search: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    async def abm25_search(self, query: str, collection_name: str, k: int = top_collection_search, filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Async BM25 search; scoring is CPU-bound, so it runs in a worker thread"""
+        return await asyncio.to_thread(self.bm25_search, query, collection_name, k, filter)
+
+    async def ahybrid_search(
+        self,
+        query: str,
+        collection_name: str,
+        k: int = top_collection_search,
+        vector_timeout: float = vector_leg_timeout,
+        bm25_timeout: float = bm25_leg_timeout,
+        filter: Optional[MetadataFilter] = None,
+    ) -> List[Document]:
+        """
+        Async hybrid search: both legs run concurrently on the event loop with their own
+        deadlines, and a leg that misses its deadline or fails is left out of the fusion.
+        """
+        query_str = self._extract_query_text(query)
+        logging.info(f"Async hybrid search with query: {query_str}")
+        if not self._retrievers_ready() and not await asyncio.to_thread(self.setup_retrievers, collection_name):
+            logging.warning("Could not setup hybrid retrievers, falling back to BM25 only")
+            return await asyncio.to_thread(self._bm25_fallback, query_str, collection_name, k, filter)
+
+        async def run_leg(leg: str, coro, timeout: float):
+            try:
+                return leg, await asyncio.wait_for(coro, timeout=timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Hybrid search {leg} leg missed its {timeout}s deadline")
+            except Exception as e:
+                logging.warning(f"Hybrid search {leg} leg failed: {str(e)}")
+            return leg, None
+
+        depth = self._candidate_depth(k)
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(
+            run_leg("vector", self.avector_search(query_str, collection_name, depth, filter), vector_timeout),
+            run_leg("bm25", asyncio.to_thread(self.bm25_search_with_score, query_str, collection_name, depth, filter), bm25_timeout),
+        )
+        results = {leg: docs for leg, docs in outcomes if docs is not None}
+        logging.info(f"Async hybrid search legs {list(results)} finished in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return self._fuse_legs(results, k)
+
+    def collection_version(self, collection_name: str) -> str:
+        """
+        Version token for cached results: the BM25 index file signature, which changes
+        whenever any process re-ingests the collection, plus a local generation counter
+        bumped by writes made through this DataStore.
+        """
+        try:
+            signature = self._file_signature(self._get_bm25_file_path(collection_name))
+        except FileNotFoundError:
+            signature = None
+        return f"{signature}:{self._collection_generations.get(collection_name, 0)}"
+
+    def _bump_collection_version(self, collection_name: str):
+        self._collection_generations[collection_name] = self._collection_generations.get(collection_name, 0) + 1
+
+    @staticmethod
+    def _cacheable(method: str, results: List) -> bool:
+        """Skip empty results and hybrid results that are missing a leg (deadline, failure or fallback)"""
+        if not results:
+            return False
+        if method.startswith("hybrid"):
+            legs = results[0].metadata.get("retrieval_legs") if isinstance(results[0], Document) else None
+            return legs is not None and len(legs) == 2
+        return True
+
+    def search_with_method(
+        self,
+        query: str,
+        collection_name: str,
+        method: str = "hybrid",
+        k: int = top_collection_search,
+        filter: Optional[MetadataFilter] = None,
+    ) -> Union[List, List[Document]]:
+        """
+        Search with the given method. ``filter`` restricts results by chunk metadata,
+        e.g. ``{"source": ["mayo_clinic", "nih_ncbi"]}`` (values OR-ed, fields AND-ed).
+        """
+        cache_key = self.retrieval_cache.make_key(self._extract_query_text(query), collection_name, method, k, normalize_filter(filter))
+        version = self.collection_version(collection_name)
+        cached = self.retrieval_cache.get(cache_key, version)
+        if cached is not None:
+            logging.info(f"Retrieval cache hit for {method} search")
+            return cached
 
-    def search_with_method(self, query: str, collection_name: str, method: str = "hybrid", k: int = top_collection_search) -> Union[List, List[Document]]:
         if method == "vector":
-            return self.search_in_collection(query, collection_name, k)
+            results = self.search_in_collection(query, collection_name, k, filter)
         elif method == "bm25":
-            return self.bm25_search(query, collection_name, k)
+            results = self.bm25_search(query, collection_name, k, filter)
         elif method == "hybrid":
-            return self.hybrid_search(query, collection_name, k)
+            results = self.hybrid_search(query, collection_name, k, filter)
+        elif method == "hybrid_concurrent":
+            results = self.hybrid_search_concurrent(query, collection_name, k, filter=filter)
         else:
-            raise ValueError(f"Invalid search method: {method}. Use 'vector', 'bm25', or 'hybrid'")
+            raise ValueError(f"Invalid search method: {method}. Use 'vector', 'bm25', 'hybrid' or 'hybrid_concurrent'")
+
+        if self._cacheable(method, results):
+            self.retrieval_cache.set(cache_key, version, results)
+        return results
+
+    async def asearch_with_method(
+        self,
+        query: str,
+        collection_name: str,
+        method: str = "hybrid",
+        k: int = top_collection_search,
+        filter: Optional[MetadataFilter] = None,
+    ) -> Union[List, List[Document]]:
+        """Async counterpart of search_with_method sharing the same result cache"""
+        cache_key = self.retrieval_cache.make_key(self._extract_query_text(query), collection_name, method, k, normalize_filter(filter))
+        version = self.collection_version(collection_name)
+        cached = self.retrieval_cache.get(cache_key, version)
+        if cached is not None:
+            logging.info(f"Retrieval cache hit for {method} search")
+            return cached
+
+        if method == "vector":
+            results = await self.avector_search(query, collection_name, k, filter)
+        elif method == "bm25":
+            results = await self.abm25_search(query, collection_name, k, filter)
+        elif method in ("hybrid", "hybrid_concurrent"):
+            results = await self.ahybrid_search(query, collection_name, k, filter=filter)
+        else:
+            raise ValueError(f"Invalid search method: {method}. Use 'vector', 'bm25', 'hybrid' or 'hybrid_concurrent'")
+
+        if self._cacheable(method, results):
+            self.retrieval_cache.set(cache_key, version, results)
+        return results
 
-# Global instance
-memory = DataStore()
+    def _vector_search_many(self, queries: List[str], collection_name: str, k: int, filter: Optional[MetadataFilter] = None) -> List[List]:
+        """Vector leg for a batch: one batched embedding call and one batch search request"""
+        if not self._collection_exists(collection_name):
+            logging.warning(f"Collection {collection_name} does not exist")
+            return [[] for _ in queries]
+        query_vectors = self.embeddings.embed_queries(queries)
+        if self.vector_backend == "local":
+            return self._load_local_index(collection_name).search_many(query_vectors, k, filter)
+        query_filter = to_qdrant_filter(filter)
+        search_params = self.collection_options.search_params()
+        responses = self.client.query_batch_points(
+            collection_name=collection_name,
+            requests=[
+                QueryRequest(query=vector, filter=query_filter, params=search_params, limit=k, with_payload=True)
+                for vector in query_vectors
+            ],
+        )
+        return [
+            [(self._document_from_point(point, collection_name), point.score) for point in response.points]
+            for response in responses
+        ]
+
+    def _bm25_search_many(self, queries: List[str], collection_name: str, k: int, filter: Optional[MetadataFilter] = None) -> List[List]:
+        """BM25 leg for a batch, scored in one vectorised pass over the index"""
+        if self.bm25_retriever is None or self._bm25_file_changed(collection_name):
+            self.bm25_retriever = self._load_bm25_retriever(collection_name)
+            if self.bm25_retriever is None:
+                logging.warning(f"BM25 retriever not found for collection {collection_name}")
+                return [[] for _ in queries]
+        return self.bm25_retriever.search_many_with_score(queries, k, filter)
+
+    def search_many(
+        self,
+        queries: List[str],
+        collection_name: str,
+        method: str = "hybrid",
+        k: int = top_collection_search,
+        filter: Optional[MetadataFilter] = None,
+    ) -> List[Union[List, List[Document]]]:
+        """
+        Run many queries at once and return one result list per query, in input order.
+        Queries already in the retrieval cache are served from it; the rest share a
+        single batched embedding call, one Qdrant batch search and one BM25 pass.
+        """
+        try:
+            if method not in ("vector", "bm25", "hybrid"):
+                raise ValueError(f"Invalid search method: {method}. Use 'vector', 'bm25' or 'hybrid'")
+            texts = [self._extract_query_text(query) for query in queries]
+            version = self.collection_version(collection_name)
+            filter_key = normalize_filter(filter)
+            keys = [self.retrieval_cache.make_key(text, collection_name, method, k, filter_key) for text in texts]
+            results = [self.retrieval_cache.get(key, version) for key in keys]
+            pending = [i for i, cached in enumerate(results) if cached is None]
+            if not pending:
+                return results
+
+            pending_texts = [texts[i] for i in pending]
+            logging.info(f"Batched {method} search for {len(pending)} queries ({len(queries) - len(pending)} cached)")
+            cacheable = True
+            leg = method
+            if method == "hybrid" and not self._retrievers_ready() and not self.setup_retrievers(collection_name):
+                logging.warning("Could not setup hybrid retrievers, falling back to BM25 only")
+                leg, cacheable = "bm25", False
+
+            if leg == "vector":
+                computed = self._vector_search_many(pending_texts, collection_name, k, filter)
+            elif leg == "bm25":
+                computed = [[doc for doc, _ in hits] for hits in self._bm25_search_many(pending_texts, collection_name, k, filter)]
+            else:
+                depth = self._candidate_depth(k)
+                vector_results = self._vector_search_many(pending_texts, collection_name, depth, filter)
+                bm25_results = self._bm25_search_many(pending_texts, collection_name, depth, filter)
+                computed = [
+                    self._fuse_legs({"vector": vector_docs, "bm25": bm25_docs}, k)
+                    for vector_docs, bm25_docs in zip(vector_results, bm25_results)
+                ]
+
+            for i, docs in zip(pending, computed):
+                results[i] = docs
+                if cacheable and self._cacheable(method, docs):
+                    self.retrieval_cache.set(keys[i], version, docs)
+            return results
+        except Exception as e:
+            logging.error(f"Error in batched search: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    async def awarmup(self, collection_name: str = default_collection_name, max_retries: int = 3) -> bool:
+        """
+        Get ready for the first query without blocking it: load the collection's
+        retrievers and embed one query so the embeddings connection is open.
+        Failures are retried with backoff and logged, never raised.
+        """
+        for attempt in range(max_retries):
+            try:
+                if not await asyncio.to_thread(self.setup_retrievers, collection_name, verify=True):
+                    logging.warning(f"Warmup could not set up retrievers for {collection_name}")
+                await self.embeddings.aembed_query(warmup_query)
+                logging.info(f"DataStore warmed up for collection {collection_name}")
+                return True
+            except Exception as e:
+                logging.warning(f"Warmup attempt {attempt + 1} failed: {str(e)}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+        return False
+
+# Global instance, built on first use; resolve it with get_memory/aget_memory
+_memory = LazyInstance(DataStore)
+_warmup_task: Optional[asyncio.Task] = None
+
+def get_memory() -> DataStore:
+    """The global DataStore, built on first call"""
+    return _memory.get()
+
+async def aget_memory() -> DataStore:
+    """The global DataStore; a cold first call builds it in a worker thread, not on the event loop"""
+    if _memory.initialized:
+        return _memory.get()
+    return await asyncio.to_thread(_memory.get)
+
+async def warmup_memory(collection_name: str = default_collection_name) -> bool:
+    """Build the global DataStore off the event loop, then warm it up"""
+    try:
+        store = await aget_memory()
+        return await store.awarmup(collection_name)
+    except Exception as e:
+        logging.warning(f"DataStore warmup failed: {str(e)}")
+        return False
+
+def start_warmup(collection_name: str = default_collection_name) -> Optional[asyncio.Task]:
+    """
+    Schedule warmup_memory in the background on the running event loop. Repeated
+    calls return the pending or successful task; without a running loop this is a no-op.
+    """
+    global _warmup_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    task = _warmup_task
+    if task is not None and task.get_loop() is loop:
+        if not task.done() or (not task.cancelled() and task.result()):
+            return task
+    _warmup_task = loop.create_task(warmup_memory(collection_name))
+    return _warmup_task
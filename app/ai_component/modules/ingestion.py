@@ -0,0 +1,191 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from app.ai_component.modules.document_ids import document_id
+from app.ai_component.modules.document_loader import batched
+from app.ai_component.modules.token_utils import estimate_tokens
+from app.ai_component.logger import logging
+
+# Receives one batch of chunks and their vectors, e.g. a Qdrant upsert
+BatchWriter = Callable[[List[Document], List[List[float]]], None]
+
+
+class IngestionError(Exception):
+    """A batch still failed after all its retries"""
+
+
+@dataclass
+class IngestionStats:
+    """
+    Counters for one ingestion run. Skipped chunks were already written per the
+    checkpoint; unchanged and deleted are filled in by callers that diff the
+    corpus against what is already stored.
+    """
+    chunks: int = 0
+    tokens: int = 0
+    batches: int = 0
+    skipped_chunks: int = 0
+    retries: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "batches": self.batches,
+            "skipped_chunks": self.skipped_chunks,
+            "retries": self.retries,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "seconds": round(self.seconds, 3),
+            "chunks_per_sec": round(self.chunks_per_sec, 1),
+            "tokens_per_sec": round(self.tokens_per_sec, 1),
+        }
+
+
+class IngestionCheckpoint:
+    """
+    Append-only file of the ids of chunks already written. Completion is kept per
+    chunk, not per batch, so a re-run skips exactly the chunks that were written
+    before a crash however the remaining ones end up batched.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._done = {line.strip() for line in f if line.strip()}
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(self, doc: Document) -> bool:
+        return document_id(doc) in self._done
+
+    def mark_done(self, documents: List[Document]):
+        with self._lock:
+            ids = [doc_id for doc_id in dict.fromkeys(document_id(doc) for doc in documents) if doc_id not in self._done]
+            if not ids:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in ids))
+                f.flush()
+                os.fsync(f.fileno())
+            self._done.update(ids)
+
+    def clear(self):
+        with self._lock:
+            self._done.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class IngestionPipeline:
+    """
+    Embeds and writes chunks in fixed-size batches with at most ``max_concurrency``
+    batches in flight, so chunks can stream in from the loader without being held
+    in memory. Each batch is retried on its own with exponential backoff and full
+    jitter; chunks of completed batches go to the checkpoint, which is cleared once
+    the whole run has succeeded.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        writer: BatchWriter,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        retry_base_delay: float = 1.0,
+        checkpoint: Optional[IngestionCheckpoint] = None,
+    ):
+        self.embeddings = embeddings
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.checkpoint = checkpoint
+
+    def _process_batch(self, number: int, documents: List[Document], stats: IngestionStats, stats_lock: threading.Lock):
+        for attempt in range(self.max_retries):
+            try:
+                vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+                self.writer(documents, vectors)
+                return
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise IngestionError(f"Batch {number} failed after {self.max_retries} attempts: {str(e)}") from e
+                delay = random.uniform(0, self.retry_base_delay * 2 ** attempt)
+                logging.warning(f"Batch {number} attempt {attempt + 1} failed: {str(e)}, retrying in {delay:.1f}s")
+                with stats_lock:
+                    stats.retries += 1
+                time.sleep(delay)
+
+    def run(self, documents: Iterable[Document]) -> IngestionStats:
+        stats = IngestionStats()
+        stats_lock = threading.Lock()
+        start = time.perf_counter()
+        pending: Dict[Future, List[Document]] = {}
+
+        def remaining():
+            for doc in documents:
+                if self.checkpoint is not None and self.checkpoint.is_done(doc):
+                    stats.skipped_chunks += 1
+                    continue
+                yield doc
+
+        def collect(done):
+            for future in done:
+                batch = pending.pop(future)
+                future.result()
+                if self.checkpoint is not None:
+                    self.checkpoint.mark_done(batch)
+                with stats_lock:
+                    stats.batches += 1
+                    stats.chunks += len(batch)
+                    stats.tokens += sum(estimate_tokens(doc.page_content) for doc in batch)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            try:
+                for number, batch in enumerate(batched(remaining(), self.batch_size)):
+                    if len(pending) >= self.max_concurrency:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[executor.submit(self._process_batch, number, batch, stats, stats_lock)] = batch
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            except BaseException:
+                # Let in-flight batches finish so the checkpoint records them, then stop
+                for future in pending:
+                    future.cancel()
+                for future in [future for future in pending if not future.cancelled()]:
+                    if future.exception() is None and self.checkpoint is not None:
+                        self.checkpoint.mark_done(pending[future])
+                raise
+
+        stats.seconds = time.perf_counter() - start
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        logging.info(f"Ingestion finished: {stats.as_dict()}")
+        return stats
@@ -0,0 +1,37 @@
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyInstance(Generic[T]):
+    """
+    Module-level singleton that is built on first use instead of at import time.
+    Callers resolve it explicitly with ``get()`` where they use it; nothing is
+    forwarded, so introspecting the holder (e.g. while a graph is compiled at
+    import) never builds the instance. Construction happens once, under a lock.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    self._instance = instance
+        return instance
+
+    def reset(self):
+        """Drop the instance; the next access builds a new one"""
+        with self._lock:
+            self._instance = None
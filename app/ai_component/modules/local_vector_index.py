@@ -0,0 +1,234 @@
+"""
+Embedded exact-search vector index for small collections.
+
+A collection is stored as two files next to each other:
+
+    <path>.vectors.npy   float32 matrix (num_docs x dim), rows L2-normalised
+    <path>.docs.json     {"name", "dim", "ids", "documents": [{page_content, metadata}]}
+
+The matrix is opened with ``np.load(mmap_mode="r")`` so the page cache is shared
+between processes, and a query is one matrix-vector product followed by an
+argpartition top-k, i.e. exact cosine similarity with no network hop.
+"""
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+from app.ai_component.modules.bm25_index import BM25Index
+from app.ai_component.modules.document_ids import document_id
+from app.ai_component.modules.filters import DEFAULT_FILTER_FIELDS, FieldIndex, MetadataFilter, normalize_filter
+from app.ai_component.logger import logging
+from app.ai_component.exception import CustomException
+
+VECTORS_SUFFIX = ".vectors.npy"
+DOCS_SUFFIX = ".docs.json"
+
+
+class LocalVectorIndexError(Exception):
+    """Raised when the two files of a local vector index do not match"""
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """Contiguous float32 vector matrix with exact cosine top-k search"""
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], documents: List[Document], name: Optional[str] = None):
+        if len(vectors) != len(ids) or len(ids) != len(documents):
+            raise LocalVectorIndexError(
+                f"Vector/document count mismatch: {len(vectors)} vectors, {len(ids)} ids, {len(documents)} documents"
+            )
+        self.vectors = vectors
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.name = name
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._field_index: Optional[FieldIndex] = None
+
+    @classmethod
+    def empty(cls, dim: int, name: Optional[str] = None) -> "LocalVectorIndex":
+        return cls(np.zeros((0, dim), dtype=np.float32), [], [], name=name)
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        documents: List[Document],
+        vectors: Sequence[Sequence[float]],
+        ids: Optional[List[str]] = None,
+        name: Optional[str] = None,
+    ) -> "LocalVectorIndex":
+        ids = ids if ids is not None else [document_id(doc) for doc in documents]
+        return cls(_normalize(vectors), ids, documents, name=name)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._positions
+
+    def _result_document(self, row: int) -> Document:
+        doc = self.documents[row]
+        metadata = {**doc.metadata, "_id": self.ids[row]}
+        if self.name is not None:
+            metadata["_collection_name"] = self.name
+        return Document(page_content=doc.page_content, metadata=metadata)
+
+    def filter_rows(self, filter: Optional[MetadataFilter]) -> np.ndarray:
+        """Rows matching a metadata filter, from per-field posting lists built on first use"""
+        normalized = normalize_filter(filter)
+        if normalized is None:
+            return np.arange(len(self.ids))
+        fields = [field for field, _ in normalized]
+        if self._field_index is None or not self._field_index.has_fields(fields):
+            known = sorted(set(DEFAULT_FILTER_FIELDS) | set(fields))
+            self._field_index = FieldIndex.build(len(self.ids), enumerate(doc.metadata for doc in self.documents), known)
+        return np.flatnonzero(self._field_index.mask(filter))
+
+    def search(self, query_vector: Sequence[float], k: int = 4, filter: Optional[MetadataFilter] = None) -> List[Tuple[Document, float]]:
+        """Exact cosine top-k: one matrix-vector product over all rows"""
+        if len(self.ids) == 0:
+            return []
+        query = _normalize(query_vector)[0]
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Query vector has dimension {query.shape[0]}, index has {self.dim}")
+        scores = self.vectors @ query
+        rows = self.filter_rows(filter)
+        rows, top_scores = BM25Index.top_k(rows, scores[rows], k)
+        return [(self._result_document(row), float(score)) for row, score in zip(rows, top_scores)]
+
+    def search_many(
+        self, query_vectors: Sequence[Sequence[float]], k: int = 4, filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Exact cosine top-k for a batch of queries with one matrix-matrix product"""
+        if len(query_vectors) == 0:
+            return []
+        if len(self.ids) == 0:
+            return [[] for _ in query_vectors]
+        queries = _normalize(query_vectors)
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query vectors have dimension {queries.shape[1]}, index has {self.dim}")
+        all_scores = queries @ np.asarray(self.vectors).T
+        rows = self.filter_rows(filter)
+        results = []
+        for scores in all_scores:
+            top_rows, top_scores = BM25Index.top_k(rows, scores[rows], k)
+            results.append([(self._result_document(row), float(score)) for row, score in zip(top_rows, top_scores)])
+        return results
+
+    def upsert(self, documents: List[Document], vectors: Sequence[Sequence[float]], ids: Optional[List[str]] = None):
+        """Insert new rows or overwrite existing ones with the same id"""
+        ids = ids if ids is not None else [document_id(doc) for doc in documents]
+        if not ids:
+            return
+        new_vectors = _normalize(vectors)
+        matrix = np.array(self.vectors, dtype=np.float32)
+        appended = []
+        for doc_id, doc, vector in zip(ids, documents, new_vectors):
+            row = self._positions.get(doc_id)
+            if row is None:
+                self._positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.documents.append(doc)
+                appended.append(vector)
+            else:
+                matrix[row] = vector
+                self.documents[row] = doc
+        if appended:
+            matrix = np.vstack([matrix, np.asarray(appended, dtype=np.float32)])
+        self.vectors = matrix
+        self._field_index = None
+
+    def update_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> int:
+        """Replace the stored document of existing rows whose metadata changed, keeping their vectors"""
+        ids = ids if ids is not None else [document_id(doc) for doc in documents]
+        updated = 0
+        for doc_id, doc in zip(ids, documents):
+            row = self._positions.get(doc_id)
+            if row is not None and self.documents[row].metadata != doc.metadata:
+                self.documents[row] = doc
+                updated += 1
+        if updated:
+            self._field_index = None
+        return updated
+
+    def delete(self, ids: List[str]) -> int:
+        """Drop rows by id and return how many were removed"""
+        rows = sorted({self._positions[doc_id] for doc_id in ids if doc_id in self._positions})
+        if not rows:
+            return 0
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[rows] = False
+        self.vectors = np.asarray(self.vectors)[keep]
+        self.ids = [doc_id for doc_id, kept in zip(self.ids, keep) if kept]
+        self.documents = [doc for doc, kept in zip(self.documents, keep) if kept]
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._field_index = None
+        return len(rows)
+
+    def save(self, path: str):
+        """Write both files via temporary names so readers never see a half-written file"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            vectors_tmp = f"{path}{VECTORS_SUFFIX}.tmp"
+            docs_tmp = f"{path}{DOCS_SUFFIX}.tmp"
+            with open(vectors_tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+            payload: Dict = {
+                "name": self.name,
+                "dim": self.dim,
+                "ids": self.ids,
+                "documents": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+            }
+            with open(docs_tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(docs_tmp, f"{path}{DOCS_SUFFIX}")
+            os.replace(vectors_tmp, f"{path}{VECTORS_SUFFIX}")
+            logging.info(f"Local vector index with {len(self)} vectors saved to {path}")
+        except Exception as e:
+            logging.error(f"Error saving local vector index: {str(e)}")
+            raise CustomException(e, sys) from e
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        """Memory-map the vector matrix and load the documents"""
+        vectors = np.load(f"{path}{VECTORS_SUFFIX}", mmap_mode="r")
+        with open(f"{path}{DOCS_SUFFIX}", "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if vectors.ndim != 2 or vectors.dtype != np.float32 or vectors.shape[1] != payload["dim"]:
+            raise LocalVectorIndexError(f"Unexpected vector matrix {vectors.dtype}{vectors.shape} in {path}")
+        documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in payload["documents"]]
+        return cls(vectors, payload["ids"], documents, name=payload.get("name"))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(f"{path}{VECTORS_SUFFIX}") and os.path.exists(f"{path}{DOCS_SUFFIX}")
+
+
+class LocalVectorRetriever(BaseRetriever):
+    """Retriever over a :class:`LocalVectorIndex`, usable inside an ``EnsembleRetriever``"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: LocalVectorIndex
+    embeddings: Embeddings
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.index.search(self.embeddings.embed_query(query), self.k)]
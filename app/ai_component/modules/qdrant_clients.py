@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple, Union
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from app.ai_component.config import (
+    qdrant_prefer_grpc, qdrant_grpc_port, qdrant_timeout, qdrant_api_key,
+    qdrant_max_connections, qdrant_max_keepalive_connections, qdrant_keepalive_expiry,
+)
+from app.ai_component.logger import logging
+
+IN_MEMORY_LOCATION = ":memory:"
+
+
+class ThreadedAsyncQdrantClient:
+    """
+    Async facade over a sync client: every method call runs in a worker thread.
+    Used for in-process (``:memory:``) Qdrant, where an AsyncQdrantClient would
+    keep its own, empty storage instead of sharing the sync client's.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+
+        return call
+
+    async def close(self, **kwargs):
+        # The sync client is shared and closed by the provider
+        pass
+
+
+class QdrantClientProvider:
+    """
+    Process-wide Qdrant clients, one per URL. The sync client is shared by every
+    thread; async clients are kept per event loop because their connection pools are
+    bound to the loop that opened them, and are closed once that loop is closed or
+    collected. REST clients get a pooled, keep-alive httpx transport; with
+    ``prefer_grpc`` vectors travel as protobuf over one HTTP/2 channel with gRPC
+    keep-alive pings. ``:memory:`` gives one in-process instance shared by the sync
+    client and its threaded async facade.
+    """
+
+    def __init__(
+        self,
+        prefer_grpc: bool = qdrant_prefer_grpc,
+        grpc_port: int = qdrant_grpc_port,
+        timeout: Optional[int] = qdrant_timeout,
+        api_key: Optional[str] = qdrant_api_key,
+        max_connections: int = qdrant_max_connections,
+        max_keepalive_connections: int = qdrant_max_keepalive_connections,
+        keepalive_expiry: float = qdrant_keepalive_expiry,
+    ):
+        self.prefer_grpc = prefer_grpc
+        self.grpc_port = grpc_port
+        self.timeout = timeout
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._clients: Dict[str, QdrantClient] = {}
+        self._async_clients: Dict[Tuple[str, Any], AsyncQdrantClient] = {}
+        self._async_client_loops: Dict[Tuple[str, Any], "weakref.ref"] = {}
+        self._loops: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client_kwargs(self, url: Optional[str]) -> Dict[str, Any]:
+        if url == IN_MEMORY_LOCATION:
+            return {"location": IN_MEMORY_LOCATION}
+        kwargs = {
+            "url": url,
+            "prefer_grpc": self.prefer_grpc,
+            "grpc_port": self.grpc_port,
+            "timeout": self.timeout,
+            "api_key": self.api_key,
+            # Passed through to the httpx client behind the REST transport
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        }
+        if self.prefer_grpc:
+            kwargs["grpc_options"] = {
+                "grpc.keepalive_time_ms": int(self.keepalive_expiry * 1000),
+                "grpc.keepalive_timeout_ms": 10_000,
+                "grpc.keepalive_permit_without_calls": 1,
+            }
+        return kwargs
+
+    def get(self, url: Optional[str] = None) -> QdrantClient:
+        """Shared sync client for a URL (``:memory:`` gives one shared in-process instance)"""
+        key = url or ""
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = QdrantClient(**self._client_kwargs(url))
+                    self._clients[key] = client
+                    logging.info(f"Qdrant client created (grpc={self.prefer_grpc})")
+        return client
+
+    def get_async(self, url: Optional[str] = None) -> Union[AsyncQdrantClient, ThreadedAsyncQdrantClient]:
+        """Shared async client for a URL and the running event loop"""
+        if url == IN_MEMORY_LOCATION:
+            return ThreadedAsyncQdrantClient(self.get(url))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        evicted = []
+        with self._lock:
+            if loop is not None:
+                # Ids of closed, collected loops can be reused, so key on a token owned by the loop
+                token = self._loops.setdefault(loop, object())
+            else:
+                token = None
+            key = (url or "", token)
+            client = self._async_clients.get(key)
+            if client is None:
+                evicted = self._prune_async_clients()
+                client = AsyncQdrantClient(**self._client_kwargs(url))
+                self._async_clients[key] = client
+                if loop is not None:
+                    self._async_client_loops[key] = weakref.ref(loop)
+        self._close_async_clients(evicted)
+        return client
+
+    def _prune_async_clients(self) -> List[AsyncQdrantClient]:
+        """Remove and return clients whose event loop has been closed or garbage-collected"""
+        evicted = []
+        for key, loop_ref in list(self._async_client_loops.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._async_client_loops[key]
+                evicted.append(self._async_clients.pop(key))
+        return evicted
+
+    @staticmethod
+    def _close_async_clients(clients: List[AsyncQdrantClient], wait: bool = False):
+        """
+        Close evicted async clients. Their own loop is gone, so each close runs on a
+        fresh loop in a short-lived thread; the caller may be inside a running loop,
+        which is only blocked on it when ``wait`` is set.
+        """
+        if not clients:
+            return
+
+        async def close_all():
+            for client in clients:
+                try:
+                    await client.close()
+                except Exception as e:
+                    logging.warning(f"Could not close async Qdrant client: {str(e)}")
+
+        thread = threading.Thread(target=asyncio.run, args=(close_all(),), name="qdrant-async-close", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+
+    def close(self):
+        """Close the sync clients and every async client"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            evicted = list(self._async_clients.values())
+            self._async_clients.clear()
+            self._async_client_loops.clear()
+        self._close_async_clients(evicted, wait=True)
+
+
+_provider = QdrantClientProvider()
+
+
+def get_client_provider() -> QdrantClientProvider:
+    return _provider
+
+
+def get_qdrant_client(url: Optional[str] = None) -> QdrantClient:
+    return _provider.get(url)
+
+
+def get_async_qdrant_client(url: Optional[str] = None) -> Union[AsyncQdrantClient, ThreadedAsyncQdrantClient]:
+    return _provider.get_async(url)
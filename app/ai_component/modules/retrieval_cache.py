@@ -0,0 +1,34 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.ai_component.modules.cache import TTLCache
+from app.ai_component.modules.embedding_cache import normalize_query
+
+
+class RetrievalCache:
+    """
+    Caches final ranked result lists keyed by (normalised query, collection, method, k,
+    extra) together with the collection version. A lookup made against a newer version
+    misses, so re-ingesting a collection invalidates its entries without a flush.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def make_key(query: str, collection_name: str, method: str, k: int, extra: Any = None) -> Tuple:
+        return (normalize_query(query).lower(), collection_name, method, k, extra)
+
+    def get(self, key: Tuple, version: str) -> Optional[List]:
+        # A stale entry is dropped and counted as a miss inside the cache's lock
+        entry = self.cache.get(key, is_valid=lambda entry: entry[0] == version)
+        if entry is None:
+            return None
+        return list(entry[1])
+
+    def set(self, key: Tuple, version: str, results: List):
+        self.cache.set(key, (version, list(results)))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
@@ -0,0 +1,9 @@
+import math
+
+# Gemini has no local tokenizer; ~4 characters per token is its documented rule of thumb for English
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, deterministic token estimate used for budgeting prompt context"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
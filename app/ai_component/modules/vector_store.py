@@ -1,15 +1,22 @@
 import sys
 import os
-import json
 from datetime import datetime
 from typing import List, Dict, Optional
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
 from langchain_qdrant import Qdrant
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from app.ai_component.config import top_collection_search
+from app.ai_component.config import (
+    top_collection_search, embedding_backend, embedding_dim, ingest_batch_size, document_embedding_store_path,
+    chunking_workers, chunking_batch_size, chunking_min_parallel, chunking_mode, chunk_target_tokens, chunk_max_tokens,
+)
+from app.ai_component.modules.embedding_backends import build_embeddings
+from app.ai_component.modules.embedding_cache import CachedEmbeddings
+from app.ai_component.modules.collection_options import CollectionOptions
+from app.ai_component.modules.qdrant_clients import get_qdrant_client
+from app.ai_component.modules.lazy import LazyInstance
+from app.ai_component.modules.document_loader import batched, iter_documents
+from app.ai_component.modules.chunking import Chunker
+from app.ai_component.modules.dedupe import build_dedupe_filter
+from app.ai_component.modules.document_ids import document_id
 from app.ai_component.logger import logging
 from app.ai_component.exception import CustomException
 from dotenv import load_dotenv
@@ -17,19 +24,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class VectorStore: 
-    def __init__(self, qdrant_url: str = os.getenv("QDRANT_URL"), google_api_key: str = os.getenv("GOOGLE_API_KEY")):
+    def __init__(
+        self,
+        qdrant_url: str = os.getenv("QDRANT_URL"),
+        google_api_key: str = os.getenv("GOOGLE_API_KEY"),
+        collection_options: Optional[CollectionOptions] = None,
+        embedding_backend: str = embedding_backend,
+    ):
         self.qdrant_url = qdrant_url
         self.google_api_key = google_api_key
+        self.collection_options = collection_options or CollectionOptions.from_config()
 
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=self.google_api_key
+        # Ingestion reuses vectors of text embedded before, by this or any other store
+        self.embeddings = CachedEmbeddings(
+            build_embeddings(embedding_backend, google_api_key=self.google_api_key),
+            document_store_path=document_embedding_store_path,
         )
 
-        self.client = QdrantClient(
-            url=self.qdrant_url,
-            prefer_grpc=False
-        )
+        self.client = get_qdrant_client(self.qdrant_url)
 
     def _collection_exists(self, collection_name: str) -> bool:
         """Check if collection exists"""
@@ -40,8 +52,8 @@ class VectorStore:
             logging.error(f"Error checking collection existence: {str(e)}")
             return False
 
-    def create_collection(self, collection_name: str, vector_size: int = 768) -> bool:
-        """Create new collection"""
+    def create_collection(self, collection_name: str, vector_size: int = embedding_dim, options: Optional[CollectionOptions] = None) -> bool:
+        """Create new collection; ``options`` overrides the configured quantization/on-disk/HNSW settings"""
         try:
             # Check if collection already exists
             if self._collection_exists(collection_name):
@@ -49,9 +61,10 @@ class VectorStore:
                 return True
                 
             logging.info("Creating new collection")
+            options = options or self.collection_options
             self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                **options.create_collection_kwargs(vector_size)
             )
             logging.info("New collection created")
             return True
@@ -62,72 +75,7 @@ class VectorStore:
     def load_json_file(self, file_path: str) -> List[Document]:
         """Load and parse JSON file with new structure (articles with sections)"""
         try:
-            documents = []
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File {file_path} not found")
-            
-            logging.info(f"Processing file: {file_path}")
-            
-            with open(file_path, 'r', encoding='utf-8') as file:
-                json_data = json.load(file)
-                if isinstance(json_data, list):
-                    data_items = json_data
-                else:
-                    data_items = [json_data]
-                
-                for item in data_items:
-                    # Check if item has required fields
-                    if 'sections' not in item or not isinstance(item['sections'], list):
-                        continue
-                    
-                    # Extract article metadata
-                    article_source = item.get('source', 'unknown')
-                    article_url = item.get('url', '')
-                    article_title = item.get('title', '')
-                    
-                    # Process each section
-                    for section in item['sections']:
-                        if not isinstance(section, dict) or 'content' not in section:
-                            continue
-                        
-                        section_heading = section.get('heading', None)
-                        section_content = section.get('content', [])
-                        
-                        # Handle content as list or string
-                        if isinstance(section_content, list):
-                            content_text = '\n'.join(str(c) for c in section_content if c)
-                        else:
-                            content_text = str(section_content) if section_content else ''
-                        
-                        # Create formatted content
-                        if section_heading:
-                            formatted_content = f"Heading: {section_heading}\n\nContent: {content_text}"
-                        else:
-                            formatted_content = f"Content: {content_text}"
-                        
-                        # Skip if content is empty
-                        if not content_text.strip():
-                            continue
-                        
-                        # Create metadata
-                        metadata = {
-                            'source': article_source,
-                            'url': article_url,
-                            'title': article_title,
-                            'heading': section_heading,
-                            'extraction_status': item.get('extraction_status', 'unknown')
-                        }
-                        
-                        # Create Document object
-                        doc = Document(
-                            page_content=formatted_content,
-                            metadata=metadata
-                        )
-                        documents.append(doc)
-            
-            logging.info(f"Loaded {len(documents)} documents from {file_path}")
-            return documents
-            
+            return list(iter_documents(file_path))
         except Exception as e:
             logging.error(f"Error loading JSON file: {str(e)}")
             raise CustomException(e, sys) from e
@@ -139,45 +87,62 @@ class VectorStore:
         try:
             logging.info(f"Storing JSON data from {file_path}")
             
-            # Load JSON document
-            documents = self.load_json_file(file_path)
-            
-            if not documents:
+            vectorstore = None
+            stored_count = 0
+            counts = {"sections": 0}
+
+            def sections():
+                for doc in iter_documents(file_path):
+                    counts["sections"] += 1
+                    yield doc
+
+            # Character mode only splits sections that exceed chunk_size; token mode also merges small ones
+            chunker = Chunker(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                workers=chunking_workers,
+                batch_size=chunking_batch_size,
+                min_parallel=chunking_min_parallel,
+                mode=chunking_mode,
+                target_tokens=chunk_target_tokens,
+                max_tokens=chunk_max_tokens,
+            )
+            # Near-duplicates (the same paragraph on several sites) are dropped before embedding
+            dedupe = build_dedupe_filter()
+            chunks = chunker.iter_chunks(sections())
+            if dedupe is not None:
+                chunks = dedupe.filter(chunks)
+            stored_ids = {}
+
+            # Stream sections from the file and store each batch of chunks as soon as it is ready
+            for texts_to_store in batched(chunks, ingest_batch_size):
+                if vectorstore is None:
+                    logging.info(f"Processing sections for collection {collection_name}")
+                    self.create_collection(collection_name)
+                    vectorstore = Qdrant(
+                        client=self.client,
+                        collection_name=collection_name,
+                        embeddings=self.embeddings
+                    )
+                ids = vectorstore.add_documents(texts_to_store)
+                if dedupe is not None:
+                    stored_ids.update((document_id(doc), point) for doc, point in zip(texts_to_store, ids))
+                stored_count += len(texts_to_store)
+
+            if vectorstore is None:
                 logging.warning("No documents found to store")
                 return False
-            
-            logging.info(f"Processing {len(documents)} sections for collection {collection_name}")
-            
-            self.create_collection(collection_name)
-            
-            # Store documents, only split if they exceed chunk_size
-            texts_to_store = []
-            split_count = 0
-            
-            for doc in documents:
-                if len(doc.page_content) > chunk_size:
-                    # Only split if the section content is larger than chunk_size
-                    text_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=chunk_size,
-                        chunk_overlap=chunk_overlap
+
+            if dedupe is not None:
+                # Canonical chunks were written before their duplicates turned up
+                for chunk_id, sources in dedupe.duplicate_sources.items():
+                    self.client.set_payload(
+                        collection_name, payload={"duplicate_sources": sources}, points=[stored_ids[chunk_id]], key="metadata"
                     )
-                    split_docs = text_splitter.split_documents([doc])
-                    texts_to_store.extend(split_docs)
-                    split_count += len(split_docs) - 1  # Count additional chunks created
-                    logging.info(f"Split large section into {len(split_docs)} chunks")
-                else:
-                    texts_to_store.append(doc)
+                logging.info(f"Near-duplicate dedupe at threshold {dedupe.threshold}: {dedupe.stats.as_dict()}")
             
-            qdrant = Qdrant.from_documents(
-                texts_to_store,
-                self.embeddings,
-                url=self.qdrant_url,
-                collection_name=collection_name,
-                prefer_grpc=False
-            )
-            
-            logging.info(f"Successfully stored {len(texts_to_store)} documents in collection {collection_name}")
-            logging.info(f"Original sections: {len(documents)}, After splitting: {len(texts_to_store)}, Split operations: {split_count}")
+            logging.info(f"Successfully stored {stored_count} documents in collection {collection_name}")
+            logging.info(f"Original sections: {counts['sections']}, After splitting: {stored_count}, Split operations: {stored_count - counts['sections']}")
             return True
             
         except CustomException as e:
@@ -197,7 +162,7 @@ class VectorStore:
                 collection_name=collection_name,
                 embeddings=self.embeddings
             )
-            docs = db.similarity_search_with_score(query=query, k=k)
+            docs = db.similarity_search_with_score(query=query, k=k, search_params=self.collection_options.search_params())
             logging.info("Relevant docs found with score")
             return docs
             
@@ -205,7 +170,12 @@ class VectorStore:
             logging.error(f"Error in similarity search {str(e)}") 
             raise CustomException(e, sys) from e
 
-memory = VectorStore()  
+# Global instance, built on first use
+_memory = LazyInstance(VectorStore)
+
+def get_memory() -> VectorStore:
+    """The global VectorStore, built on first call"""
+    return _memory.get()
 
 if __name__ == "__main__":
     import asyncio
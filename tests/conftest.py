@@ -0,0 +1,48 @@
+import copy
+import json
+import pytest
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+ARTICLES = [
+    {
+        "source": "healthline",
+        "url": "https://example.org/gut-microbiome",
+        "title": "The gut microbiome",
+        "sections": [
+            {"heading": "What is the gut microbiome", "content": ["Trillions of bacteria live in the large intestine."]},
+            {"heading": "Fiber", "content": ["Dietary fiber feeds beneficial gut bacteria and produces short-chain fatty acids."]},
+        ],
+    },
+    {
+        "source": "mayo_clinic",
+        "url": "https://example.org/ibs",
+        "title": "Irritable bowel syndrome",
+        "sections": [
+            {"heading": "Symptoms", "content": ["Cramping, bloating and changes in bowel habits are common IBS symptoms."]},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def articles():
+    return copy.deepcopy(ARTICLES)
+
+
+@pytest.fixture
+def corpus_path(tmp_path, articles):
+    path = tmp_path / "corpus.json"
+    path.write_text(json.dumps(articles), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Index files and the embedding store are written relative to the working directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def local_store(workdir):
+    return DataStore(qdrant_url=":memory:", vector_backend="local", embedding_backend="hashed_ngram")
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.ai_component.modules.embedding_backends import HashedNGramEmbeddings
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+
+def test_async_search_keeps_vector_leg_across_loops(workdir, corpus_path, monkeypatch):
+    # Offline stand-in for the Gemini API behind the real (loop-bound) client class
+    hashed = HashedNGramEmbeddings()
+    monkeypatch.setattr(GoogleGenerativeAIEmbeddings, "embed_query", lambda self, text, **kwargs: hashed.embed_query(text))
+    monkeypatch.setattr(GoogleGenerativeAIEmbeddings, "embed_documents", lambda self, texts, **kwargs: hashed.embed_documents(texts))
+
+    # Built in a worker thread, as warmup_memory does
+    stores = []
+
+    def build():
+        store = DataStore(qdrant_url=":memory:", google_api_key="test-key", vector_backend="local", embedding_backend="google")
+        store.StoreInMemory("async_search", corpus_path)
+        stores.append(store)
+
+    thread = threading.Thread(target=build)
+    thread.start()
+    thread.join()
+
+    results = asyncio.run(stores[0].asearch_with_method("gut bacteria and fiber", "async_search", method="hybrid", k=2))
+    assert results
+    assert "vector" in results[0].metadata["retrieval_legs"]
@@ -0,0 +1,72 @@
+import math
+from collections import Counter
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.bm25_index import BM25Index, BM25IndexRetriever, default_tokenizer
+
+DOCS = [
+    Document(page_content="Dietary fiber feeds beneficial gut bacteria.", metadata={"url": "a"}),
+    Document(page_content="Bloating, cramping and gas are common IBS symptoms; gas after fiber is common.", metadata={"url": "b"}),
+    Document(page_content="Probiotics are live bacteria. Some probiotics may ease bloating.", metadata={"url": "c"}),
+    Document(page_content="Sleep and stress affect the gut-brain axis.", metadata={"url": "d"}),
+]
+
+
+def reference_scores(documents, query, k1=1.5, b=0.75):
+    """Okapi BM25 with the Lucene IDF, computed term by term"""
+    tokenized = [default_tokenizer(doc.page_content) for doc in documents]
+    avgdl = sum(len(tokens) for tokens in tokenized) / len(tokenized)
+    scores = {}
+    for doc_id, tokens in enumerate(tokenized):
+        counts = Counter(tokens)
+        score = 0.0
+        for term in default_tokenizer(query):
+            df = sum(1 for other in tokenized if term in other)
+            if not counts[term]:
+                continue
+            idf = math.log1p((len(tokenized) - df + 0.5) / (df + 0.5))
+            score += idf * counts[term] * (k1 + 1) / (counts[term] + k1 * (1 - b + b * len(tokens) / avgdl))
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+@pytest.mark.parametrize("query", ["gut bacteria", "bloating gas gas", "fiber", "unknown words"])
+def test_scores_match_reference_bm25(query):
+    index = BM25Index.from_documents(DOCS)
+    doc_ids, scores = index.score(query)
+    assert dict(zip(doc_ids.tolist(), scores.tolist())) == pytest.approx(reference_scores(DOCS, query), rel=1e-5)
+
+
+def test_search_returns_top_k_by_score():
+    retriever = BM25IndexRetriever.from_documents(DOCS, k=2)
+    results = retriever.search_with_score("probiotics bloating")
+    assert [doc.metadata["url"] for doc, _ in results] == ["c", "b"]
+    assert results[0][1] > results[1][1]
+    assert [doc.metadata["url"] for doc in retriever.invoke("probiotics bloating")] == ["c", "b"]
+
+
+def ranked(index, query):
+    doc_ids, scores = index.top_k(*index.score(query), k=len(index))
+    return [(index.document(int(doc_id)).metadata["url"], round(float(score), 5)) for doc_id, score in zip(doc_ids, scores)]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_incremental_updates_match_a_fresh_build(compact):
+    replacement = Document(page_content="Sleep, stress and diet all shape the gut microbiome.", metadata={"url": "d"})
+    extra = Document(page_content="Fermented foods such as kefir contain probiotics.", metadata={"url": "e"})
+    index = BM25Index.from_documents(DOCS[:3], ids=["a", "b", "c"])
+    index.add_documents([DOCS[3]], ids=["d"])
+    index.delete_documents(["b"])
+    index.update_documents([replacement], ids=["d"])
+    index.add_documents([extra], ids=["e"])
+    if compact:
+        index = index.compact()
+        assert not index.has_pending_changes
+
+    expected = [DOCS[0], DOCS[2], replacement, extra]
+    fresh = BM25Index.from_documents(expected, ids=["a", "c", "d", "e"])
+    assert len(index) == len(fresh) == 4
+    assert index.corpus_hash == fresh.corpus_hash
+    for query in ["gut bacteria", "probiotics bloating", "sleep stress", "ibs cramping"]:
+        assert ranked(index, query) == ranked(fresh, query)
@@ -0,0 +1,57 @@
+import pytest
+from langchain.schema import Document
+from app.ai_component.exception import CustomException
+from app.ai_component.modules.bm25_index import BM25Index
+from app.ai_component.modules.bm25_storage import BM25IndexFormatError, open_index, read_header, write_index
+
+
+def corrupt_payload(path: str, section: str = "postings"):
+    """Flip one byte inside a payload section, leaving the header intact"""
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    offset = read_header(data)["sections"][section][0]
+    data[offset] ^= 0xFF
+    with open(path, "wb") as f:
+        f.write(bytes(data))
+
+
+def test_open_index_detects_corrupt_payload(tmp_path):
+    path = str(tmp_path / "index.idx")
+    docs = [Document(page_content="gut bacteria and fiber", metadata={"url": "a"}), Document(page_content="ibs bloating", metadata={"url": "b"})]
+    write_index(BM25Index.from_documents(docs), path)
+    corrupt_payload(path)
+
+    with pytest.raises(BM25IndexFormatError):
+        open_index(path, verify=True)
+
+
+def test_warmup_load_detects_corrupt_payload(local_store, corpus_path):
+    collection = "corrupt"
+    assert local_store.StoreInMemory(collection, corpus_path)
+    corrupt_payload(local_store._get_bm25_file_path(collection))
+
+    with pytest.raises(BM25IndexFormatError):
+        local_store._load_bm25_retriever(collection, verify=True)
+    with pytest.raises(CustomException):
+        local_store.setup_retrievers(collection, verify=True)
+
+
+def test_ingest_rebuilds_corrupt_index(local_store, corpus_path):
+    collection = "corrupt"
+    assert local_store.StoreInMemory(collection, corpus_path)
+    corrupt_payload(local_store._get_bm25_file_path(collection))
+
+    assert local_store.StoreInMemory(collection, corpus_path)
+    index = local_store._load_bm25_retriever(collection, verify=True).index
+    assert len(index) == 3
+
+
+def test_update_rebuilds_corrupt_index_from_collection(local_store, corpus_path):
+    collection = "corrupt"
+    assert local_store.StoreInMemory(collection, corpus_path)
+    corrupt_payload(local_store._get_bm25_file_path(collection))
+
+    extra = Document(page_content="Content: Probiotics may ease bloating.", metadata={"url": "https://example.org/probiotics", "heading": None})
+    retriever = local_store.update_bm25_index(collection, [extra])
+    assert len(retriever.index) == 4
+    assert len(local_store._load_bm25_retriever(collection, verify=True).index) == 4
@@ -0,0 +1,64 @@
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.chunking import Chunker, TokenPacker
+from app.ai_component.modules.token_utils import estimate_tokens
+
+
+def section(url: str, heading: str, text: str) -> Document:
+    return Document(page_content=f"Heading: {heading}\n\nContent: {text}", metadata={"url": url, "heading": heading})
+
+
+def sentences(n: int, word: str) -> str:
+    return " ".join(f"Sentence {i} is about {word} and the gut." for i in range(n))
+
+
+def test_token_mode_merges_small_sections_within_an_article():
+    docs = [section("a", "Intro", "Short."), section("a", "Fiber", "Also short."), section("b", "Symptoms", "Bloating.")]
+    chunks = list(Chunker(mode="tokens", target_tokens=350).iter_chunks(docs))
+
+    assert [chunk.metadata["url"] for chunk in chunks] == ["a", "b"]
+    assert chunks[0].metadata["headings"] == ["Intro", "Fiber"]
+    assert "headings" not in chunks[1].metadata
+    assert all(chunk.metadata["estimated_tokens"] == estimate_tokens(chunk.page_content) for chunk in chunks)
+
+
+def test_token_mode_splits_long_sections_at_sentence_boundaries():
+    packer = TokenPacker(target_tokens=50, max_tokens=80)
+    text = sentences(40, "fiber")
+    chunks = packer.pack([(text, {"url": "a", "heading": "Fiber"})])
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= packer.max_tokens for chunk, _ in chunks)
+    assert all(chunk.endswith(".") for chunk, _ in chunks)
+    assert " ".join(chunk for chunk, _ in chunks) == text
+
+
+def corpus():
+    docs = []
+    for article in range(6):
+        for heading in range(4):
+            length = 40 if (article + heading) % 3 else 400
+            docs.append(section(f"url-{article}", f"h{heading}", sentences(length // 10, f"topic {article}.{heading}")))
+    return docs
+
+
+def test_character_mode_passes_short_sections_through_and_keeps_order():
+    docs = corpus()
+    chunks = list(Chunker(chunk_size=500, chunk_overlap=50).iter_chunks(docs))
+    assert len(chunks) > len(docs)
+    assert all(len(chunk.page_content) <= 500 for chunk in chunks)
+    order = [(doc.metadata["url"], doc.metadata["heading"]) for doc in docs]
+    assert list(dict.fromkeys((chunk.metadata["url"], chunk.metadata["heading"]) for chunk in chunks)) == order
+    # Sections within chunk_size are yielded as-is
+    assert any(chunk is docs[1] for chunk in chunks)
+
+
+@pytest.mark.parametrize("mode", ["characters", "tokens"])
+def test_process_pool_output_matches_serial(mode):
+    serial = Chunker(chunk_size=500, chunk_overlap=50, mode=mode, target_tokens=120, max_tokens=200)
+    parallel = Chunker(chunk_size=500, chunk_overlap=50, mode=mode, target_tokens=120, max_tokens=200, workers=2, batch_size=8, min_parallel=1)
+
+    def as_tuples(chunks):
+        return [(chunk.page_content, chunk.metadata) for chunk in chunks]
+
+    assert as_tuples(parallel.iter_chunks(corpus())) == as_tuples(serial.iter_chunks(corpus()))
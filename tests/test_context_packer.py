@@ -0,0 +1,34 @@
+from langchain.schema import Document
+from app.ai_component.modules.context_packer import ContextPacker
+from app.ai_component.modules.token_utils import estimate_tokens
+
+
+def chunk(url: str, text: str, score: float) -> Document:
+    return Document(page_content=text, metadata={"url": url, "fused_score": score})
+
+
+def sentences(n: int, topic: str) -> str:
+    return " ".join(f"Sentence {i} explains how {topic} affects the gut." for i in range(n))
+
+
+def test_packed_context_never_exceeds_the_budget():
+    documents = [chunk(str(i), sentences(10, f"topic{i}"), score=1.0 / (i + 1)) for i in range(8)]
+    for budget in (50, 120, 300, 1000):
+        packed = ContextPacker(token_budget=budget, min_chunk_tokens=16).pack(documents)
+        assert packed.tokens_used <= budget
+        assert estimate_tokens(packed.text) == packed.tokens_used
+        assert packed.tokens_used + packed.tokens_saved == packed.tokens_retrieved
+
+
+def test_highest_scores_first_duplicates_dropped_last_chunk_trimmed():
+    best = chunk("best", sentences(6, "fiber"), score=0.9)
+    mirror = chunk("mirror", best.page_content, score=0.8)
+    second = chunk("second", sentences(20, "stress"), score=0.5)
+    budget = estimate_tokens(best.page_content) + 70
+    packed = ContextPacker(token_budget=budget, min_chunk_tokens=16).pack([second, mirror, best])
+
+    assert [doc.metadata["url"] for doc in packed.documents] == ["best", "second"]
+    assert packed.duplicates_dropped == 1 and packed.truncated == 1
+    assert second.page_content.startswith(packed.documents[1].page_content)
+    assert packed.documents[1].page_content.endswith(".")
+    assert packed.sources == ["best", "second"]
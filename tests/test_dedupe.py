@@ -0,0 +1,53 @@
+import copy
+import json
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules import hybrid_retriever
+from app.ai_component.modules.dedupe import NearDuplicateFilter
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+COLLECTION = "dedupe"
+
+
+def write_corpus(path, articles):
+    path.write_text(json.dumps(articles), encoding="utf-8")
+    return str(path)
+
+
+def mirrored(article):
+    mirror = copy.deepcopy(article)
+    mirror["url"] += "-mirror"
+    mirror["source"] = "mirror"
+    return mirror
+
+
+def stored_metadata(store: DataStore):
+    """url -> metadata of every chunk in the vector backend and in BM25"""
+    if store.vector_backend == "local":
+        vector_docs = store._load_local_index(COLLECTION).documents
+    else:
+        points, _ = store.client.scroll(COLLECTION, limit=100, with_payload=True)
+        vector_docs = [Document(page_content="", metadata=point.payload["metadata"]) for point in points]
+    index = store._load_bm25_retriever(COLLECTION).index
+    bm25_docs = [index.document(slot) for slot in index.live_slots()]
+    return [{(doc.metadata["url"], doc.metadata["heading"]): doc.metadata for doc in docs} for docs in (vector_docs, bm25_docs)]
+
+
+@pytest.mark.parametrize("vector_backend", ["local", "qdrant"])
+def test_duplicate_sources_persist_on_unchanged_canonical_chunks(workdir, articles, monkeypatch, vector_backend):
+    monkeypatch.setattr(hybrid_retriever, "build_dedupe_filter", lambda: NearDuplicateFilter(threshold=0.85))
+    store = DataStore(qdrant_url=":memory:", vector_backend=vector_backend, embedding_backend="hashed_ngram")
+    canonical = (articles[1]["url"], "Symptoms")
+
+    # Canonical chunks are stored first, so they are unchanged when the mirror shows up
+    assert store.StoreInMemory(COLLECTION, write_corpus(workdir / "plain.json", articles))
+    assert store.StoreInMemory(COLLECTION, write_corpus(workdir / "mirrored.json", articles + [mirrored(articles[1])]))
+    assert store.last_dedupe_stats.duplicates == 1
+    for metadata in stored_metadata(store):
+        assert len(metadata) == 3
+        assert metadata[canonical]["duplicate_sources"] == [{"source": "mirror", "url": articles[1]["url"] + "-mirror", "heading": "Symptoms"}]
+
+    # Once the mirror is gone, so is the annotation
+    assert store.StoreInMemory(COLLECTION, write_corpus(workdir / "plain.json", articles))
+    for metadata in stored_metadata(store):
+        assert "duplicate_sources" not in metadata[canonical]
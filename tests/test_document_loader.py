@@ -0,0 +1,35 @@
+import json
+import pytest
+from app.ai_component.modules.document_loader import iter_documents, iter_json_records, section_documents
+
+
+@pytest.mark.parametrize("read_size", [7, 64, 1 << 16])
+@pytest.mark.parametrize("layout", ["array", "jsonl", "single"])
+def test_records_stream_across_buffer_boundaries(tmp_path, articles, read_size, layout):
+    path = tmp_path / f"corpus.{layout}"
+    if layout == "array":
+        path.write_text(json.dumps(articles, indent=2), encoding="utf-8")
+        expected = articles
+    elif layout == "jsonl":
+        path.write_text("\n".join(json.dumps(article) for article in articles) + "\n", encoding="utf-8")
+        expected = articles
+    else:
+        path.write_text(json.dumps(articles[0]), encoding="utf-8")
+        expected = articles[:1]
+    assert list(iter_json_records(str(path), read_size=read_size)) == expected
+
+
+def test_unterminated_array_raises(tmp_path, articles):
+    path = tmp_path / "truncated.json"
+    path.write_text(json.dumps(articles)[:-1], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_records(str(path), read_size=16))
+
+
+def test_iter_documents_matches_loading_the_whole_file(corpus_path, articles):
+    streamed = list(iter_documents(corpus_path))
+    loaded = [doc for article in articles for doc in section_documents(article)]
+    assert [(doc.page_content, doc.metadata) for doc in streamed] == [(doc.page_content, doc.metadata) for doc in loaded]
+    assert streamed[0].page_content == "Heading: What is the gut microbiome\n\nContent: Trillions of bacteria live in the large intestine."
+    with pytest.raises(FileNotFoundError):
+        iter_documents(corpus_path + ".missing")
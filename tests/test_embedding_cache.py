@@ -0,0 +1,28 @@
+import asyncio
+from app.ai_component.modules.embedding_backends import HashedNGramEmbeddings
+from app.ai_component.modules.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(HashedNGramEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def test_async_documents_use_document_store(tmp_path):
+    base = CountingEmbeddings()
+    path = str(tmp_path / "documents.sqlite")
+    texts = ["gut bacteria", "dietary fiber", "gut bacteria"]
+
+    vectors = asyncio.run(CachedEmbeddings(base, document_store_path=path).aembed_documents(texts))
+    assert base.embedded == ["gut bacteria", "dietary fiber"]
+    assert vectors[0] == vectors[2]
+
+    cached = CachedEmbeddings(base, document_store_path=path)
+    assert asyncio.run(cached.aembed_documents(texts + ["bloating"]))[:3] == vectors
+    assert base.embedded == ["gut bacteria", "dietary fiber", "bloating"]
+    assert cached.document_hits == 3
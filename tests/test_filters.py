@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.bm25_index import BM25Index
+from app.ai_component.modules.bm25_storage import MappedDocuments, open_index, write_index
+from app.ai_component.modules.filters import normalize_filter
+
+DOCS = [
+    Document(page_content="fiber feeds gut bacteria", metadata={"source": "healthline", "url": "a", "heading": "Fiber"}),
+    Document(page_content="bloating and gut cramps", metadata={"source": "mayo_clinic", "url": "b", "heading": "Symptoms"}),
+    Document(page_content="gut bacteria and probiotics", metadata={"source": "nih_ncbi", "url": "c", "heading": "Probiotics"}),
+]
+
+
+def test_normalize_filter_is_canonical():
+    assert normalize_filter({"url": "a", "source": ["nih_ncbi", "mayo_clinic"]}) == normalize_filter({"source": ("mayo_clinic", "nih_ncbi"), "url": ["a"]})
+    assert normalize_filter({}) is None
+    with pytest.raises(ValueError):
+        normalize_filter({"source": []})
+
+
+def test_filter_values_are_ored_and_fields_anded():
+    index = BM25Index.from_documents(DOCS)
+    assert np.flatnonzero(index.filter_mask({"source": ["mayo_clinic", "nih_ncbi"]})).tolist() == [1, 2]
+    assert np.flatnonzero(index.filter_mask({"source": ["mayo_clinic", "nih_ncbi"], "url": "c"})).tolist() == [2]
+    assert [doc.metadata["url"] for doc, _ in index.search("gut bacteria", k=3, filter={"source": "healthline"})] == ["a"]
+
+
+def test_saved_index_filters_without_decoding_documents(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.idx")
+    write_index(BM25Index.from_documents(DOCS), path)
+    index = open_index(path, verify=True)
+
+    def no_decode(self, doc_id):
+        raise AssertionError("filter decoded a stored document")
+
+    monkeypatch.setattr(MappedDocuments, "__getitem__", no_decode)
+    assert np.flatnonzero(index.filter_mask({"source": ["healthline", "nih_ncbi"]})).tolist() == [0, 2]
+    assert np.flatnonzero(index.filter_mask({"heading": "Symptoms"})).tolist() == [1]
+
+
+@pytest.mark.parametrize("method", ["vector", "bm25", "hybrid"])
+def test_datastore_search_respects_filter(local_store, corpus_path, method):
+    local_store.StoreInMemory("filters", corpus_path)
+    results = local_store.search_with_method("gut bacteria bloating", "filters", method=method, k=3, filter={"source": "mayo_clinic"})
+    docs = [doc for doc, _ in results] if method == "vector" else results
+    assert docs
+    assert {doc.metadata["source"] for doc in docs} == {"mayo_clinic"}
@@ -0,0 +1,34 @@
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.fusion import RankFusion
+
+
+def doc(url: str, text: str = "Fiber feeds gut bacteria.", **metadata) -> Document:
+    return Document(page_content=text, metadata={"url": url, "heading": "Fiber", **metadata})
+
+
+def test_rrf_merges_legs_on_chunk_ids():
+    vector = [(doc("a", _id="point-a"), 0.9), (doc("b"), 0.8)]
+    bm25 = [(doc("b"), 7.0), (doc("a"), 5.0), (doc("c"), 1.0)]
+    fused = RankFusion(method="rrf", rrf_k=60).fuse({"vector": vector, "bm25": bm25})
+
+    assert [d.metadata["url"] for d in fused] == ["a", "b", "c"]
+    assert fused[0].metadata["fused_score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[0].metadata["leg_ranks"] == {"vector": 1, "bm25": 2}
+    assert fused[2].metadata["leg_ranks"] == {"bm25": 3}
+
+
+def test_same_text_from_different_urls_stays_separate():
+    fused = RankFusion().fuse({"vector": [(doc("a"), 0.9)], "bm25": [(doc("mirror"), 3.0)]})
+    assert sorted(d.metadata["url"] for d in fused) == ["a", "mirror"]
+
+
+def test_weights_convex_scores_and_k():
+    vector = [(doc("a"), 0.9), (doc("b"), 0.1)]
+    bm25 = [(doc("b"), 9.0), (doc("a"), 1.0)]
+    fused = RankFusion(method="convex", weights={"vector": 1.0, "bm25": 3.0}).fuse({"vector": vector, "bm25": bm25}, k=1)
+
+    assert [d.metadata["url"] for d in fused] == ["b"]
+    assert fused[0].metadata["fused_score"] == pytest.approx(3.0)
+    with pytest.raises(ValueError):
+        RankFusion(method="max")
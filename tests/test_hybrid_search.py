@@ -0,0 +1,42 @@
+import threading
+import time
+from app.ai_component.config import hybrid_search_workers
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+
+def test_stuck_vector_leg_does_not_starve_bm25(local_store, corpus_path, monkeypatch):
+    local_store.StoreInMemory("deadlines", corpus_path)
+    release = threading.Event()
+
+    def stuck_vector(self, *args, **kwargs):
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(DataStore, "search_in_collection", stuck_vector)
+    try:
+        # More searches than the pool has workers, so every vector thread is stuck
+        for _ in range(hybrid_search_workers + 2):
+            docs = local_store.hybrid_search_concurrent("gut bacteria fiber", "deadlines", k=2, vector_timeout=0.01, bm25_timeout=1.0)
+            assert docs
+            assert all(doc.metadata["retrieval_legs"] == ["bm25"] for doc in docs)
+    finally:
+        release.set()
+
+
+def test_both_legs_lost_falls_back_to_inline_bm25(local_store, corpus_path, monkeypatch):
+    local_store.StoreInMemory("deadlines", corpus_path)
+    bm25_search_with_score = DataStore.bm25_search_with_score
+
+    def vector_down(self, *args, **kwargs):
+        raise RuntimeError("vector backend unavailable")
+
+    def slow_in_pool(self, *args, **kwargs):
+        if threading.current_thread() is not threading.main_thread():
+            time.sleep(0.2)
+        return bm25_search_with_score(self, *args, **kwargs)
+
+    monkeypatch.setattr(DataStore, "search_in_collection", vector_down)
+    monkeypatch.setattr(DataStore, "bm25_search_with_score", slow_in_pool)
+    docs = local_store.hybrid_search_concurrent("gut bacteria fiber", "deadlines", k=2, bm25_timeout=0.01)
+    assert docs
+    assert docs[0].metadata["retrieval_legs"] == ["bm25"]
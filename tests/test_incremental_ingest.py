@@ -0,0 +1,45 @@
+import json
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+COLLECTION = "incremental"
+
+
+def write_corpus(path, articles):
+    path.write_text(json.dumps(articles), encoding="utf-8")
+    return str(path)
+
+
+def stored_headings(store: DataStore):
+    """(url, heading) of every chunk in the vector backend and in BM25"""
+    if store.vector_backend == "local":
+        vector_docs = store._load_local_index(COLLECTION).documents
+    else:
+        points, _ = store.client.scroll(COLLECTION, limit=100, with_payload=True)
+        vector_docs = [Document(page_content="", metadata=point.payload["metadata"]) for point in points]
+    index = store._load_bm25_retriever(COLLECTION).index
+    bm25_docs = [index.document(slot) for slot in index.live_slots()]
+    return [sorted((doc.metadata["url"], doc.metadata["heading"]) for doc in docs) for docs in (vector_docs, bm25_docs)]
+
+
+@pytest.mark.parametrize("vector_backend", ["local", "qdrant"])
+def test_ingest_only_replaces_articles_in_the_file(workdir, articles, vector_backend):
+    store = DataStore(qdrant_url=":memory:", vector_backend=vector_backend, embedding_backend="hashed_ngram")
+    first, second = articles
+    store.StoreInMemory(COLLECTION, write_corpus(workdir / "first.json", [first]))
+    store.StoreInMemory(COLLECTION, write_corpus(workdir / "second.json", [second]))
+    everything = sorted([(first["url"], "What is the gut microbiome"), (first["url"], "Fiber"), (second["url"], "Symptoms")])
+    assert stored_headings(store) == [everything, everything]
+
+    # Re-ingesting the first file with a section removed drops only that section
+    first["sections"].pop()
+    store.StoreInMemory(COLLECTION, write_corpus(workdir / "first.json", [first]))
+    expected = sorted([(first["url"], "What is the gut microbiome"), (second["url"], "Symptoms")])
+    assert stored_headings(store) == [expected, expected]
+    assert store.search_with_method("bloating", COLLECTION, method="bm25", k=1)[0].metadata["url"] == second["url"]
+
+    # A full replace keeps only what the file holds
+    store.StoreInMemory(COLLECTION, write_corpus(workdir / "first.json", [first]), replace=True)
+    expected = [(first["url"], "What is the gut microbiome")]
+    assert stored_headings(store) == [expected, expected]
@@ -0,0 +1,64 @@
+import os
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.embedding_backends import HashedNGramEmbeddings
+from app.ai_component.modules.ingestion import IngestionCheckpoint, IngestionError, IngestionPipeline
+
+
+def chunks(n):
+    return [Document(page_content=f"chunk {i} about gut bacteria", metadata={"url": f"https://example.org/{i}", "heading": "h"}) for i in range(n)]
+
+
+def pipeline(writer, checkpoint=None, batch_size=4, max_retries=3):
+    return IngestionPipeline(
+        HashedNGramEmbeddings(),
+        writer=writer,
+        batch_size=batch_size,
+        max_concurrency=1,
+        max_retries=max_retries,
+        retry_base_delay=0,
+        checkpoint=checkpoint,
+    )
+
+
+def test_failed_batches_are_retried():
+    written, failures = [], iter([True, True])
+
+    def flaky(documents, vectors):
+        if next(failures, False):
+            raise ConnectionError("upsert timed out")
+        written.extend(doc.page_content for doc in documents)
+
+    stats = pipeline(flaky).run(chunks(10))
+    assert stats.retries == 2
+    assert stats.chunks == 10 and stats.batches == 3
+    assert written == [doc.page_content for doc in chunks(10)]
+
+
+def test_exhausted_retries_raise():
+    def down(documents, vectors):
+        raise ConnectionError("qdrant unavailable")
+
+    with pytest.raises(IngestionError):
+        pipeline(down, max_retries=2).run(chunks(3))
+
+
+def test_resume_skips_written_chunks_when_batches_shift(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    written = []
+
+    def crash_on_second_batch(documents, vectors):
+        if written:
+            raise ConnectionError("process killed")
+        written.extend(doc.page_content for doc in documents)
+
+    with pytest.raises(IngestionError):
+        pipeline(crash_on_second_batch, IngestionCheckpoint(path), max_retries=1).run(chunks(10))
+    assert written == [doc.page_content for doc in chunks(4)]
+
+    # The resumed run batches differently, e.g. after a batch size change
+    stats = pipeline(lambda documents, vectors: written.extend(doc.page_content for doc in documents), IngestionCheckpoint(path), batch_size=3).run(chunks(10))
+    assert stats.skipped_chunks == 4
+    assert stats.chunks == 6
+    assert written == [doc.page_content for doc in chunks(10)]
+    assert not os.path.exists(path)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+from app.ai_component.modules.local_vector_index import LocalVectorIndex
+
+DOCS = [Document(page_content=f"doc {i}", metadata={"url": str(i), "source": "even" if i % 2 == 0 else "odd"}) for i in range(6)]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(len(DOCS), 8)).astype(np.float32)
+
+
+def exact_top_k(vectors, query, k, rows=None):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return [str(row) for row in rows[np.argsort(-scores[rows], kind="stable")][:k]]
+
+
+def test_search_is_exact_cosine_top_k(vectors):
+    index = LocalVectorIndex.from_embeddings(DOCS, vectors, ids=[doc.metadata["url"] for doc in DOCS])
+    query = np.random.default_rng(1).normal(size=8)
+    assert [doc.metadata["_id"] for doc, _ in index.search(query, k=3)] == exact_top_k(vectors, query, 3)
+    assert [doc.metadata["_id"] for doc, _ in index.search(query, k=3, filter={"source": "even"})] == exact_top_k(vectors, query, 3, [0, 2, 4])
+    batch = index.search_many([query, -query], k=2)
+    assert [[doc.metadata["_id"] for doc, _ in hits] for hits in batch] == [exact_top_k(vectors, query, 2), exact_top_k(vectors, -query, 2)]
+
+
+def test_upsert_delete_and_reload(tmp_path, vectors):
+    path = str(tmp_path / "collection")
+    index = LocalVectorIndex.from_embeddings(DOCS[:4], vectors[:4], ids=["0", "1", "2", "3"], name="collection")
+    index.upsert(DOCS[4:], vectors[4:], ids=["4", "5"])
+    index.upsert([DOCS[0]], [vectors[5]], ids=["0"])
+    assert index.delete(["3", "missing"]) == 1
+    index.save(path)
+
+    loaded = LocalVectorIndex.load(path)
+    assert loaded.ids == ["0", "1", "2", "4", "5"]
+    assert isinstance(loaded.vectors, np.memmap)
+    hits = loaded.search(vectors[5], k=2)
+    assert {doc.metadata["_id"] for doc, _ in hits} == {"0", "5"}
+    assert hits[0][0].metadata["_collection_name"] == "collection"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+from qdrant_client import AsyncQdrantClient
+from app.ai_component.modules.hybrid_retriever import DataStore
+from app.ai_component.modules.qdrant_clients import QdrantClientProvider
+
+
+def test_in_memory_async_search_sees_sync_writes(workdir, corpus_path):
+    store = DataStore(qdrant_url=":memory:", embedding_backend="hashed_ngram")
+    assert store.StoreInMemory("in_memory_async", corpus_path)
+
+    results = asyncio.run(store.asearch_with_method("gut bacteria and fiber", "in_memory_async", method="vector", k=2))
+    assert len(results) == 2
+
+
+def test_async_clients_of_closed_loops_are_closed(monkeypatch):
+    closed = []
+
+    async def close(self, **kwargs):
+        closed.append(self)
+
+    monkeypatch.setattr(AsyncQdrantClient, "close", close)
+    provider = QdrantClientProvider(prefer_grpc=False)
+
+    async def get():
+        return provider.get_async("http://localhost:6333")
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    assert second is not first
+
+    for thread in threading.enumerate():
+        if thread.name == "qdrant-async-close":
+            thread.join()
+    assert closed == [first]
+
+    provider.close()
+    assert closed == [first, second]
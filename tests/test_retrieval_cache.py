@@ -0,0 +1,20 @@
+from app.ai_component.modules.hybrid_retriever import DataStore
+
+
+def test_degraded_hybrid_results_are_not_cached(local_store, corpus_path, monkeypatch):
+    local_store.StoreInMemory("cache_fallback", corpus_path)
+
+    def vector_down(self, *args, **kwargs):
+        raise RuntimeError("vector backend unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DataStore, "search_in_collection", vector_down)
+        degraded = local_store.search_with_method("gut bacteria fiber", "cache_fallback", method="hybrid", k=2)
+    assert degraded
+    assert all(doc.metadata["retrieval_legs"] == ["bm25"] for doc in degraded)
+
+    recovered = local_store.search_with_method("gut bacteria fiber", "cache_fallback", method="hybrid", k=2)
+    assert recovered[0].metadata["retrieval_legs"] == ["vector", "bm25"]
+    # The full result is cached once both legs are back
+    assert local_store.search_with_method("gut bacteria fiber", "cache_fallback", method="hybrid", k=2) == recovered
+    assert local_store.retrieval_cache.stats()["hits"] == 1
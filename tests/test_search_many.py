@@ -0,0 +1,25 @@
+import pytest
+
+QUERIES = ["gut bacteria fiber", "bloating and cramping", "short-chain fatty acids", "intestine bacteria"]
+
+
+def keys(results):
+    return [(doc.metadata["url"], doc.metadata["heading"]) for doc in results]
+
+
+@pytest.mark.parametrize("method", ["bm25", "hybrid"])
+def test_search_many_matches_single_searches_in_input_order(local_store, corpus_path, method):
+    local_store.StoreInMemory("many", corpus_path)
+    # One query is already cached, the rest are computed in a batch
+    local_store.search_with_method(QUERIES[2], "many", method=method, k=2)
+
+    batch = local_store.search_many(QUERIES, "many", method=method, k=2)
+    local_store.retrieval_cache.clear()
+    assert [keys(results) for results in batch] == [keys(local_store.search_with_method(query, "many", method=method, k=2)) for query in QUERIES]
+
+
+def test_search_many_vector_results_follow_queries(local_store, corpus_path):
+    local_store.StoreInMemory("many", corpus_path)
+    batch = local_store.search_many(QUERIES, "many", method="vector", k=1)
+    singles = [local_store.search_in_collection(query, "many", k=1) for query in QUERIES]
+    assert [[doc.metadata["_id"] for doc, _ in hits] for hits in batch] == [[doc.metadata["_id"] for doc, _ in hits] for hits in singles]